@@ -1,8 +1,17 @@
-from flask import Blueprint, jsonify, Response, current_app
+from flask import Blueprint, jsonify, request, Response, current_app
+import json
+import os
 import requests
-from typing import List, Dict, Union
-from utility_services import authenticate, get_url
+from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Dict, Optional, Tuple, Union
+from pb_client import get_client
+from utility_services import with_app_context
+from db_util import locate_record, remember_record_location
 from db_schema import SCHEMAS
+from handle_PB import read_supervisor_stats
+from advice_batch import submit_advice_job
+from jobs import read_job
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -11,55 +20,134 @@ RecordSummary = Dict[str, Union[str, None]]
 JsonResponse = Union[Response, tuple]
 
 
+SUMMARY_FIELDS: str = "id,name,email,created"  # Only the columns shown on the dashboard are requested
+ADMIN_PAGE_SIZE: int = int(os.getenv("ADMIN_PAGE_SIZE", 50))  # Records per page on the admin dashboard
+
+
+def to_record_summary(record: Dict, milestone: str) -> RecordSummary:
+    return {
+        'name': record.get('name'),
+        'id': record.get('id'),
+        'email': record.get('email'),
+        'milestone': milestone,
+        'submission_date': record.get('created')
+    }
+
+
+def fetch_record_summaries(milestone: str) -> List[RecordSummary]:
+    """
+    Fetch a summary of every record in a milestone collection, walking all pages.
+    """
+    collection_name: str = f"{milestone}"
+    current_app.logger.info(
+        f"Fetching records from collection: {collection_name}")
+    try:
+        records: List[RecordSummary] = [
+            to_record_summary(record, milestone)
+            for record in get_client().iter_records(collection_name, fields=SUMMARY_FIELDS, sort="-created")
+        ]
+        for record in records:
+            remember_record_location(record['id'], milestone)
+    except requests.RequestException as e:
+        current_app.logger.error(
+            f"Failed to retrieve records for {collection_name}: {e}")
+        return []
+    current_app.logger.info(
+        f"Successfully fetched {len(records)} records from {collection_name}.")
+    return records
+
+
+def iter_record_summaries() -> Iterator[Tuple[str, List[RecordSummary]]]:
+    """
+    Every record summary, for the /admin/records JSON route. The dashboard reads one page at a time
+    instead, with get_record_summary_pages() and fetch_record_summary_page().
+    Fetches the milestone collections in parallel and yields (milestone, summaries) as each one completes.
+    """
+    executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=len(SCHEMAS))
+    futures: Dict[Future, str] = {
+        executor.submit(with_app_context(fetch_record_summaries), milestone): milestone for milestone in SCHEMAS.keys()
+    }
+    executor.shutdown(wait=False)
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+
+def fetch_record_summary_page(milestone: str, page: int = 1, per_page: int = ADMIN_PAGE_SIZE, sort: str = "-created") -> Dict:
+    """
+    Fetch one page of record summaries from a milestone collection, sorted by PocketBase.
+
+    Returns:
+        Dict: The summaries under 'items', with 'page', 'perPage', 'totalItems' and 'totalPages' from PocketBase.
+    """
+    response: requests.Response = get_client().get(
+        f"/api/collections/{milestone}/records",
+        params={"page": page, "perPage": per_page, "sort": sort, "fields": SUMMARY_FIELDS}
+    )
+    response.raise_for_status()
+    data: Dict = response.json()
+    for record in data.get('items', []):
+        remember_record_location(record.get('id'), milestone)
+    return {
+        'milestone': milestone,
+        'items': [to_record_summary(record, milestone) for record in data.get('items', [])],
+        'page': data.get('page', page),
+        'perPage': data.get('perPage', per_page),
+        'totalItems': data.get('totalItems', 0),
+        'totalPages': data.get('totalPages', 0)
+    }
+
+
+def get_record_summary_pages(page: int = 1, per_page: int = ADMIN_PAGE_SIZE, sort: str = "-created") -> Dict[str, Dict]:
+    """
+    Fetch the same page of every milestone collection in parallel, keyed by milestone in schema order.
+    A collection that can't be read is returned as an empty page.
+    """
+    def fetch(milestone: str) -> Dict:
+        try:
+            return fetch_record_summary_page(milestone, page, per_page, sort)
+        except requests.RequestException as e:
+            current_app.logger.error(f"Failed to retrieve records for {milestone}: {e}")
+            return {'milestone': milestone, 'items': [], 'page': page, 'perPage': per_page, 'totalItems': 0, 'totalPages': 0}
+
+    with ThreadPoolExecutor(max_workers=len(SCHEMAS)) as executor:
+        pages: List[Dict] = list(executor.map(with_app_context(fetch), SCHEMAS.keys()))
+    return {result['milestone']: result for result in pages}
+
+
 @admin_bp.route('/admin/records', methods=['GET'])
 def admin_get_all_records() -> JsonResponse:
     """
     Admin route to get all records from all collections.
+    Each milestone collection is streamed out as soon as it arrives.
     """
     current_app.logger.info("Fetching all records from all collections.")
-    url: str = f"{get_url()}/api/collections"
-    headers: Dict[str, str] = {
-        "Content-Type": "application/json",
-        "Authorization": authenticate()
-    }
-    all_records: List[RecordSummary] = []
+    summaries: Iterator[Tuple[str, List[RecordSummary]]] = iter_record_summaries()
 
-    for milestone in SCHEMAS.keys():
-        collection_name: str = f"{milestone}"
-        current_app.logger.info(
-            f"Fetching records from collection: {collection_name}")
-        response: requests.Response = requests.get(
-            f"{url}/{collection_name}/records", headers=headers)
-        if response.status_code == 200:
-            data: Dict[str, Union[List[Dict], str]] = response.json()
-            records: List[Dict] = data.get('items', [])
-            for record in records:
-                record_summary: RecordSummary = {
-                    'name': record.get('name'),
-                    'id': record.get('id'),
-                    'email': record.get('email'),
-                    'milestone': milestone,
-                    'submission_date': record.get('created')
-                }
-                if record_summary:
-                    all_records.append(record_summary)
-            current_app.logger.info(
-                f"Successfully fetched {len(records)} records from {collection_name}.")
-        else:
-            current_app.logger.error(
-                f"Failed to retrieve records for {collection_name}. Status code: {response.status_code}")
-            current_app.logger.error(f"Response data: {response.text}")
-            continue
-
-    if all_records:
-        current_app.logger.info(
-            f"Successfully fetched all records. Total records: {len(all_records)}.")
-        return jsonify(all_records), 200
-    else:
+    # Wait for the first non-empty collection so an empty database can still be reported with an error status
+    first_records: List[RecordSummary] = []
+    for _, first_records in summaries:
+        if first_records:
+            break
+    if not first_records:
         current_app.logger.error(
             "Unable to retrieve any records from the database.")
         return jsonify({'error': 'No records found'}), 500
 
+    logger = current_app.logger
+
+    def generate() -> Iterator[str]:
+        total: int = len(first_records)
+        yield "[" + ",".join(json.dumps(record) for record in first_records)
+        for _, records in summaries:
+            total += len(records)
+            for record in records:
+                yield "," + json.dumps(record)
+        yield "]"
+        logger.info(
+            f"Successfully fetched all records. Total records: {total}.")
+
+    return Response(generate(), mimetype='application/json'), 200
+
 
 @admin_bp.route('/admin/records/<record_id>', methods=['GET'])
 def admin_get_record(record_id: str) -> JsonResponse:
@@ -67,26 +155,55 @@ def admin_get_record(record_id: str) -> JsonResponse:
     Admin route to get detailed data for a specific record, which can be used for visualizations.
     """
     current_app.logger.info(f"Fetching record with ID: {record_id}.")
-    url: str = f"{get_url()}/api/collections"
-    headers: Dict[str, str] = {
-        "Content-Type": "application/json",
-        "Authorization": authenticate()
-    }
-
-    for milestone in SCHEMAS.keys():
-        collection_name: str = f"{milestone}"
-        response: requests.Response = requests.get(
-            f"{url}/{collection_name}/records/{record_id}", headers=headers)
-        if response.status_code == 200:
-            current_app.logger.info(
-                f"Successfully fetched record {record_id} from {collection_name}.")
-            record: Dict = response.json()
-            return jsonify(record), 200
-        else:
-            current_app.logger.warning(
-                f"Failed to find record {record_id} in {collection_name}.")
-            continue
+    located: Optional[Tuple[str, Dict]] = locate_record(record_id)
+    if located:
+        collection_name, record = located
+        current_app.logger.info(
+            f"Successfully fetched record {record_id} from {collection_name}.")
+        return jsonify(record), 200
 
     current_app.logger.error(
         f"Record with ID {record_id} not found in any collection.")
     return jsonify({'error': 'Record not found'}), 404
+
+
+@admin_bp.route('/admin/pocketbase', methods=['GET'])
+def admin_pocketbase_stats() -> JsonResponse:
+    """
+    Admin route reporting PocketBase's uptime, restart count and latest health check from its supervisor.
+    """
+    stats: Optional[Dict] = read_supervisor_stats()
+    if stats is None:
+        return jsonify({'error': 'PocketBase is not supervised by this app'}), 404
+    return jsonify(stats), 200
+
+
+@admin_bp.route('/admin/advice', methods=['POST'])
+def admin_generate_advice() -> JsonResponse:
+    """
+    Admin route queueing improvement ideas for every coordinator who submitted to the term starting on
+    `term_start_date` (YYYY-MM-DD). Returns the job to poll for the results.
+    """
+    try:
+        term_start_date: date = date.fromisoformat(request.args.get('term_start_date', ''))
+    except ValueError:
+        return jsonify({'error': 'Provide term_start_date as YYYY-MM-DD'}), 400
+    job: Dict = submit_advice_job(term_start_date)
+    return jsonify({'job_id': job['id'], 'status': job['status'], 'status_url': f"/admin/advice/{job['id']}"}), 202
+
+
+@admin_bp.route('/admin/advice/<job_id>', methods=['GET'])
+def admin_get_advice(job_id: str) -> JsonResponse:
+    """
+    Admin route reporting an advice job's progress and the ideas generated so far, keyed by coordinator email.
+    Pass `email` to get a single coordinator's result.
+    """
+    job: Optional[Dict] = read_job(job_id)
+    if not job or job.get('type') != 'advice':
+        return jsonify({'error': 'Job not found'}), 404
+    email: Optional[str] = request.args.get('email')
+    if email:
+        if email not in job['results']:
+            return jsonify({'error': f'No result for {email} in this job'}), 404
+        return jsonify(job['results'][email]), 200
+    return jsonify(job), 200
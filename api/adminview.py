@@ -1,13 +1,17 @@
-from flask import render_template_string, Blueprint, jsonify, current_app
+from flask import render_template_string, Blueprint, jsonify, current_app, request
 import requests
 from utility_services import authenticate
-from typing import List, Dict
+from pb_client import get_client, MAX_PAGE_SIZE
+from admin import ADMIN_PAGE_SIZE, fetch_record_summary_page, get_record_summary_pages
+from db_schema import SCHEMAS
+from typing import Dict, Tuple
 from datetime import datetime
-import os
 from zoneinfo import ZoneInfo
 
 admin_frontend = Blueprint('admin_frontend', __name__)
 
+SORT_ORDERS = ('created', '-created')  # Dashboard records are sorted by PocketBase on their creation date
+
 
 
 def format_date_aest(value):
@@ -180,6 +184,18 @@ HTML_TEMPLATE = """
             white-space: nowrap;
             width: 1%;
         }
+        .pagination {
+            display: flex;
+            align-items: center;
+            justify-content: space-between;
+            margin-top: 10px;
+            color: #666;
+            font-size: 0.9em;
+        }
+        .sort-link {
+            color: #495057;
+            margin-left: 10px;
+        }
         @media (max-width: 768px) {
             .detail-row {
                 flex-wrap: wrap; 
@@ -201,16 +217,31 @@ HTML_TEMPLATE = """
         <div>
             <span class="stats">Total Collections: {{ total_collections }}</span>
             <span class="stats">Total Records: {{ total_records }}</span>
+            {% if sort == '-created' %}
+            <a class="sort-link" href="?sort=created&per_page={{ per_page }}">Show oldest first</a>
+            {% else %}
+            <a class="sort-link" href="?sort=-created&per_page={{ per_page }}">Show newest first</a>
+            {% endif %}
+            <button class="download-btn" id="download-selected" onclick="downloadSelected()" disabled>
+                ↓ Download selected as ZIP
+            </button>
         </div>
     </div>
     
-    {% for milestone, records in records_by_milestone.items() %}
+    {% for milestone, page in pages.items() %}
+    {% set records = page['items'] %}
     <div class="collection-section">
         <h2>{{ milestone }}</h2>
+        <div>
+            <a class="sort-link" href="/api/export_collection/{{ milestone }}?format=xlsx">Export all as XLSX</a>
+            <a class="sort-link" href="/api/export_collection/{{ milestone }}?format=csv">Export all as CSV</a>
+            <a class="sort-link" href="/api/export_records?milestone={{ milestone }}">Download all records as ZIP</a>
+        </div>
         {% if records %}
         <table>
             <thead>
                 <tr>
+                    <th></th>
                     <th>Name</th>
                     <th>ID</th>
                     <th>Email</th>
@@ -218,9 +249,10 @@ HTML_TEMPLATE = """
                     <th></th>
                 </tr>
             </thead>
-            <tbody>
+            <tbody id="records-{{ milestone }}">
                 {% for record in records %}
                 <tr>
+                    <td><input type="checkbox" class="record-select" value="{{ record.id }}" onchange="updateSelection()"></td>
                     <td onclick="showDetails('{{ record.id }}', '{{ record.milestone }}')">
                         {% if record.name %}
                             {{ record.name }}
@@ -250,6 +282,23 @@ HTML_TEMPLATE = """
                 {% endfor %}
             </tbody>
         </table>
+        <div class="pagination">
+            {% set first_row = (page['page'] - 1) * per_page + 1 %}
+            <span id="count-{{ milestone }}" data-first="{{ first_row }}">
+                Showing {{ first_row }}–{{ first_row + records | length - 1 }} of {{ page['totalItems'] }}
+            </span>
+            {% if page['page'] < page['totalPages'] %}
+            <button
+                class="download-btn"
+                id="more-{{ milestone }}"
+                data-next-page="{{ page['page'] + 1 }}"
+                data-total="{{ page['totalItems'] }}"
+                onclick="loadMore('{{ milestone }}')"
+            >
+                Load more
+            </button>
+            {% endif %}
+        </div>
         {% else %}
         <p class="empty-message">No records found in this collection.</p>
         {% endif %}
@@ -342,8 +391,114 @@ HTML_TEMPLATE = """
             }
         }
 
+        const PAGE_SIZE = {{ per_page }};
+        const SORT = '{{ sort }}';
+
+        function cell(content, onclick) {
+            const td = document.createElement('td');
+            if (content === null || content === undefined || String(content).trim() === '') {
+                td.innerHTML = '<span class="no-data">Not provided</span>';
+            } else {
+                td.textContent = content;
+            }
+            if (onclick) {
+                td.onclick = onclick;
+            }
+            return td;
+        }
+
+        function renderRow(record) {
+            const row = document.createElement('tr');
+            const open = () => showDetails(record.id, record.milestone);
+            const select = document.createElement('td');
+            const checkbox = document.createElement('input');
+            checkbox.type = 'checkbox';
+            checkbox.className = 'record-select';
+            checkbox.value = record.id;
+            checkbox.onchange = updateSelection;
+            select.appendChild(checkbox);
+            row.appendChild(select);
+            row.appendChild(cell(record.name, open));
+            row.appendChild(cell(record.id, open));
+            row.appendChild(cell(record.email, open));
+            row.appendChild(cell(record.submission_date_display, open));
+            const action = document.createElement('td');
+            action.className = 'action-cell';
+            const button = document.createElement('button');
+            button.className = 'download-btn';
+            button.title = 'Download as spreadsheet';
+            button.textContent = '↓ Download';
+            button.onclick = () => downloadSpreadsheet(record.id, record.milestone);
+            action.appendChild(button);
+            row.appendChild(action);
+            return row;
+        }
+
+        function loadMore(milestone) {
+            const button = document.getElementById(`more-${milestone}`);
+            const tbody = document.getElementById(`records-${milestone}`);
+            const page = button.dataset.nextPage;
+            button.disabled = true;
+            button.textContent = 'Loading...';
+            fetch(`/admin/records/page/${encodeURIComponent(milestone)}?page=${page}&per_page=${PAGE_SIZE}&sort=${encodeURIComponent(SORT)}`)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! status: ${response.status}`);
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    data.items.forEach(record => tbody.appendChild(renderRow(record)));
+                    const count = document.getElementById(`count-${milestone}`);
+                    const first = Number(count.dataset.first);
+                    count.textContent = `Showing ${first}–${first + tbody.rows.length - 1} of ${data.totalItems}`;
+                    if (data.page < data.totalPages) {
+                        button.dataset.nextPage = data.page + 1;
+                        button.disabled = false;
+                        button.textContent = 'Load more';
+                    } else {
+                        button.remove();
+                    }
+                })
+                .catch(error => {
+                    button.disabled = false;
+                    button.textContent = 'Retry';
+                    console.error('Error:', error);
+                });
+        }
+
+        function selectedIds() {
+            return Array.from(document.querySelectorAll('.record-select:checked')).map(box => box.value);
+        }
+
+        function updateSelection() {
+            const count = selectedIds().length;
+            const button = document.getElementById('download-selected');
+            button.disabled = count === 0;
+            button.textContent = count ? `↓ Download ${count} selected as ZIP` : '↓ Download selected as ZIP';
+        }
+
+        function downloadSelected() {
+            // A form post lets the browser save the streamed archive without buffering it in a blob
+            const form = document.createElement('form');
+            form.method = 'POST';
+            form.action = '/api/export_records';
+            selectedIds().forEach(id => {
+                const input = document.createElement('input');
+                input.type = 'hidden';
+                input.name = 'ids';
+                input.value = id;
+                form.appendChild(input);
+            });
+            document.body.appendChild(form);
+            form.submit();
+            document.body.removeChild(form);
+        }
+
         function downloadSpreadsheet(recordId, milestone) {
-            event.stopPropagation();
+            if (window.event) {
+                window.event.stopPropagation();
+            }
             const url = `/api/get_spreadsheet/${recordId}?milestone=${encodeURIComponent(milestone)}`;
             const link = document.createElement('a');
             link.href = url;
@@ -370,35 +525,54 @@ def format_date(date_str: str) -> str:
 def format_date_filter(date_str):
     return format_date(date_str)
 
+def get_page_args() -> Tuple[int, int, str]:
+    """Read the page, page size and sort order from the query string, falling back to the defaults."""
+    page: int = max(request.args.get('page', 1, type=int), 1)
+    per_page: int = min(max(request.args.get('per_page', ADMIN_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    sort: str = request.args.get('sort', '-created')
+    if sort not in SORT_ORDERS:
+        sort = '-created'
+    return page, per_page, sort
+
+
 @admin_frontend.route('/admin/dashboard')
 def admin_dashboard():
-    """Render the admin dashboard with all records"""
+    """Render the admin dashboard with the first page of records from each collection"""
     try:
-        # Make request to the API endpoint we already have
-        response = requests.get('http://localhost:5000/admin/records')
-        if response.status_code != 200:
-            return f"Error fetching records: {response.status_code}", 500
-        records = response.json()
-        # Organize records by milestone
-        records_by_milestone: Dict[str, List[Dict]] = {}
-        for record in records:
-            milestone = record['milestone']
-            if milestone not in records_by_milestone:
-                records_by_milestone[milestone] = []
-            records_by_milestone[milestone].append(record)
+        page, per_page, sort = get_page_args()
+        # Read the records in-process through the same service as the /admin/records routes
+        pages: Dict[str, Dict] = get_record_summary_pages(page, per_page, sort)
         # Calculate statistics
-        total_collections = len(records_by_milestone)
-        total_records = len(records)
+        total_collections = len(pages)
+        total_records = sum(result['totalItems'] for result in pages.values())
         return render_template_string(
             HTML_TEMPLATE,
-            records_by_milestone=records_by_milestone,
+            pages=pages,
             total_collections=total_collections,
-            total_records=total_records
+            total_records=total_records,
+            per_page=per_page,
+            sort=sort
         )
     
     except Exception as e:
         return f"Error: {str(e)}", 500
 
+
+@admin_frontend.route('/admin/records/page/<milestone>')
+def get_records_page(milestone: str):
+    """Get a page of record summaries for a collection, used by the dashboard to load more rows"""
+    if milestone not in SCHEMAS:
+        return jsonify({'error': 'Unknown milestone'}), 404
+    try:
+        page, per_page, sort = get_page_args()
+        result: Dict = fetch_record_summary_page(milestone, page, per_page, sort)
+        for record in result['items']:
+            record['submission_date_display'] = format_date(record['submission_date'])
+        return jsonify(result)
+    except requests.RequestException as e:
+        current_app.logger.exception("Error fetching records page")
+        return jsonify({'error': str(e)}), 502
+
 @admin_frontend.route('/admin/record-details/<milestone>/<record_id>')
 def get_record_details(milestone: str, record_id: str):
     """Get detailed information for a specific record from PocketBase"""
@@ -408,16 +582,10 @@ def get_record_details(milestone: str, record_id: str):
         if not auth_token:
             return jsonify({'error': 'Failed to authenticate with PocketBase'}), 500
 
-        # Construct the PocketBase request
-        url = f"{os.getenv('POCKETBASE_URL')}/api/collections/{milestone}/records/{record_id}"
-        
-        # Make request to PocketBase with authentication
-        response = requests.get(
-            url,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": auth_token
-            }
+        # Make request to PocketBase through the shared client, which attaches the admin token
+        response = get_client().get(
+            f"/api/collections/{milestone}/records/{record_id}",
+            headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 200:
@@ -0,0 +1,131 @@
+import os
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+# Backends that turn an improvement-ideas prompt into text (see gemini.py for the prompt and how the text is used).
+# ADVICE_BACKEND picks one: "gemini" calls Google's model, "local" generates ideas offline from the metrics in the
+# prompt, after a simulated delay, so the metrics -> advice pipeline can be load tested without network access or quota.
+
+ADVICE_BACKEND: str = os.getenv("ADVICE_BACKEND", "gemini")
+GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+LOCAL_ADVICE_LATENCY: float = float(os.getenv("LOCAL_ADVICE_LATENCY", 2.0))  # Seconds to generate a full response
+LOCAL_ADVICE_FIXTURE: Optional[str] = os.getenv("LOCAL_ADVICE_FIXTURE")  # Optional file returned as every response
+
+
+class AdviceBackend:
+    """
+    Generates text for a prompt. Subclasses implement generate(), and stream() if they can return text in chunks.
+    """
+    model_name: str = ""  # Part of the LLM cache key, so backends never share cached ideas
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the response in chunks as they're generated.
+        """
+        yield self.generate(prompt)
+
+
+class GeminiBackend(AdviceBackend):
+    """
+    Google's Gemini model. The SDK is imported and configured with GOOGLE_API_KEY on first use, not at import,
+    so modules built on the advice backends can be loaded without it.
+    """
+    def __init__(self, model_name: str = GEMINI_MODEL) -> None:
+        self.model_name: str = model_name
+        self._model: Any = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=os.environ['GOOGLE_API_KEY'])
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class LocalAdviceBackend(AdviceBackend):
+    """
+    Offline stand-in for the model. Each checklist item the prompt reports as not done becomes a suggestion,
+    or the text of `fixture` is returned for every prompt. Responses are deterministic and take `latency`
+    seconds, spread evenly over the lines when streamed.
+    """
+    model_name: str = "local"
+    NOT_DONE = re.compile(r"^\s*- Not done(?: \((\d+)/(\d+)\))?: (.+?)\.?\s*$", re.MULTILINE)
+
+    def __init__(self, latency: float = LOCAL_ADVICE_LATENCY, fixture: Optional[str] = None) -> None:
+        self.latency: float = latency
+        self.fixture: Optional[str] = fixture
+
+    def lines(self, prompt: str) -> List[str]:
+        if self.fixture is not None:
+            return self.fixture.splitlines(keepends=True)
+        ideas: List[str] = []
+        for missed, submissions, description in self.NOT_DONE.findall(prompt):
+            reminder: str = f" (missed in {missed} of {submissions} submissions)" if submissions else ""
+            ideas.append(f"- Prioritize this checklist item{reminder}: {description}.\n")
+        return ideas or ["- All checklist items are complete; keep the current practices in place.\n"]
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return "".join(self.lines(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        lines: List[str] = self.lines(prompt)
+        for line in lines:
+            time.sleep(self.latency / len(lines))
+            yield line
+
+
+def create_advice_backend(name: str = ADVICE_BACKEND) -> AdviceBackend:
+    """
+    Build the backend named by ADVICE_BACKEND.
+
+    Raises:
+        ValueError: If the name isn't a known backend.
+    """
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "local":
+        fixture: Optional[str] = None
+        if LOCAL_ADVICE_FIXTURE:
+            with open(LOCAL_ADVICE_FIXTURE) as fixture_file:
+                fixture = fixture_file.read()
+        return LocalAdviceBackend(fixture=fixture)
+    raise ValueError(f"Unknown ADVICE_BACKEND {name!r}, expected 'gemini' or 'local'")
+
+
+_backend: Optional[AdviceBackend] = None
+_backend_lock: threading.Lock = threading.Lock()
+
+
+def get_advice_backend() -> AdviceBackend:
+    """
+    Return the configured advice backend, creating it on first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_advice_backend()
+    return _backend
+
+
+def set_advice_backend(backend: Optional[AdviceBackend]) -> None:
+    """Replace the advice backend, e.g. with a LocalAdviceBackend without latency in tests. None restores the configured one."""
+    global _backend
+    _backend = backend
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+from flask import current_app
+from db_schema import SCHEMAS
+from gemini import generate_ideas, get_cached_ideas
+import jobs
+from jobs import UNFINISHED_STATUSES, claim_job, get_executor, now, read_job, write_job
+from metrics import milestone_submission_fields, summarize_submission
+from pb_client import get_client
+from spreadsheets import term_range_filter
+from utility_services import with_app_context
+
+# Improvement ideas for every coordinator who submitted to a term, generated as a background job.
+# Metrics for the whole term are gathered with one pass over each milestone collection, then Gemini is queried
+# for each coordinator with bounded concurrency under a token bucket, backing off when it returns 429.
+# Results are stored in the job record in the spool (see jobs.py), and ideas are cached as usual (see llm_cache.py),
+# so coordinators whose metrics haven't changed since the last round cost no API calls.
+
+ADVICE_CONCURRENCY: int = int(os.getenv("ADVICE_CONCURRENCY", 4))  # Gemini requests in flight at once
+ADVICE_REQUESTS_PER_MINUTE: float = float(os.getenv("ADVICE_REQUESTS_PER_MINUTE", 15))  # The free tier allows 15 for gemini-1.5-flash
+ADVICE_MAX_RETRIES: int = int(os.getenv("ADVICE_MAX_RETRIES", 5))
+ADVICE_RETRY_BACKOFF: float = float(os.getenv("ADVICE_RETRY_BACKOFF", 2.0))  # Sleeps 2s, 4s, 8s... after a 429
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: acquire() takes a token, waiting for one to be added if the bucket is empty.
+    Tokens are added at `rate` per second, up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.tokens: float = capacity
+        self.updated: float = time.monotonic()
+        self.lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                current: float = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (current - self.updated) * self.rate)
+                self.updated = current
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait: float = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Whether an API error is a 429. Google's ResourceExhausted and HTTP errors both carry the status as `code`.
+    """
+    try:
+        return int(getattr(error, "code", 0) or 0) == 429
+    except (TypeError, ValueError):
+        return False
+
+
+def collect_term_metrics(term_start_date: date) -> Dict[str, Dict[str, Any]]:
+    """
+    Gather the metrics of every coordinator who submitted to a term, reading each milestone collection once.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Metrics keyed by email, shaped like metrics.get_user_metrics() but only
+        covering the term's submissions.
+
+    Raises:
+        requests.RequestException: If a milestone collection couldn't be read.
+    """
+    record_filter: Optional[str] = term_range_filter(term_start_date, term_start_date)
+
+    def read_milestone(milestone: str) -> List[Dict[str, Any]]:
+        return list(get_client().iter_records(
+            milestone, fields=milestone_submission_fields(milestone), filter=record_filter))
+
+    metrics: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=len(SCHEMAS)) as executor:
+        fetch = with_app_context(read_milestone)
+        for milestone, records in zip(SCHEMAS.keys(), executor.map(fetch, SCHEMAS.keys())):
+            for record in records:
+                email: Optional[str] = record.get("email")
+                if email:
+                    metrics.setdefault(email, {"email": email, "submissions": []})["submissions"].append(
+                        summarize_submission(milestone, record))
+    return metrics
+
+
+def generate_with_retry(metrics: Dict[str, Any], bucket: TokenBucket) -> List[str]:
+    """
+    Improvement ideas for one coordinator: from the cache, or from Gemini once the bucket allows another request.
+    Rate limited requests are retried with exponential backoff.
+    """
+    cached: Optional[List[str]] = get_cached_ideas(metrics)
+    if cached is not None:
+        return cached
+    for attempt in range(ADVICE_MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            return generate_ideas(metrics)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == ADVICE_MAX_RETRIES:
+                raise
+            current_app.logger.warning(f"Gemini rate limited the request for {metrics['email']}, retrying.")
+        time.sleep(ADVICE_RETRY_BACKOFF * 2 ** attempt)
+
+
+def submit_advice_job(term_start_date: date) -> Dict[str, Any]:
+    """
+    Queue a job generating improvement ideas for every coordinator who submitted to a term.
+
+    Returns:
+        Dict[str, Any]: The new job record.
+    """
+    os.makedirs(jobs.SPOOL_DIR, exist_ok=True)
+    job: Dict[str, Any] = {
+        "id": uuid.uuid4().hex,
+        "type": "advice",
+        "status": "queued",
+        "term_start_date": term_start_date.isoformat(),
+        "created": now(),
+        "total": None,
+        "completed": 0,
+        "failed": 0,
+        "results": {},
+        "error": None,
+    }
+    write_job(job)
+    get_executor("advice").submit(with_app_context(run_advice_job), job["id"])
+    current_app.logger.info(f"Queued advice job {job['id']} for the term starting {job['term_start_date']}.")
+    return job
+
+
+def run_advice_job(job_id: str) -> None:
+    """
+    Generate the ideas for an advice job, recording each coordinator's result in its job record.
+    A job resumed after a restart starts over, but coordinators it already covered are answered from the cache.
+    """
+    with claim_job(job_id) as claimed:
+        if not claimed:
+            return
+        job: Optional[Dict[str, Any]] = read_job(job_id)
+        if not job or job["status"] not in UNFINISHED_STATUSES:
+            return
+        job.update({"status": "running", "started": now(), "results": {}, "completed": 0, "failed": 0})
+        write_job(job)
+        try:
+            term_metrics: Dict[str, Dict[str, Any]] = collect_term_metrics(date.fromisoformat(job["term_start_date"]))
+            job["total"] = len(term_metrics)
+            write_job(job)
+            bucket: TokenBucket = TokenBucket(ADVICE_REQUESTS_PER_MINUTE / 60)
+            generate: Callable = with_app_context(generate_with_retry)
+            with ThreadPoolExecutor(max_workers=ADVICE_CONCURRENCY, thread_name_prefix="advice") as executor:
+                futures: Dict[Future, str] = {
+                    executor.submit(generate, metrics, bucket): email for email, metrics in term_metrics.items()
+                }
+                for future in as_completed(futures):
+                    email: str = futures[future]
+                    try:
+                        job["results"][email] = {"status": "completed", "ideas": future.result()}
+                        job["completed"] += 1
+                    except Exception as e:
+                        current_app.logger.error(f"Failed to generate improvement ideas for {email}: {e}")
+                        job["results"][email] = {"status": "failed", "error": str(e)}
+                        job["failed"] += 1
+                    write_job(job)
+            job["status"] = "failed" if job["failed"] and not job["completed"] else "completed"
+            current_app.logger.info(
+                f"Advice job {job_id}: ideas generated for {job['completed']} of {job['total']} coordinators.")
+        except Exception as e:
+            current_app.logger.exception(f"Advice job {job_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        job["finished"] = now()
+        write_job(job)
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
 from flask_cors import CORS
 from core_api_logic import *
 from utility_services import *
@@ -6,59 +6,89 @@ from metrics import get_user_metrics
 from admin import admin_bp
 from spreadsheets import *
 from handle_PB import *
+import json
 import signal
 from datetime import datetime
 from adminview import admin_frontend
 from home import home
+from jobs import read_job, resume_jobs, submit_spreadsheet_job
+from gemini import stream_course_improvement_ideas
+from typing import Iterable, Iterator, Optional
 
 
-def startup():
+api = Blueprint('api', __name__)
+
+
+def create_app(manage_pocketbase: bool = True, reconcile_schemas: bool = True) -> Flask:
+    """
+    Create and configure the application.
+
+    Args:
+        manage_pocketbase (bool): Start PocketBase if it isn't running and stop it when this process exits.
+            Off when a process supervisor (e.g. the gunicorn master, see gunicorn.conf.py) manages PocketBase
+            for several worker processes.
+        reconcile_schemas (bool): Create or update the collections in PocketBase. Off when the supervisor has
+            already done so, in which case their field names are only read.
+    """
     app = Flask(__name__)
     CORS(app)
     setup_logging(app)
     app.register_blueprint(home) 
     app.register_blueprint(admin_bp)
     app.register_blueprint(admin_frontend)
-    # Check if PocketBase is running, if not, start it
-    ensure_pocketbase_running(app)
+    app.register_blueprint(api)
+    if manage_pocketbase:
+        # Check if PocketBase is running, if not, start it
+        ensure_pocketbase_running(app)
     with app.app_context():
-        initialize_collections()  # Initialize DB collections in PocketBase
+        initialize_collections(reconcile=reconcile_schemas)  # Initialize DB collections in PocketBase
+        resume_jobs()  # Pick up jobs left unfinished by the last run, or by the worker this one replaces
+    if manage_pocketbase:
         # End pocketbase if the application is closed
-    signal.signal(signal.SIGINT, lambda s, f: handle_exit_signals(s, f, app))
-    signal.signal(signal.SIGTERM, lambda s, f: handle_exit_signals(s, f, app))
+        signal.signal(signal.SIGINT, lambda s, f: handle_exit_signals(s, f, app))
+        signal.signal(signal.SIGTERM, lambda s, f: handle_exit_signals(s, f, app))
     return app
 
 
-app = startup()
+def startup():
+    return create_app()
+
 
+def __getattr__(name: str):
+    # `from app import app` still works, but the application (and PocketBase) is only started on first use,
+    # so importing this module to get create_app() has no side effects
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-@app.route('/api/submit_form', methods=['POST'])
+@api.route('/api/submit_form', methods=['POST'])
 def submit_form():  # Post new entries to database
     return form_submit()
 
 
-@app.errorhandler(404)  # Handle and write 404s to logs.
+@api.app_errorhandler(404)  # Handle and write 404s to logs.
 def page_not_found(error):
-    app.logger.error(
+    current_app.logger.error(
         f"Attempted access to invalid URL: {request.url}: error: {error}")
     return jsonify({"Error": "Requested resource was not found on the server"}), 404
 
 
-@app.route("/api/delete_record/<record_id>", methods=["DELETE"])
+@api.route("/api/delete_record/<record_id>", methods=["DELETE"])
 def delete_record(record_id):
     term_start_date_str = request.args.get('term_start_date')
     if not term_start_date_str:
-        return app.logger.error({"error": "Term start date not provided"}), 400
+        return current_app.logger.error({"error": "Term start date not provided"}), 400
     try:
         # Parse the period from the request parameters
         term_start_date = datetime.fromisoformat(term_start_date_str).date()
     except ValueError:
-        return app.logger.error({"error": "Invalid term start date format"}), 400
+        return current_app.logger.error({"error": "Invalid term start date format"}), 400
     return delete_logic(record_id, term_start_date)
 
 
-@app.route("/api/get_record/<record_id>", methods=["GET"])
+@api.route("/api/get_record/<record_id>", methods=["GET"])
 def get_record(record_id):
     term_start_date_str = request.args.get('term_start_date')
     if not term_start_date_str:
@@ -66,47 +96,124 @@ def get_record(record_id):
     try:
         term_start_date = datetime.fromisoformat(term_start_date_str).date()
     except ValueError:
-        return app.logger.error({"error": "Invalid term start date format"}), 400
+        return current_app.logger.error({"error": "Invalid term start date format"}), 400
     return get_logic(record_id, term_start_date)
 
 
-@app.route("/api/update_record/<record_id>", methods=["PATCH"])
+@api.route("/api/update_record/<record_id>", methods=["PATCH"])
 def update_record(record_id):
     term_start_date_str = request.args.get('term_start_date')
     if not term_start_date_str:
-        return app.logger.error({"error": "Need to provide term start date."}), 400
+        return current_app.logger.error({"error": "Need to provide term start date."}), 400
     try:
         term_start_date = datetime.fromisoformat(term_start_date_str).date()
     except ValueError:
-        return app.logger.error({"error": "Invalid term start date format"}), 400
+        return current_app.logger.error({"error": "Invalid term start date format"}), 400
     return update_logic(record_id, term_start_date)
 
 
-@app.route("/api/add_spreadsheet", methods=["POST"])
+@api.route("/api/add_spreadsheet", methods=["POST"])
 def add_spreadsheet():
     sem = request.args.get('academicPeriod', "Term") 
+    if request.args.get('async', '').lower() == "true":  # Queue the upload and return a job to poll
+        file, error = get_uploaded_file()
+        if error:
+            return error
+        job = submit_spreadsheet_job(file, sem=sem == "Semester", bulk=request.args.get('mode') == "bulk")
+        return jsonify({"job_id": job["id"], "status": job["status"], "status_url": f"/api/jobs/{job['id']}"}), 202
+    if request.args.get('mode') == "bulk":  # One submission per row
+        return parse_spreadsheet_bulk(sem=sem == "Semester")
     return parse_spreadsheet(sem=True) if sem == "Semester" else parse_spreadsheet()
 
 
-@app.route("/api/get_spreadsheet/<record_id>", methods=["GET"])
+@api.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = read_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+@api.route("/api/get_spreadsheet/<record_id>", methods=["GET"])
 def get_spreadsheet(record_id):
     term_start_date = request.args.get('term_start_date')
     collection_name = request.args.get('milestone')
     if not term_start_date and not collection_name:
-        return app.logger.error({"error": "Need to provide either collection name or term start date in request parameters."}), 400
+        return current_app.logger.error({"error": "Need to provide either collection name or term start date in request parameters."}), 400
     try:
         if term_start_date:
             term_start_date = datetime.fromisoformat(term_start_date).date()
     except ValueError:
-        return app.logger.error({"error": "Invalid term start date format"}), 400
+        return current_app.logger.error({"error": "Invalid term start date format"}), 400
     return export_spreadsheet(record_id, term_start_date, collection_name)
 
 
-@app.route('/api/metrics/<record_id>', methods=['GET'])
+@api.route("/api/export_collection/<milestone>", methods=["GET"])
+def export_milestone(milestone):
+    file_format = request.args.get('format', 'xlsx').lower()
+    try:
+        term_start_from = request.args.get('term_start_from')
+        term_start_to = request.args.get('term_start_to')
+        term_start_from = datetime.fromisoformat(term_start_from).date() if term_start_from else None
+        term_start_to = datetime.fromisoformat(term_start_to).date() if term_start_to else None
+    except ValueError:
+        return jsonify({"error": "Invalid term start date format"}), 400
+    return export_collection(milestone, file_format, term_start_from, term_start_to)
+
+
+@api.route("/api/export_records", methods=["GET", "POST"])
+def export_records():  # Takes record IDs as JSON, form fields or a comma separated query argument
+    body = request.get_json(silent=True) or {}
+    record_ids = body.get('ids') or request.form.getlist('ids') or [
+        record_id for record_id in request.args.get('ids', '').split(',') if record_id]
+    milestone = body.get('milestone') or request.values.get('milestone')
+    try:
+        term_start_from = body.get('term_start_from') or request.values.get('term_start_from')
+        term_start_to = body.get('term_start_to') or request.values.get('term_start_to')
+        term_start_from = datetime.fromisoformat(term_start_from).date() if term_start_from else None
+        term_start_to = datetime.fromisoformat(term_start_to).date() if term_start_to else None
+    except ValueError:
+        return jsonify({"error": "Invalid term start date format"}), 400
+    return export_records_zip(record_ids, milestone, term_start_from, term_start_to)
+
+
+@api.route('/api/metrics/<record_id>', methods=['GET'])
 def user_metrics(record_id): # More accurately get user data
     return jsonify(get_user_metrics(record_id))
 
 
+def sse_event(data: object, event: Optional[str] = None) -> str:
+    """
+    Format one server-sent event, with its data encoded as JSON.
+    """
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+
+def sse_ideas(ideas: Iterable[str]) -> Iterator[str]:
+    """
+    Send each idea as an event as soon as it's generated, then a "done" event, or an "error" event if generation fails.
+    """
+    count: int = 0
+    try:
+        for idea in ideas:
+            count += 1
+            yield sse_event(idea)
+    except Exception as e:
+        current_app.logger.exception(f"Issue streaming improvement ideas from Gemini: {e}")
+        yield sse_event({"error": "Failed to generate improvement ideas"}, event="error")
+        return
+    yield sse_event({"count": count}, event="done")
+
+
+@api.route('/api/improvement_ideas/<email>/stream', methods=['GET'])
+def stream_improvement_ideas(email):  # Server-sent events, one per idea
+    return Response(
+        stream_with_context(sse_ideas(stream_course_improvement_ideas(email))),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Stop proxies buffering the stream
+    )
+
+
 if __name__ == "__main__":
-    app.run(debug=True, port=5000) # Turn debug to false in prod, and add app.config['ENV'] = 'production'
+    create_app().run(debug=True, port=5000) # Development server, see wsgi.py and gunicorn.conf.py for production
 
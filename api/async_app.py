@@ -0,0 +1,311 @@
+import asyncio
+import functools
+import os
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from quart import Quart, Response, jsonify, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from app import app as flask_app
+from async_pb_client import close_async_client, get_async_client
+from date import determine_form
+from db_schema import SCHEMAS
+from db_util import (forget_record_location, get_collection_fields, get_record_location,
+                     peek_collection_fields, remember_record_location)
+from metrics import (cached_user_metrics, email_filter, invalidate_user_metrics, milestone_submission_fields,
+                     store_user_metrics, summarize_submission)
+from spreadsheets import render_record_workbook
+
+# Async (ASGI) variant of the core record API, served with hypercorn:
+#
+#   python async_app.py            or            hypercorn async_app:asgi_app --bind 0.0.0.0:5000
+#
+# The endpoints below have the same URLs and payloads as their Flask views in app.py, but talk to PocketBase
+# through one shared httpx connection pool, so a single process can hold hundreds of in-flight requests.
+# Every other URL (dashboard, spreadsheets upload, exports...) is passed through to the Flask app.
+# Importing app starts the Flask app as usual, so PocketBase is checked and the collections synced first.
+
+app = Quart(__name__)
+logger = flask_app.logger
+
+
+def flask_context(view: Callable) -> Callable:
+    """
+    Run an async view inside the Flask app context, so helpers shared with the Flask app can use current_app.
+    """
+    @functools.wraps(view)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with flask_app.app_context():
+            return await view(*args, **kwargs)
+    return wrapper
+
+
+def parse_term_start_date(value: Optional[str]) -> Optional[date]:
+    """
+    Parse the term_start_date query argument. Raises ValueError if it's malformed.
+    """
+    return datetime.fromisoformat(value).date() if value else None
+
+
+async def fetch_record(milestone: str, record_id: str) -> Optional[Dict[str, Any]]:
+    response: httpx.Response = await get_async_client().get(f"/api/collections/{milestone}/records/{record_id}")
+    return response.json() if response.status_code == 200 else None
+
+
+async def locate_record(record_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Async counterpart of db_util.locate_record, sharing its record locations: a known location is fetched
+    directly, otherwise every milestone collection is queried at once and the first hit is returned.
+    """
+    milestone: Optional[str] = get_record_location(record_id)
+    if milestone:
+        try:
+            record: Optional[Dict[str, Any]] = await fetch_record(milestone, record_id)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to query {milestone} for record {record_id}, querying every milestone: {e}")
+            record = None
+        if record:
+            return milestone, record
+        forget_record_location(record_id)  # Stale entry, e.g. deleted outside this process
+
+    pending: Dict[asyncio.Task, str] = {
+        asyncio.ensure_future(fetch_record(milestone, record_id)): milestone for milestone in SCHEMAS.keys()
+    }
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                milestone = pending.pop(task)
+                try:
+                    record = task.result()
+                except httpx.HTTPError as e:
+                    logger.warning(f"Failed to query {milestone} for record {record_id}: {e}")
+                    continue
+                if record:
+                    remember_record_location(record_id, milestone)
+                    return milestone, record
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get_milestone_submissions(milestone: str, email: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Async counterpart of metrics.get_milestone_submissions.
+    """
+    try:
+        return [
+            summarize_submission(milestone, submission)
+            async for submission in get_async_client().iter_records(
+                milestone, fields=milestone_submission_fields(milestone), filter=email_filter(email))
+        ]
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to retrieve submissions for {milestone}: {e}")
+        return None
+
+
+@app.route('/api/submit_form', methods=['POST'])
+@flask_context
+async def submit_form():  # Post new entries to database
+    form_data = await request.get_json()
+    try:
+        term_start_date: datetime = datetime.strptime(form_data.get("term_start_date"), "%Y-%m-%d")
+    except Exception:
+        logger.error("Error retrieving start_data from form")
+        return jsonify({"error": "Invalid date format"}), 400
+    milestone: Optional[str] = determine_form(term_start_date)
+    if not milestone:
+        logger.error("Could not find active milestone for the current date")
+        return jsonify({"message": "No active milestone for the current date"}), 400
+    if not await get_async_client().token():
+        logger.error("Error authenticating with PB")
+        return jsonify({"error": "Failed to authenticate with PocketBase"}), 500
+    # Syncing the registry makes blocking requests, so if it's needed it's handed to a thread
+    fields: List[str] = peek_collection_fields(milestone) or await asyncio.to_thread(get_collection_fields, milestone)
+    record_data = {field: form_data.get(field) for field in fields}
+    try:
+        response: httpx.Response = await get_async_client().post(
+            f"/api/collections/{milestone}/records", json=record_data)
+    except httpx.HTTPError as e:
+        logger.exception(f"An unexpected error occurred while submitting the form: {e}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+    if response.status_code in [200, 201]:
+        record_id = response.json().get("id")
+        remember_record_location(record_id, milestone)
+        invalidate_user_metrics(record_data.get("email"))
+        return jsonify({"message": "Form submission successful", "record_id": record_id}), 200
+    logger.error(f"Failed to submit form, error: {response.text}")
+    return jsonify({"message": "Failed to submit form", "error": response.text}), 400
+
+
+@app.route("/api/delete_record/<record_id>", methods=["DELETE"])
+@flask_context
+async def delete_record(record_id):
+    try:
+        term_start_date = parse_term_start_date(request.args.get('term_start_date'))
+    except ValueError:
+        return jsonify({"error": "Invalid term start date format"}), 400
+    if not term_start_date:
+        return jsonify({"error": "Term start date not provided"}), 400
+    collection_name: str = f"{determine_form(term_start_date)}"
+    try:
+        response: httpx.Response = await get_async_client().delete(
+            f"/api/collections/{collection_name}/records/{record_id}")
+    except httpx.HTTPError as e:
+        logger.exception(f"An unexpected error occurred while deleting the record: {e}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+    if response.status_code == 204:
+        forget_record_location(record_id)
+        invalidate_user_metrics()  # The deleted record's email isn't known here
+        logger.info(f"Record deleted successfully: record_id={record_id}")
+        return "", 204
+    if response.status_code == 404:
+        logger.error(f"Attempted deletion of non-existent record, record_id={record_id}")
+        return jsonify({"error": "Record not found"}), 404
+    logger.error(f"Failed to delete record. Status code: {response.status_code}, Response: {response.text}")
+    return jsonify({"error": "Failed to delete record", "details": response.text}), response.status_code
+
+
+@app.route("/api/get_record/<record_id>", methods=["GET"])
+@flask_context
+async def get_record(record_id):
+    try:
+        term_start_date = parse_term_start_date(request.args.get('term_start_date'))
+    except ValueError:
+        return jsonify({"error": "Invalid term start date format"}), 400
+    try:
+        if term_start_date is None:  # Without a term start date the record's collection has to be looked up
+            located = await locate_record(record_id)
+            if not located:
+                logger.error(f"Record not found: record_id={record_id}")
+                return jsonify({"error": "Record not found"}), 404
+            return jsonify({"reponse data": located[1], "record_id": record_id}), 200
+        response: httpx.Response = await get_async_client().get(
+            f"/api/collections/{determine_form(term_start_date)}/records/{record_id}")
+    except httpx.HTTPError as e:
+        logger.exception(f"An unexpected error occurred while retrieving the record: {e}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+    if response.status_code == 200:
+        return jsonify({"reponse data": response.json(), "record_id": record_id}), 200
+    if response.status_code == 404:
+        logger.error(f"Record not found: record_id={record_id}")
+        return jsonify({"error": "Record not found"}), 404
+    logger.error(f"Failed to retrieve record. Status code: {response.status_code}, Response: {response.text}")
+    return jsonify({"error": "Failed to retrieve record", "details": response.text}), response.status_code
+
+
+@app.route("/api/update_record/<record_id>", methods=["PATCH"])
+@flask_context
+async def update_record(record_id):
+    try:
+        term_start_date = parse_term_start_date(request.args.get('term_start_date'))
+    except ValueError:
+        return jsonify({"error": "Invalid term start date format"}), 400
+    if not term_start_date:
+        return jsonify({"error": "Need to provide term start date."}), 400
+    data = await request.get_json(silent=True)
+    if not data:
+        logger.error("No JSON data provided in the request.")
+        return jsonify({"error": "No JSON data provided"}), 400
+    try:
+        response: httpx.Response = await get_async_client().patch(
+            f"/api/collections/{determine_form(term_start_date)}/records/{record_id}", json=data)
+    except httpx.HTTPError as e:
+        logger.exception(f"An unexpected error occurred while updating the record: {e}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+    if response.status_code == 200:
+        invalidate_user_metrics()  # The record may have been moved off its previous email
+        logger.info(f"Record updated successfully: {response.json()}")
+        return jsonify(response.json()), 200
+    if response.status_code == 404:
+        logger.error(f"Record not found for updating: record_id={record_id}")
+        return jsonify({"error": "Record not found"}), 404
+    logger.error(f"Failed to update record. Status code: {response.status_code}, Response: {response.text}")
+    return jsonify({"error": "Failed to update record", "details": response.text}), response.status_code
+
+
+@app.route("/api/get_spreadsheet/<record_id>", methods=["GET"])
+@flask_context
+async def get_spreadsheet(record_id):
+    collection_name: Optional[str] = request.args.get('milestone')
+    try:
+        term_start_date = parse_term_start_date(request.args.get('term_start_date'))
+    except ValueError:
+        return jsonify({"error": "Invalid term start date format"}), 400
+    if not term_start_date and not collection_name:
+        return jsonify({"error": "Need to provide either collection name or term start date in request parameters."}), 400
+    try:
+        record: Optional[Dict[str, Any]] = None
+        if term_start_date is None:
+            record = await fetch_record(collection_name, record_id)
+        else:
+            record = await fetch_record(determine_form(term_start_date), record_id)
+    except httpx.HTTPError as e:
+        logger.exception(f"An unexpected error occurred while exporting the spreadsheet: {e}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+    if not record:
+        return jsonify({"error": "Record not found"}), 404
+    workbook: bytes = await asyncio.to_thread(render_record_workbook, record_id, record)  # CPU bound
+    logger.info(f"Exported record {record_id} to spreadsheet.")
+    return Response(
+        workbook,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        headers={"Content-Disposition": f"attachment; filename=record_{record_id}.xlsx"}
+    )
+
+
+@app.route('/api/metrics/<record_id>', methods=['GET'])
+@flask_context
+async def user_metrics(record_id):  # More accurately get user data
+    cached, generation = cached_user_metrics(record_id)
+    if cached:
+        return jsonify(cached)
+    computed_at: float = time.monotonic()
+    results = await asyncio.gather(*(get_milestone_submissions(milestone, record_id) for milestone in SCHEMAS.keys()))
+    return jsonify(store_user_metrics(record_id, list(results), generation, computed_at))
+
+
+@app.after_serving
+async def shutdown() -> None:
+    await close_async_client()
+
+
+class FlaskFallback:
+    """
+    ASGI middleware around the Quart app: HTTP requests for the async endpoints are handled by Quart,
+    and any other request is passed through to the Flask app.
+    """
+    def __init__(self, quart_asgi_app: Callable) -> None:
+        self.quart_asgi_app: Callable = quart_asgi_app
+        self.flask_app: AsyncioWSGIMiddleware = AsyncioWSGIMiddleware(flask_app)
+        self.routes = app.url_map.bind("")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "http":
+            try:
+                self.routes.match(scope["path"], scope["method"])
+            except (NotFound, MethodNotAllowed):
+                await self.flask_app(scope, receive, send)
+                return
+        await self.quart_asgi_app(scope, receive, send)
+
+
+# Wrapping asgi_app rather than the app keeps Quart's test client and lifespan handling working on the whole stack
+app.asgi_app = FlaskFallback(app.asgi_app)
+asgi_app = app  # Entry point for the ASGI server
+
+
+def main() -> None:
+    config: Config = Config()
+    config.bind = [f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '5000')}"]
+    config.accesslog = "-"
+    asyncio.run(serve(asgi_app, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from flask import current_app
+from pb_client import CONNECT_TIMEOUT, MAX_PAGE_SIZE, MAX_RETRIES, READ_TIMEOUT, RETRY_BACKOFF
+from utility_services import get_url, token_manager
+
+# Async counterpart of pb_client for the ASGI app (async_app.py).
+# A single httpx connection pool is shared by every request handled on the event loop.
+
+ASYNC_POOL_SIZE: int = int(os.getenv("PB_ASYNC_POOL_SIZE", 100))  # Connections shared by all in-flight requests
+
+
+class AsyncPocketBaseClient:
+    """
+    Pooled async HTTP client for the PocketBase REST API, with the same behaviour as PocketBaseClient:
+    idempotent verbs are retried with exponential backoff on connection errors and 502/503/504 responses,
+    and the admin token is attached and refreshed automatically.
+    """
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    RETRY_STATUSES = frozenset({502, 503, 504})
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = ASYNC_POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = RETRY_BACKOFF,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        self.max_retries: int = max_retries
+        self.backoff_factor: float = backoff_factor
+        self.client: httpx.AsyncClient = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport
+        )
+
+    async def token(self) -> Optional[str]:
+        """
+        Return the admin token without blocking the event loop.
+        """
+        # Refreshing the token is a blocking call, so it's handed to a thread; the common case doesn't block
+        return token_manager.peek() or await asyncio.to_thread(token_manager.get_token)
+
+    async def _send(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        attempts: int = self.max_retries + 1 if method in self.IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            try:
+                response: httpx.Response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError:
+                if attempt == attempts - 1:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt == attempts - 1:
+                    return response
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def request(self, method: str, path: str, authorize: bool = True, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request to PocketBase. When `authorize` is set the admin token is attached, and a 401
+        invalidates the cached token and retries the request once with a fresh one.
+        """
+        headers: Dict[str, str] = dict(kwargs.pop("headers", None) or {})
+        if not authorize:
+            return await self._send(method, path, headers=headers, **kwargs)
+        token: Optional[str] = await self.token()
+        headers["Authorization"] = token or ""
+        response: httpx.Response = await self._send(method, path, headers=headers, **kwargs)
+        if response.status_code == 401:
+            current_app.logger.warning("PocketBase rejected the cached admin token, re-authenticating.")
+            token_manager.invalidate(token)
+            headers = {**headers, "Authorization": await self.token() or ""}
+            response = await self._send(method, path, headers=headers, **kwargs)
+        return response
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", path, **kwargs)
+
+    async def iter_records(
+        self,
+        collection_name: str,
+        fields: Optional[str] = None,
+        filter: Optional[str] = None,
+        sort: Optional[str] = None,
+        per_page: int = MAX_PAGE_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every record of a collection, walking all pages of the list endpoint.
+
+        Raises:
+            httpx.HTTPStatusError: If PocketBase returns an error for any page.
+        """
+        params: Dict[str, Any] = {"perPage": per_page}
+        for name, value in (("fields", fields), ("filter", filter), ("sort", sort)):
+            if value:
+                params[name] = value
+        page: int = 1
+        while True:
+            response: httpx.Response = await self.get(
+                f"/api/collections/{collection_name}/records", params={**params, "page": page})
+            response.raise_for_status()
+            data: Dict[str, Any] = response.json()
+            items = data.get("items", [])
+            for item in items:
+                yield item
+            if page >= data.get("totalPages", 0) or len(items) < per_page:
+                return
+            page += 1
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_async_client: Optional[AsyncPocketBaseClient] = None
+
+
+def get_async_client() -> AsyncPocketBaseClient:
+    """
+    Return the async PocketBase client, creating it on first use. It belongs to the running event loop,
+    so the ASGI app closes it with close_async_client() when it stops serving.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncPocketBaseClient(get_url())
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,110 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+from typing import Any, Callable, Dict
+
+# Benchmark single-record spreadsheet parse/export: the pandas path this app used to take against the
+# openpyxl/xlsxwriter path it takes now. Each path runs in a fresh interpreter so import time and peak
+# memory aren't shared between them.
+#
+#   python bench_spreadsheets.py --rounds 200
+
+
+def sample_record() -> Dict[str, Any]:
+    """
+    A Milestone_1 submission with every field filled in, shaped like a record read back from PocketBase.
+    """
+    from db_schema import SCHEMA_INDEX
+    record: Dict[str, Any] = {"id": "abcdefghijklmno", "created": "2024-10-14 10:00:00.000Z"}
+    for name, field in SCHEMA_INDEX["Milestone_1"].by_name.items():
+        record[name] = {"bool": True, "date": "2024-10-14 00:00:00.000Z"}.get(field["type"], f"{name} response")
+    return record
+
+
+def pandas_parse(content: bytes) -> Dict[str, Any]:
+    import pandas as pd
+    df = pd.read_excel(BytesIO(content))
+    return pd.Series(df['Value'].values, index=df['Field']).to_dict()
+
+
+def pandas_export(record_id: str, record: Dict[str, Any]) -> bytes:
+    import pandas as pd
+    data = [(k, v if v else "No response provided") for k, v in record.items()]
+    df = pd.DataFrame(data, columns=["Field", "Value"]).sort_values(by="Field")
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        worksheet = writer.book.add_worksheet(f"Record{record_id}")
+        worksheet.write('A1', 'Field')
+        worksheet.write('B1', 'Value')
+        for i, (field, value) in enumerate(df.itertuples(index=False), start=1):
+            worksheet.write(i, 0, field)
+            worksheet.write(i, 1, str(value))
+    return output.getvalue()
+
+
+def fast_parse(content: bytes) -> Dict[str, Any]:
+    from werkzeug.datastructures import FileStorage
+    from spreadsheets import read_field_values
+    return read_field_values(FileStorage(stream=BytesIO(content), filename="record.xlsx"))
+
+
+def fast_export(record_id: str, record: Dict[str, Any]) -> bytes:
+    from spreadsheets import render_record_workbook
+    return render_record_workbook(record_id, record)
+
+
+def timed(func: Callable, rounds: int, *args: Any) -> float:
+    """
+    Mean latency of a call in milliseconds, after one warm-up call.
+    """
+    func(*args)
+    start: float = time.perf_counter()
+    for _ in range(rounds):
+        func(*args)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def run_path(path: str, rounds: int) -> Dict[str, float]:
+    """
+    Measure one path in this interpreter. Called in a child process by main().
+    """
+    import spreadsheets  # Flask, openpyxl and xlsxwriter, loaded by both paths
+    start: float = time.perf_counter()
+    if path == "pandas":
+        import pandas  # noqa: F401
+    import_ms: float = (time.perf_counter() - start) * 1000
+    parse, export = (pandas_parse, pandas_export) if path == "pandas" else (fast_parse, fast_export)
+    record: Dict[str, Any] = sample_record()
+    content: bytes = export(record["id"], record)
+    assert parse(content)["email"] == record["email"]
+    return {
+        "extra_import_ms": import_ms,
+        "parse_ms": timed(parse, rounds, content),
+        "export_ms": timed(export, rounds, record["id"], record),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # ru_maxrss is in KB on Linux
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=100, help="Parses and exports timed per path")
+    parser.add_argument("--path", choices=["pandas", "fast"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.path:
+        print(json.dumps(run_path(args.path, args.rounds)))
+        return
+    results: Dict[str, Dict[str, float]] = {}
+    for path in ("pandas", "fast"):
+        output: bytes = subprocess.check_output([sys.executable, __file__, "--path", path, "--rounds", str(args.rounds)])
+        results[path] = json.loads(output.decode().strip().splitlines()[-1])
+    print(f"{'':18}{'pandas':>12}{'openpyxl':>12}")
+    for metric in ("extra_import_ms", "parse_ms", "export_ms", "peak_rss_mb"):
+        print(f"{metric:18}{results['pandas'][metric]:12.1f}{results['fast'][metric]:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
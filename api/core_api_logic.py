@@ -2,10 +2,10 @@ from flask import jsonify, request, current_app, Response
 from datetime import datetime
 from typing import Optional, Dict
 from utility_services import authenticate, get_url
+from pb_client import get_client
 from date import determine_form
-from db_schema import SCHEMAS
-from db_util import create_or_update_pocketbase_collection
-import requests
+from db_util import forget_record_location, get_collection_fields, locate_record, remember_record_location
+from metrics import invalidate_user_metrics
 import requests
 from pocketbase import PocketBase
 
@@ -29,29 +29,15 @@ def form_submit() -> Response:
     if not admin_token:
         current_app.logger.error("Error authenticating with PB")
         return jsonify({"error": "Failed to authenticate with PocketBase"}), 500
-    create_or_update_pocketbase_collection(
-        collection_name=collection_name,
-        schema=SCHEMAS[milestone],
-        admin_token=admin_token,
-        collection_type='base',
-        listRule=None,
-        viewRule=None,
-        options={}
-    )
-    headers = {
-            "Authorization": f"{authenticate()}"
-        }
-    response = requests.get(f'{get_url()}/api/collections/{collection_name}', headers=headers)
-    collection_schema = response.json()
-    record_data = {field['name']: form_data.get(field['name']) for field in collection_schema['schema']}
-    headers: Dict[str, str] = {
-        "Content-Type": "application/json",
-        "Authorization": admin_token
-    }
-    url: str = f"{get_url()}/api/collections/{collection_name}/records"
-    response: requests.Response = requests.post(url, json=record_data, headers=headers)
+    # Collection schemas are reconciled at startup, so only the record itself is sent to PocketBase here
+    record_data = {field: form_data.get(field) for field in get_collection_fields(collection_name)}
+    headers: Dict[str, str] = {"Content-Type": "application/json"}
+    response: requests.Response = get_client().post(
+        f"/api/collections/{collection_name}/records", json=record_data, headers=headers)
     if response.status_code in [200, 201]:
         record_id = response.json().get("id")
+        remember_record_location(record_id, collection_name)
+        invalidate_user_metrics(record_data.get("email"))
         return jsonify({"message": "Form submission successful", "record_id": record_id}), 200
     else:
         current_app.logger.error(f"Failed to submit form, error: {response.text}")
@@ -66,12 +52,12 @@ def delete_logic(id: str, term_start_date) -> Response:
             current_app.logger.error("Failed to authenticate with PocketBase.")
             return jsonify({"error": "Failed to authenticate with PocketBase"}), 500
 
-        headers: Dict[str, str] = {"Authorization": admin_token}
-        response: requests.Response = requests.delete(
-            f"{get_url()}/api/collections/{collection_name}/records/{id}",
-            headers=headers,
+        response: requests.Response = get_client().delete(
+            f"/api/collections/{collection_name}/records/{id}"
         )
         if response.status_code == 204:
+            forget_record_location(id)
+            invalidate_user_metrics()  # The deleted record's email isn't known here
             current_app.logger.info(f"Record deleted successfully: record_id={id}")
             return "", 204
         elif response.status_code == 404:
@@ -86,17 +72,21 @@ def delete_logic(id: str, term_start_date) -> Response:
         current_app.logger.exception(f"An unexpected error occurred while deleting the record: {e}")
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
-def get_logic(id: str, term_start_date) -> Response:
+def get_logic(id: str, term_start_date=None) -> Response:
     try:
+        if term_start_date is None:  # Without a term start date the record's collection has to be looked up
+            located = locate_record(id)
+            if not located:
+                current_app.logger.error(f"Record not found: record_id={id}")
+                return jsonify({"error": "Record not found"}), 404
+            return jsonify({"reponse data": located[1], "record_id": id}), 200
         collection_name: str = f"{determine_form(term_start_date)}"  
         admin_token: Optional[str] = authenticate()
         if not admin_token:
             current_app.logger.error("Failed to authenticate with PocketBase.")
             return jsonify({"error": "Failed to authenticate with PocketBase"}), 500
-        headers: Dict[str, str] = {"Authorization": admin_token}
-        response: requests.Response = requests.get(
-            f"{get_url()}/api/collections/{collection_name}/records/{id}",
-            headers=headers,
+        response: requests.Response = get_client().get(
+            f"/api/collections/{collection_name}/records/{id}"
         )
         if response.status_code == 200:
             current_app.logger.info(f"Record retrieved successfully: {response.json()}")
@@ -123,13 +113,14 @@ def update_logic(id, term_start_date) -> Response:
         if not admin_token:
             current_app.logger.error("Failed to authenticate with PocketBase.")
             return jsonify({"error": "Failed to authenticate with PocketBase"}), 500
-        headers: Dict[str, str] = {"Authorization": admin_token, "Content-Type": "application/json"}
-        response: requests.Response = requests.patch(
-            f"{get_url()}/api/collections/{collection_name}/records/{id}",
+        headers: Dict[str, str] = {"Content-Type": "application/json"}
+        response: requests.Response = get_client().patch(
+            f"/api/collections/{collection_name}/records/{id}",
             json=data,
             headers=headers,
         )
         if response.status_code == 200:
+            invalidate_user_metrics()  # The record may have been moved off its previous email
             current_app.logger.info(f"Record updated successfully: {response.json()}")
             return jsonify(response.json()), 200
         elif response.status_code == 404:
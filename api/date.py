@@ -1,8 +1,14 @@
-import requests
-from flask import current_app
-from datetime import datetime, date
-from typing import Optional, Dict
+import logging
+import os
 import re
+import threading
+import time
+import requests
+from flask import current_app, has_app_context
+from datetime import datetime, date, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, Dict
+from zoneinfo import ZoneInfo
 
 
 def determine_form(term_start_date: Optional[date] = None, semesters=False) -> Optional[str]:
@@ -53,17 +59,98 @@ def determine_form(term_start_date: Optional[date] = None, semesters=False) -> O
     else:
         return "Milestone_1"  # Upcoming term
 
-# Poll API for AEST date-time object
+AEST_ZONE: ZoneInfo = ZoneInfo("Australia/Melbourne")
+TIME_SOURCE_URL: Optional[str] = os.getenv("TIME_SOURCE_URL")  # Optional, e.g. https://worldtimeapi.org/api/timezone/Etc/UTC
+DRIFT_CHECK_INTERVAL: float = float(os.getenv("TIME_DRIFT_CHECK_INTERVAL", 3600))  # Seconds between drift checks
+
+
+class AESTClock:
+    """
+    Local clock for the Australia/Melbourne timezone.
+
+    The current date is computed from the system clock and memoized until the next local midnight. If a time
+    source URL is configured, the system clock is compared against it in a background thread at most once per
+    drift check interval, and any offset found is applied to later readings. Pass `now` to inject a fixed clock in tests.
+    """
+
+    def __init__(
+        self,
+        now: Optional[Callable[[], datetime]] = None,
+        time_source_url: Optional[str] = TIME_SOURCE_URL,
+        drift_check_interval: float = DRIFT_CHECK_INTERVAL
+    ) -> None:
+        self._now: Callable[[], datetime] = now or (lambda: datetime.now(timezone.utc))
+        self.time_source_url: Optional[str] = time_source_url
+        self.drift_check_interval: float = drift_check_interval
+        self.offset: timedelta = timedelta(0)  # Correction applied to the system clock after a drift check
+        self._today: Optional[date] = None
+        self._valid_until: Optional[datetime] = None  # UTC instant of the next local midnight
+        self._last_drift_check: Optional[float] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def now(self) -> datetime:
+        """Current time in AEST/AEDT."""
+        return (self._now() + self.offset).astimezone(AEST_ZONE)
+
+    def today(self) -> date:
+        """Current date in Melbourne, memoized until local midnight."""
+        self._maybe_check_drift()
+        current_utc: datetime = self._now() + self.offset
+        if self._valid_until is None or current_utc >= self._valid_until:
+            local_now: datetime = current_utc.astimezone(AEST_ZONE)
+            next_midnight: datetime = datetime.combine(
+                local_now.date() + timedelta(days=1), datetime.min.time(), tzinfo=AEST_ZONE)
+            self._today = local_now.date()
+            self._valid_until = next_midnight.astimezone(timezone.utc)
+        return self._today
+
+    def _maybe_check_drift(self) -> None:
+        if not self.time_source_url:
+            return
+        with self._lock:
+            if self._last_drift_check is not None and time.monotonic() - self._last_drift_check < self.drift_check_interval:
+                return
+            self._last_drift_check = time.monotonic()
+        logger: logging.Logger = current_app.logger if has_app_context() else logging.getLogger(__name__)
+        threading.Thread(target=self.check_drift, args=(logger,), daemon=True).start()
+
+    def check_drift(self, logger: logging.Logger) -> Optional[timedelta]:
+        """
+        Compare the system clock against the configured time source and store the offset.
+        The source can return JSON with a `utc_datetime` or `datetime` entry (as worldtimeapi does),
+        otherwise the response's HTTP Date header is used.
+        """
+        try:
+            sent: datetime = self._now()
+            response: requests.Response = requests.get(self.time_source_url, timeout=(3.05, 5))
+            received: datetime = self._now()
+            response.raise_for_status()
+            try:
+                data: Dict[str, str] = response.json()
+                remote: datetime = datetime.fromisoformat(
+                    (data.get("utc_datetime") or data["datetime"]).replace("Z", "+00:00"))
+            except (ValueError, KeyError, AttributeError):
+                remote = parsedate_to_datetime(response.headers["Date"])
+            offset: timedelta = remote - (sent + (received - sent) / 2)  # Compare against the midpoint of the request
+            if abs(offset) > timedelta(seconds=1):
+                logger.warning(f"System clock differs from {self.time_source_url} by {offset.total_seconds():.1f}s, correcting.")
+            self.offset = offset
+            self._valid_until = None  # Recompute the memoized date with the corrected clock
+            return offset
+        except (requests.RequestException, KeyError, ValueError, TypeError) as e:
+            logger.error(f"An error occurred checking clock drift against {self.time_source_url}: {e}")
+            return None
+
+
+clock: AESTClock = AESTClock()
+
+
+def set_clock(new_clock: AESTClock) -> None:
+    """Replace the clock used by get_AEST_date(), e.g. with an AESTClock built on a fixed `now` in tests."""
+    global clock
+    clock = new_clock
+
+
 def get_AEST_date() -> Optional[date]:
-    api_url = "https://worldtimeapi.org/api/timezone/Australia/Melbourne"
-    try:
-        response: requests.Response = requests.get(api_url)
-        response.raise_for_status()  # Write bad status codes to logs
-        data: Dict[str, str] = response.json()
-        date_str: str = data['datetime'].split(
-            'T')[0]  # Extract the date from response
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except requests.RequestException as e:
-        current_app.logger.error(
-            f"An error occurred fetching current date from API: {e}")
-        return None
+    """Current date in Melbourne from the local clock."""
+    return clock.today()
@@ -1,4 +1,7 @@
-
+import hashlib
+import json
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Tuple
 
 #Schema for each milestone in the database
 SCHEMAS = { 
@@ -556,4 +559,39 @@ SCHEMAS = {
     }
     }
    ],
-}
\ No newline at end of file
+}
+
+
+def schema_version(schemas: dict = SCHEMAS) -> str:
+    """Hash of the schema definitions, used to tell when the collections in PocketBase need reconciling again."""
+    return hashlib.sha256(json.dumps(schemas, sort_keys=True).encode()).hexdigest()
+
+
+SCHEMA_VERSION = schema_version()
+
+
+class MilestoneIndex(NamedTuple):
+    """Read-only lookups over one milestone's schema, built once at import."""
+    fields: Tuple[str, ...]  # Field names in schema order
+    by_name: Mapping[str, Mapping[str, Any]]  # Field name -> field spec
+    names_by_type: Mapping[str, Tuple[str, ...]]  # Field type -> field names in schema order
+    checklist: Tuple[str, ...]  # Boolean checklist columns in schema order
+    required: Tuple[str, ...]  # Required field names
+
+
+def build_index(schema: List[Dict[str, Any]]) -> MilestoneIndex:
+    """Precompute the lookups for a milestone so callers don't scan the schema list for each field."""
+    names_by_type: Dict[str, List[str]] = {}
+    for field in schema:
+        names_by_type.setdefault(field["type"], []).append(field["name"])
+    return MilestoneIndex(
+        fields=tuple(field["name"] for field in schema),
+        by_name=MappingProxyType({field["name"]: MappingProxyType(dict(field)) for field in schema}),
+        names_by_type=MappingProxyType({field_type: tuple(names) for field_type, names in names_by_type.items()}),
+        checklist=tuple(names_by_type.get("bool", ())),
+        required=tuple(field["name"] for field in schema if field.get("required")),
+    )
+
+
+SCHEMA_INDEX: Mapping[str, MilestoneIndex] = MappingProxyType(
+    {milestone: build_index(schema) for milestone, schema in SCHEMAS.items()})
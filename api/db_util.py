@@ -1,12 +1,132 @@
+import os
+import re
 import requests
-from typing import Dict, Any, Optional
-from utility_services import get_url, authenticate
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from utility_services import with_app_context
+from pb_client import MAX_PAGE_SIZE, get_client
 from flask import current_app
+import db_schema
+
+
+COLLECTIONS_URL: str = "/api/collections"
+COMPARED_FIELD_KEYS: Tuple[str, ...] = ("type", "required", "unique")
+COMPARED_COLLECTION_KEYS: Tuple[str, ...] = ("type", "listRule", "viewRule")
+
+
+def list_collections() -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Fetch every collection defined in PocketBase, walking all pages of the list endpoint.
+
+    Returns:
+        Optional[Dict[str, Dict[str, Any]]]: The collections keyed by name, or None if they couldn't be listed.
+    """
+    collections: Dict[str, Dict[str, Any]] = {}
+    page: int = 1
+    while True:
+        try:
+            response: requests.Response = get_client().get(
+                COLLECTIONS_URL, params={"perPage": MAX_PAGE_SIZE, "page": page})
+        except requests.RequestException as e:
+            current_app.logger.error(f"Failed to list collections: {e}")
+            return None
+        if response.status_code != 200:
+            current_app.logger.error(f"Failed to list collections. Status code: {response.status_code}, Response: {response.text}")
+            return None
+        data: Dict[str, Any] = response.json()
+        items: List[Dict[str, Any]] = data.get("items", [])
+        collections.update((collection["name"], collection) for collection in items)
+        if page >= data.get("totalPages", 0) or len(items) < MAX_PAGE_SIZE:
+            return collections
+        page += 1
+
+
+def collection_data(collection_name: str, schema: List[Dict[str, Any]], collection_type: str = 'base', **kwargs: Any) -> Dict[str, Any]:
+    """
+    Build the request body that creates or updates a collection.
+    """
+    data: Dict[str, Any] = {
+        "name": collection_name,
+        "type": collection_type,
+        "schema": schema
+    }
+    # Include any additional fields
+    data.update(kwargs)
+    return data
+
+
+def settings_differ(current: Dict[str, Any], wanted: Dict[str, Any], keys: Iterable[str]) -> bool:
+    """
+    Compare the given keys of a definition echoed by PocketBase with the one we'd send it.
+
+    PocketBase returns unset values as "" where we send None (e.g. a date's min/max or a text pattern), and drops
+    keys it doesn't know (e.g. a date's enableTime, a select's default), so blanks are treated as equal and keys
+    missing from PocketBase's side are skipped, since they could never match.
+    """
+    for key in keys:
+        if key not in current:
+            continue
+        current_value: Any = None if current[key] in (None, "") else current[key]
+        wanted_value: Any = None if wanted.get(key) in (None, "") else wanted.get(key)
+        if current_value != wanted_value:
+            return True
+    return False
+
+
+def collection_differs(existing: Dict[str, Any], data: Dict[str, Any]) -> bool:
+    """
+    Check whether a collection listed by PocketBase is out of date with the definition we'd send it.
+    Options are compared one key at a time, since PocketBase fills in defaults for the ones we leave out.
+    """
+    if settings_differ(existing, data, (key for key in COMPARED_COLLECTION_KEYS if key in data)):
+        return True
+    fields: List[Dict[str, Any]] = existing.get("schema") or []
+    if [field["name"] for field in fields] != [field["name"] for field in data["schema"]]:
+        return True
+    for current, wanted in zip(fields, data["schema"]):
+        if settings_differ(current, wanted, COMPARED_FIELD_KEYS):
+            return True
+        options: Dict[str, Any] = wanted.get("options", {})
+        if settings_differ(current.get("options") or {}, options, options.keys()):
+            return True
+    return False
+
+
+def upsert_collection(data: Dict[str, Any], existing: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Create a collection, or update `existing` to match `data`.
+
+    Fields that already exist keep their PocketBase id, so updating a field's options doesn't drop its column.
+
+    Returns:
+        Optional[Dict[str, Any]]: The response JSON from the PocketBase API, or None if an error occurred.
+    """
+    headers: Dict[str, str] = {"Content-Type": "application/json"}
+    if existing:
+        field_ids: Dict[str, str] = {field["name"]: field["id"] for field in existing.get("schema") or [] if "id" in field}
+        schema: List[Dict[str, Any]] = [
+            {**field, "id": field_ids[field["name"]]} if field["name"] in field_ids else field for field in data["schema"]
+        ]
+        current_app.logger.info(f"Updating collection: {data['name']}")
+        response: requests.Response = get_client().patch(
+            f"{COLLECTIONS_URL}/{existing['id']}", json={**data, "schema": schema}, headers=headers)
+    else:
+        current_app.logger.info(f"Creating collection: {data['name']}")
+        response = get_client().post(COLLECTIONS_URL, json=data, headers=headers)
+    if response.status_code not in (200, 201):
+        current_app.logger.error(f"Failed to save collection {data['name']}. Status code: {response.status_code}, Response: {response.text}")
+        return None
+    return response.json()
 
 
 def create_or_update_pocketbase_collection(
     collection_name: str,
-    schema: Dict[str, Any],
+    schema: List[Dict[str, Any]],
     collection_type: str = 'base',
     **kwargs: Any
 ) -> Optional[Dict[str, Any]]:
@@ -15,45 +135,255 @@ def create_or_update_pocketbase_collection(
 
     Args:
         collection_name (str): Name of the collection to create or update.
-        schema (Dict[str, Any]): Schema for the collection.
+        schema (List[Dict[str, Any]]): Schema for the collection.
         collection_type (str, optional): Type of the collection. Defaults to 'base'.
         **kwargs (Any): Additional fields to include in the collection data.
 
     Returns:
         Optional[Dict[str, Any]]: The response JSON from the PocketBase API, or None if an error occurred.
     """
-    url: str = f"{get_url()}/api/collections"
-    headers: Dict[str, str] = {
-        "Content-Type": "application/json",
-        "Authorization": authenticate()
-    }
-    data: Dict[str, Any] = {
-        "name": collection_name,
-        "type": collection_type,
-        "schema": schema
-    }
-    # Include any additional fields
-    data.update(kwargs)
-    
-    # Get the list of collections
-    response: requests.Response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        collections: Any = response.json()["items"]
-        collection: Optional[Dict[str, Any]] = next(
-            (col for col in collections if col["name"] == collection_name), None)
-        if collection:
-            # If the collection already exists, get the id and update it
-            collection_id: str = collection['id']
-            response = requests.patch(
-                f"{url}/{collection_id}", json=data, headers=headers)
-        else:
-            # Otherwise, create the collection
-            current_app.logger.info(
-                f"Creating or updating collection: {collection_name}")
-            response = requests.post(url, json=data, headers=headers)
-            print("Response data:", response.json())
-    else:
-        print("Response data:", response.json())
+    collections: Optional[Dict[str, Dict[str, Any]]] = list_collections()
+    if collections is None:
         return None
+    return upsert_collection(
+        collection_data(collection_name, schema, collection_type, **kwargs), collections.get(collection_name))
 
-    return response.json()
+
+# Field names of each milestone collection as reconciled in PocketBase, filled once at startup by sync_collection_schemas().
+# The registry is tagged with the schema version it was built from and rebuilt only when that version changes,
+# or when a milestone that couldn't be reconciled is due to be retried.
+SCHEMA_RETRY_INTERVAL: float = float(os.getenv("SCHEMA_RETRY_INTERVAL", 30))  # Seconds between retries of failed collections
+_field_registry: Dict[str, List[str]] = {}
+_registry_version: Optional[str] = None
+_failed_milestones: Set[str] = set()  # Milestones whose field list fell back to the local schema
+_last_sync: float = 0.0
+_reconcile_schemas: bool = True  # Whether this process reconciles collections, or only loads them (see below)
+_registry_lock: threading.RLock = threading.RLock()
+
+
+def sync_collection_schemas(reconcile: bool = True) -> Dict[str, List[str]]:
+    """
+    Reconcile every collection in db_schema.SCHEMAS with PocketBase and record the resulting field names.
+
+    The collections are listed once and compared with SCHEMAS locally; only the ones that are missing or
+    out of date are created or patched, all at once. With `reconcile` off nothing is changed in PocketBase,
+    the listing is only read into the registry (e.g. by gunicorn workers, once the master has reconciled),
+    and collections that are missing or out of date are treated as failed, so they're read again on retry.
+    Retries reconcile or only load the collections as the last sync did.
+
+    The registry is replaced in one step, so threads reading it without the lock never see it half built.
+
+    Returns:
+        Dict[str, List[str]]: The field names of each milestone collection.
+    """
+    global _field_registry, _failed_milestones, _registry_version, _last_sync, _reconcile_schemas
+    with _registry_lock:
+        started: float = time.perf_counter()
+        version: str = db_schema.SCHEMA_VERSION
+        listed: Optional[Dict[str, Dict[str, Any]]] = list_collections()
+        existing: Dict[str, Dict[str, Any]] = listed or {}
+        wanted: Dict[str, Dict[str, Any]] = {
+            milestone: collection_data(milestone, schema, 'base', listRule=None, viewRule=None, options={})
+            for milestone, schema in db_schema.SCHEMAS.items()
+        }
+        collections: Dict[str, Optional[Dict[str, Any]]] = {
+            milestone: existing[milestone] for milestone, data in wanted.items()
+            if milestone in existing and not collection_differs(existing[milestone], data)
+        }
+        unchanged: int = len(collections)
+        stale: List[str] = [milestone for milestone in wanted if milestone not in collections]
+        # Only loading, or PocketBase is unreachable, so don't try to create collections that may already exist
+        if listed is None or not reconcile:
+            collections.update((milestone, None) for milestone in stale)
+            stale = []
+        if stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                futures: Dict[Future, str] = {
+                    executor.submit(with_app_context(upsert_collection), wanted[milestone], existing.get(milestone)): milestone
+                    for milestone in stale
+                }
+                for future in as_completed(futures):
+                    try:
+                        collections[futures[future]] = future.result()
+                    except requests.RequestException as e:
+                        current_app.logger.error(f"Failed to save collection {futures[future]}: {e}")
+                        collections[futures[future]] = None
+
+        registry: Dict[str, List[str]] = {}
+        failed: Set[str] = set()
+        for milestone in db_schema.SCHEMAS.keys():
+            collection: Optional[Dict[str, Any]] = collections[milestone]
+            if collection and collection.get("schema"):
+                registry[milestone] = [field["name"] for field in collection["schema"]]
+            else:
+                # Fall back to the local definition so submissions still map onto the expected fields
+                current_app.logger.error(
+                    f"Failed to reconcile collection {milestone}, using local schema for its field list "
+                    f"and retrying in {SCHEMA_RETRY_INTERVAL:.0f}s.")
+                registry[milestone] = list(db_schema.SCHEMA_INDEX[milestone].fields)
+                failed.add(milestone)
+        _field_registry = registry
+        _failed_milestones = failed
+        _registry_version = version
+        _reconcile_schemas = reconcile
+        _last_sync = time.monotonic()
+        current_app.logger.info(
+            f"Collection schemas {'reconciled with' if reconcile else 'loaded from'} PocketBase "
+            f"(schema version {version[:12]}): "
+            f"{unchanged} unchanged, {len(stale)} created or updated "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms.")
+        return dict(registry)
+
+
+def registry_needs_sync(milestone: str) -> bool:
+    """
+    Whether the registry has to be (re)built before a milestone's fields can be read from it: it's empty,
+    was built from a different schema version, or the milestone failed to reconcile and is due a retry.
+    """
+    return (_registry_version != db_schema.SCHEMA_VERSION or milestone not in _field_registry
+            or (milestone in _failed_milestones and time.monotonic() - _last_sync >= SCHEMA_RETRY_INTERVAL))
+
+
+def peek_collection_fields(milestone: str) -> Optional[List[str]]:
+    """
+    Get the field names of a milestone collection if the registry has them, without ever syncing.
+    Lets async callers skip handing the (rarely needed) blocking sync to a thread.
+    """
+    return None if registry_needs_sync(milestone) else _field_registry[milestone]
+
+
+def get_collection_fields(milestone: str) -> List[str]:
+    """
+    Get the field names of a milestone collection from the registry, reconciling the schemas first
+    if registry_needs_sync().
+    """
+    if registry_needs_sync(milestone):
+        with _registry_lock:
+            if registry_needs_sync(milestone):  # Not synced by another thread meanwhile
+                sync_collection_schemas(reconcile=_reconcile_schemas)
+    return _field_registry[milestone]
+
+
+def coerce_record(milestone: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make the values of a record read from a spreadsheet serializable for PocketBase: date and datetime cells
+    of the milestone's date fields become ISO strings, and NaN/NaT from empty cells become None.
+    Every other value, including checklist items, is sent as it was entered.
+    """
+    coerced: Dict[str, Any] = dict(record)
+    for field in db_schema.SCHEMA_INDEX[milestone].names_by_type.get("date", ()):
+        value: Any = coerced.get(field)
+        if value is not None and value != value:  # NaN/NaT from empty spreadsheet cells
+            coerced[field] = None
+        elif hasattr(value, "isoformat"):
+            coerced[field] = value.isoformat()
+    return coerced
+
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def validate_record(milestone: str, record: Dict[str, Any]) -> List[str]:
+    """
+    Check a coerced record against the milestone's schema.
+
+    Returns:
+        List[str]: A description of each problem found, empty if the record is valid.
+    """
+    index: db_schema.MilestoneIndex = db_schema.SCHEMA_INDEX[milestone]
+    errors: List[str] = []
+    for name in index.required:
+        if record.get(name) in (None, ""):
+            errors.append(f"{name} is required")
+    for name, field in index.by_name.items():
+        value: Any = record.get(name)
+        if value in (None, ""):
+            continue
+        field_type: str = field["type"]
+        if field_type == "date":
+            try:
+                datetime.fromisoformat(str(value).replace("Z", "+00:00").replace(" ", "T", 1))
+            except ValueError:
+                errors.append(f"{name} is not a valid date: {value}")
+        elif field_type == "email" and not EMAIL_PATTERN.match(str(value)):
+            errors.append(f"{name} is not a valid email address: {value}")
+        elif field_type == "url" and urlparse(str(value)).scheme not in ("http", "https"):
+            errors.append(f"{name} is not a valid URL: {value}")
+        elif field_type == "select" and value not in field["options"].get("values", ()):
+            errors.append(f"{name} must be one of {', '.join(field['options']['values'])}")
+    return errors
+
+
+RECORD_LOCATION_CACHE_SIZE: int = int(os.getenv("RECORD_LOCATION_CACHE_SIZE", 10000))
+
+# Record ID -> milestone collection, kept up to date on insert and delete and filled from listings and lookups.
+# Least recently used entries are dropped once the cache is full.
+_record_locations: "OrderedDict[str, str]" = OrderedDict()
+_record_locations_lock: threading.Lock = threading.Lock()
+
+
+def remember_record_location(record_id: str, milestone: str) -> None:
+    """Record which milestone collection a record is stored in."""
+    if not record_id:
+        return
+    with _record_locations_lock:
+        _record_locations[record_id] = milestone
+        _record_locations.move_to_end(record_id)
+        while len(_record_locations) > RECORD_LOCATION_CACHE_SIZE:
+            _record_locations.popitem(last=False)
+
+
+def get_record_location(record_id: str) -> Optional[str]:
+    """Return the milestone collection a record is known to be stored in, if any."""
+    with _record_locations_lock:
+        return _record_locations.get(record_id)
+
+
+def forget_record_location(record_id: str) -> None:
+    """Remove a deleted record from the locator."""
+    with _record_locations_lock:
+        _record_locations.pop(record_id, None)
+
+
+def _fetch_record(milestone: str, record_id: str) -> Optional[Dict[str, Any]]:
+    response: requests.Response = get_client().get(f"/api/collections/{milestone}/records/{record_id}")
+    return response.json() if response.status_code == 200 else None
+
+
+def locate_record(record_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Find a record without knowing its milestone. A known location is fetched directly, otherwise every
+    milestone collection is queried at once and the first hit is returned without waiting for the others.
+
+    Returns:
+        Optional[Tuple[str, Dict[str, Any]]]: The milestone and the record, or None if no collection has it.
+    """
+    milestone: Optional[str] = get_record_location(record_id)
+    if milestone:
+        try:
+            record: Optional[Dict[str, Any]] = _fetch_record(milestone, record_id)
+        except requests.RequestException as e:
+            current_app.logger.warning(f"Failed to query {milestone} for record {record_id}, querying every milestone: {e}")
+            record = None
+        if record:
+            return milestone, record
+        forget_record_location(record_id)  # Stale entry, e.g. deleted outside this process
+
+    executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=len(db_schema.SCHEMAS))
+    futures: Dict[Future, str] = {
+        executor.submit(with_app_context(_fetch_record), milestone, record_id): milestone
+        for milestone in db_schema.SCHEMAS.keys()
+    }
+    try:
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except requests.RequestException as e:
+                current_app.logger.warning(f"Failed to query {futures[future]} for record {record_id}: {e}")
+                continue
+            if record:
+                remember_record_location(record_id, futures[future])
+                return futures[future], record
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,26 @@
-import os
-from typing import List, Optional, Dict, Union
-import google.generativeai as genai
-from metrics import get_user_metrics
+from typing import Iterable, Iterator, List, Optional, Dict, Union
+from metrics import compact_metrics, estimate_tokens, get_user_metrics
+from llm_cache import cache_key, get_llm_cache
+from advice_backends import get_advice_backend
 from flask import current_app
-from google.generativeai.types import GenerateContentResponse
 
+# The model is reached through the advice backend selected by ADVICE_BACKEND (see advice_backends.py),
+# which is Gemini unless the local stand-in is configured.
 
-genai.configure(api_key=os.environ['GOOGLE_API_KEY'])
-model = genai.GenerativeModel("gemini-1.5-flash")
+# To change the prompt, just edit this string; {metrics} is replaced with the course metrics
+PROMPT_TEMPLATE: str = """Analyze the following course metrics and provide specific, actionable suggestions **for the subject coordinator and teaching staff** to improve course quality. 
+           Focus only on areas where the metrics indicate room for improvement or non-compliance with best practices. 
+           Present the suggestions in a concise, bullet-point format and ensure they are practical for **teachers and subject coordinators to implement**. 
+           Avoid general commentary, personal pronouns, or addressing any QA personnel.
+           Course Metrics:
+           {metrics}
+            Targeted Recommendations for Teaching Staff and Subject Coordinators:"""
 
 
 def get_prompt(metrics: Dict[str, any]) -> str:
     """
-    Construct a prompt for the Gemini LLM API based on course metrics
+    Construct a prompt for the Gemini LLM API based on course metrics.
+    The metrics are summarized per milestone by compact_metrics(), which keeps the prompt small and capped in size.
 
     Args:
         metrics (Dict[str, any]): The course metrics for generating improvement ideas.
@@ -20,20 +28,84 @@ def get_prompt(metrics: Dict[str, any]) -> str:
     Returns:
         str: The generated prompt for the model.
     """
-    return ( # To change the prompt, just edit this returned string
-        f"""Analyze the following course metrics and provide specific, actionable suggestions **for the subject coordinator and teaching staff** to improve course quality. 
-           Focus only on areas where the metrics indicate room for improvement or non-compliance with best practices. 
-           Present the suggestions in a concise, bullet-point format and ensure they are practical for **teachers and subject coordinators to implement**. 
-           Avoid general commentary, personal pronouns, or addressing any QA personnel.
-           Course Metrics:
-           {metrics}
-            Targeted Recommendations for Teaching Staff and Subject Coordinators:"""
-    )
+    prompt: str = PROMPT_TEMPLATE.format(metrics=compact_metrics(metrics))
+    current_app.logger.info(
+        f"Prompt is about {estimate_tokens(prompt)} tokens, "
+        f"down from {estimate_tokens(PROMPT_TEMPLATE.format(metrics=metrics))} with the raw metrics.")
+    return prompt
+
+
+def ideas_cache_key(metrics: Dict[str, any]) -> str:
+    """
+    Cache key for the ideas generated from a set of metrics. It's computed from the metrics as they're encoded
+    in the prompt, so metrics that summarize the same way share their ideas.
+    """
+    return cache_key(compact_metrics(metrics), PROMPT_TEMPLATE, get_advice_backend().model_name)
+
+
+def get_cached_ideas(metrics: Dict[str, any]) -> Optional[List[str]]:
+    """
+    Look up improvement ideas generated earlier for the same metrics, prompt and model.
+    """
+    return get_llm_cache().get(ideas_cache_key(metrics))
+
+
+def iter_ideas(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Split the model's text into ideas, one per line, yielding each line as soon as it's complete,
+    so streamed responses can be shown while the rest is still being generated.
+    """
+    buffer: str = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line.lstrip("•-1234567890. ")  # Remove any numbering or bullet points
+    if buffer.strip():
+        yield buffer.lstrip("•-1234567890. ")
+
+
+def generate_ideas(metrics: Dict[str, any]) -> List[str]:
+    """
+    Ask the model for improvement ideas for a set of metrics, and cache them.
+    Errors from the model's API (e.g. rate limiting) are raised to the caller.
+    """
+    ideas: List[str] = list(iter_ideas([get_advice_backend().generate(get_prompt(metrics)).strip()]))
+    if ideas:
+        get_llm_cache().set(ideas_cache_key(metrics), ideas)
+    return ideas
+
+
+def stream_ideas(metrics: Dict[str, any]) -> Iterator[str]:
+    """
+    Like generate_ideas(), but yields each idea as the model streams it. Cached ideas are yielded straight away.
+    """
+    cached: Optional[List[str]] = get_cached_ideas(metrics)
+    if cached is not None:
+        yield from cached
+        return
+    ideas: List[str] = []
+    for idea in iter_ideas(get_advice_backend().stream(get_prompt(metrics))):
+        ideas.append(idea)
+        yield idea
+    if ideas:
+        get_llm_cache().set(ideas_cache_key(metrics), ideas)
+
+
+def stream_course_improvement_ideas(email: str) -> Iterator[str]:
+    """
+    Stream course improvement ideas for a user, based on their course metrics.
+    Errors are raised to the consumer of the stream.
+    """
+    metrics: Dict[str, Union[str, bool]] = get_user_metrics(email)
+    yield from stream_ideas(metrics)
 
 
 def get_course_improvement_ideas(email: str) -> Optional[List[str]]:
     """
-    Fetches course improvement ideas using Google Generative AI based on the user's course metrics.
+    Fetches course improvement ideas from the advice backend based on the user's course metrics.
+    Ideas are cached by metrics, prompt and model, so the model is only queried when one of them has changed.
 
     Args:
         email (str): The email of the user for whom to fetch the metrics.
@@ -44,18 +116,16 @@ def get_course_improvement_ideas(email: str) -> Optional[List[str]]:
     try:
         if current_app:
             metrics: Dict[str, Union[str, bool]] = get_user_metrics(email)
-        prompt: str = get_prompt(metrics)
-        response: GenerateContentResponse = model.generate_content(prompt)
-        # Extract and clean up the response
-        ideas: List[str] = response.text.strip().split("\n")
-        # Remove any numbering or bullet points
-        ideas = [idea.lstrip("•-1234567890. ")
-                 for idea in ideas if idea.strip()]
+        cached: Optional[List[str]] = get_cached_ideas(metrics)
+        if cached is not None:
+            current_app.logger.info(f"Using cached improvement ideas for {email}.")
+            return cached
+        ideas: List[str] = generate_ideas(metrics)
         
         current_app.logger.info("Generated improvement ideas:")
         for idea in ideas:
             current_app.logger.info(f"- {idea}")
         return ideas
     except RuntimeError as e:
-        current_app.logger.log_exception(f"Issue querying Gemini API: {e}.")
+        current_app.logger.exception(f"Issue querying Gemini API: {e}.")
         return None
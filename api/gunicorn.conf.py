@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+
+# gunicorn configuration: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Requests mostly wait on PocketBase, so each worker process runs several threads. Workers default to
+# (2 x CPU cores) + 1 and threads to 4, override them with WEB_CONCURRENCY and WEB_THREADS.
+# PB_POOL_SIZE defaults to WEB_THREADS, giving each thread its own keep-alive connection to PocketBase.
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("WEB_THREADS", 4))
+worker_class = "gthread"
+timeout = int(os.getenv("WEB_TIMEOUT", 120))  # Large exports are streamed, but can take a while to start
+graceful_timeout = 30
+keepalive = 5
+max_requests = 1000  # Recycle workers now and then to bound memory growth
+max_requests_jitter = 100
+accesslog = "-"
+
+os.environ.setdefault("WEB_THREADS", str(threads))
+
+
+def on_starting(server):
+    """
+    Runs once in the master before any worker is forked: start PocketBase if needed and reconcile the
+    collection schemas, so this is done by one process rather than raced for by every worker, and not
+    repeated when workers are recycled after max_requests.
+    """
+    from flask import Flask
+    from handle_PB import ensure_pocketbase_running, terminate_pocketbase
+    from pb_client import close_client
+    from utility_services import initialize_collections, setup_logging
+    supervisor = Flask("pocketbase_supervisor")
+    setup_logging(supervisor)
+    server.pocketbase_supervisor = supervisor
+    ensure_pocketbase_running(supervisor)
+    try:
+        with supervisor.app_context():
+            initialize_collections()
+    except Exception:
+        terminate_pocketbase(supervisor)  # gunicorn exits without calling on_exit
+        raise
+    close_client()  # Workers open their own connections to PocketBase
+    os.environ["POCKETBASE_SUPERVISED"] = "1"  # Inherited by the workers, see wsgi.py
+
+
+def on_exit(server):
+    """
+    Runs in the master once the workers have stopped: stop the PocketBase process it started.
+    """
+    from handle_PB import terminate_pocketbase
+    terminate_pocketbase(server.pocketbase_supervisor)
@@ -1,55 +1,355 @@
+import contextlib
+import json
+import logging
+import signal
 import requests
 import time
+import socket
 import subprocess
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
 from utility_services import get_url
 import os
 pocketbase_process = None
+supervisor = None
 
+PID_FILE: str = os.path.abspath(os.getenv("POCKETBASE_PID_FILE", "pocketbase.pid"))
+STARTUP_TIMEOUT: float = float(os.getenv("PB_STARTUP_TIMEOUT", 30))  # Seconds to wait for a new instance to be healthy
+FIRST_PROBE_DELAY: float = 0.005  # Health checks start 5 ms apart and back off exponentially...
+MAX_PROBE_DELAY: float = 0.5  # ...up to half a second
+POCKETBASE_COMMAND: List[str] = ['../pocketbase', 'serve', '--dir', './pb_data']
+PB_LOG_FILE: str = os.path.abspath(os.getenv("PB_LOG_FILE", "pocketbase.log"))
+PB_STATS_FILE: str = os.path.abspath(os.getenv("PB_STATS_FILE", "pocketbase_stats.json"))
+HEALTH_CHECK_INTERVAL: float = float(os.getenv("PB_HEALTH_CHECK_INTERVAL", 5))  # Seconds between supervisor health checks
+HEALTH_CHECK_FAILURES: int = int(os.getenv("PB_HEALTH_CHECK_FAILURES", 3))  # Failed checks in a row before a stalled PocketBase is restarted
+MAX_RESTART_DELAY: float = 60.0
 
-def ensure_pocketbase_running(app: any, max_retries: int = 10) -> None:
+
+def read_pid_file_entries() -> List[int]:
+    """
+    The PIDs recorded in the PID file: PocketBase's, then that of the process that started it and drains its output.
+    """
+    try:
+        with open(PID_FILE) as pid_file:
+            return [int(pid) for pid in pid_file.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)  # Signal 0 only checks that the process exists
+        return True
+    except OSError:
+        return False
+
+
+def read_pid_file() -> Optional[int]:
+    """
+    Return the PID recorded for the PocketBase instance this app started, if that process is still alive.
+    """
+    pids: List[int] = read_pid_file_entries()
+    return pids[0] if pids and process_alive(pids[0]) else None
+
+
+def read_pid_file_owner() -> Optional[int]:
+    """
+    Return the PID of the process that started the recorded PocketBase instance, if it's still alive.
+    Only that process reads PocketBase's output, so once it has gone PocketBase dies of SIGPIPE on its next log line.
+    """
+    pids: List[int] = read_pid_file_entries()
+    return pids[1] if len(pids) > 1 and process_alive(pids[1]) else None
+
+
+def write_pid_file(pid: int) -> None:
+    with open(PID_FILE, "w") as pid_file:
+        pid_file.write(f"{pid}\n{os.getpid()}")
+
+
+def stop_orphaned_pocketbase(pid: int, timeout: float = 10) -> None:
+    """
+    Stop a PocketBase instance left running by an earlier run of the app. It isn't a child of this process,
+    so it's signalled by PID and polled until it exits, then killed if it hasn't within the timeout.
+    """
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        return
+    deadline: float = time.monotonic() + timeout
+    while process_alive(pid):
+        if time.monotonic() >= deadline:
+            with contextlib.suppress(OSError):
+                os.kill(pid, signal.SIGKILL)
+            return
+        time.sleep(0.05)
+
+
+def remove_pid_file() -> None:
+    try:
+        os.remove(PID_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def port_open(timeout: float = 0.2) -> bool:
+    """
+    Check whether anything is accepting connections on PocketBase's host and port.
+    """
+    url = urlparse(get_url())
+    try:
+        with socket.create_connection((url.hostname, url.port or (443 if url.scheme == "https" else 80)), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def check_health(timeout: float = 1.0) -> Optional[float]:
+    """
+    Query PocketBase's health endpoint.
+
+    Returns:
+        Optional[float]: The response time in seconds, or None if PocketBase isn't healthy.
     """
-    Ensure PocketBase is running. If not, start it and log the status with PID.
+    start = time.perf_counter()
+    try:
+        response = requests.get(f"{get_url()}/api/health", timeout=timeout)
+    except requests.RequestException:
+        return None
+    return time.perf_counter() - start if response.status_code == 200 else None
+
+
+def wait_until_healthy(timeout: float = STARTUP_TIMEOUT) -> Optional[float]:
+    """
+    Poll the health endpoint with exponential backoff until PocketBase responds or the timeout passes.
+
+    Returns:
+        Optional[float]: Seconds until PocketBase was healthy, or None if it wasn't within the timeout.
+    """
+    start = time.monotonic()
+    delay = FIRST_PROBE_DELAY
+    while True:
+        if check_health() is not None:
+            return time.monotonic() - start
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, MAX_PROBE_DELAY)
+
+
+class PocketBaseSupervisor:
+    """
+    Runs PocketBase and keeps it running.
+
+    PocketBase's output is drained into a rotating log file (PB_LOG_FILE), so it can never block on a full pipe.
+    A monitor thread checks the process and its health endpoint every HEALTH_CHECK_INTERVAL seconds, and
+    restarts it, with exponential backoff between attempts, when it exits or fails HEALTH_CHECK_FAILURES
+    checks in a row. An instance the app didn't start is only monitored, never restarted.
+
+    Uptime, restart count and the latest health check are written to PB_STATS_FILE after every check,
+    so every worker process can report them (see /admin/pocketbase).
+    """
+
+    def __init__(self, app: Any, owned: bool = True, check_interval: float = HEALTH_CHECK_INTERVAL,
+                 failure_threshold: int = HEALTH_CHECK_FAILURES) -> None:
+        self.app = app
+        self.owned: bool = owned
+        self.check_interval: float = check_interval
+        self.failure_threshold: int = failure_threshold
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at: Optional[float] = None
+        self.restarts: int = 0
+        self.last_exit_code: Optional[int] = None
+        self.last_health_latency: Optional[float] = None
+        self.last_health_check: Optional[str] = None
+        self.consecutive_failures: int = 0
+        self._stop: threading.Event = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        self.output_logger: logging.Logger = logging.getLogger("pocketbase")
+        if owned and not any(isinstance(handler, RotatingFileHandler) for handler in self.output_logger.handlers):
+            handler: RotatingFileHandler = RotatingFileHandler(PB_LOG_FILE, maxBytes=1_000_000, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.output_logger.addHandler(handler)
+            self.output_logger.setLevel(logging.INFO)
+            self.output_logger.propagate = False
+
+    def launch(self) -> subprocess.Popen:
+        """
+        Start the PocketBase process and the thread draining its output.
+        """
+        global pocketbase_process
+        self.process = subprocess.Popen(POCKETBASE_COMMAND, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        pocketbase_process = self.process
+        self.started_at = time.monotonic()
+        write_pid_file(self.process.pid)
+        threading.Thread(target=self._drain, args=(self.process,), name="pocketbase-output", daemon=True).start()
+        return self.process
+
+    def _drain(self, process: subprocess.Popen) -> None:
+        for line in iter(process.stdout.readline, b""):
+            self.output_logger.info(line.decode("utf-8", errors="replace").rstrip())
+        process.stdout.close()
+
+    def start_monitoring(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.write_stats()
+        self._monitor = threading.Thread(target=self._run, name="pocketbase-supervisor", daemon=True)
+        self._monitor.start()
+
+    def _run(self) -> None:
+        restart_delay: float = 1.0
+        while not self._stop.wait(self.check_interval):
+            if self.owned and self.process.poll() is not None:
+                self.last_exit_code = self.process.returncode
+                self.app.logger.error(f"PocketBase exited with code {self.last_exit_code}, restarting it.")
+            else:
+                latency: Optional[float] = check_health()
+                self.last_health_check = datetime.now(timezone.utc).isoformat()
+                self.last_health_latency = latency
+                if latency is not None:
+                    self.consecutive_failures = 0
+                    if self.started_at and time.monotonic() - self.started_at > MAX_RESTART_DELAY:
+                        restart_delay = 1.0  # Stable again, so the next crash is restarted straight away
+                    self.write_stats()
+                    continue
+                self.consecutive_failures += 1
+                self.app.logger.warning(f"PocketBase health check failed ({self.consecutive_failures} in a row).")
+                self.write_stats()
+                if not self.owned or self.consecutive_failures < self.failure_threshold:
+                    continue
+                self.app.logger.error("PocketBase is not responding, restarting it.")
+                self._terminate()
+            if self._stop.wait(restart_delay):
+                return
+            restart_delay = min(restart_delay * 2, MAX_RESTART_DELAY)
+            self.restart()
+
+    def restart(self) -> None:
+        self.restarts += 1
+        self.consecutive_failures = 0
+        self.launch()
+        startup_time: Optional[float] = wait_until_healthy()
+        if startup_time is None:
+            self.app.logger.error(f"Restarted PocketBase (PID {self.process.pid}) is not healthy yet.")
+        else:
+            self.app.logger.info(
+                f"PocketBase restarted, PID: {self.process.pid}, healthy after {startup_time * 1000:.0f} ms.")
+        self.write_stats()
+
+    def _terminate(self) -> None:
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()  # Stalled too hard to shut down cleanly
+            self.process.wait()
+
+    def stop(self) -> None:
+        """
+        Stop monitoring and terminate PocketBase if the supervisor started it.
+        """
+        self._stop.set()
+        if self._monitor and self._monitor is not threading.current_thread():
+            self._monitor.join(timeout=self.check_interval + 1)
+        if self.owned:
+            self._terminate()
+            remove_pid_file()
+        try:
+            os.remove(PB_STATS_FILE)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        running: bool = self.process.poll() is None if self.owned and self.process else self.consecutive_failures == 0
+        return {
+            "managed": self.owned,
+            "running": running,
+            "pid": self.process.pid if self.process else read_pid_file(),
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.started_at and running else 0,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "last_health_check": self.last_health_check,
+            "last_health_latency_ms": round(self.last_health_latency * 1000, 1) if self.last_health_latency is not None else None,
+            "consecutive_health_failures": self.consecutive_failures,
+        }
+
+    def write_stats(self) -> None:
+        temp_path: str = f"{PB_STATS_FILE}.tmp"
+        with open(temp_path, "w") as stats_file:
+            json.dump(self.stats(), stats_file)
+        os.replace(temp_path, PB_STATS_FILE)
+
+
+def read_supervisor_stats() -> Optional[Dict[str, Any]]:
     """
-    global pocketbase_process
+    Read the latest stats written by the PocketBase supervisor, which may be running in another process.
+    """
+    try:
+        with open(PB_STATS_FILE) as stats_file:
+            return json.load(stats_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def ensure_pocketbase_running(app: any, startup_timeout: float = STARTUP_TIMEOUT) -> None:
+    """
+    Ensure PocketBase is running and supervised. If not, start it and log the status with PID and how long it took to start.
+
+    An existing instance is recognised by the PID file written when this app started it, or by something
+    already listening on PocketBase's port. Either way it is only reused if its health check passes,
+    and is then monitored but not restarted by the supervisor. An instance left by an earlier run, whose
+    process (and so the reader of PocketBase's output) is gone, is replaced by one this supervisor runs.
+    """
+    global supervisor
     try:
-        # Check if PocketBase is already running
-        result = subprocess.run(
-            ['pgrep', '-f', 'pocketbase'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if result.returncode == 0:
-            # PocketBase is running, extract the PID and log it
-            pid = result.stdout.decode('utf-8').strip()
+        pid = read_pid_file()
+        if pid and read_pid_file_owner() is None:
+            app.logger.info(f"Replacing the PocketBase instance left running by an earlier run, PID: {pid}")
+            stop_orphaned_pocketbase(pid)
+            remove_pid_file()
+            pid = None
+        if pid and check_health() is not None:
             app.logger.info(f"PocketBase instance already running, PID: {pid}")
-            pocketbase_process = subprocess.Popen(['kill', '-0', pid])
+        elif port_open():
+            if check_health() is None:
+                app.logger.info(f"Something is listening at {get_url()}, waiting for it to pass a health check...")
+                if wait_until_healthy(startup_timeout) is None:
+                    raise RuntimeError(f"The process listening at {get_url()} is not a healthy PocketBase instance.")
+            app.logger.info(f"PocketBase instance already running at {get_url()}")
         else:
             # PocketBase is not running, start it
             app.logger.info(
                 "PocketBase process not running, attempting to start it...")
-            pocketbase_process = subprocess.Popen(
-                ['../pocketbase', 'serve', '--dir', './pb_data'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            supervisor = PocketBaseSupervisor(app)
+            process = supervisor.launch()
             app.logger.info(
-                f"PocketBase launched, PID: {pocketbase_process.pid}")
-  # Wait until PocketBase is up and running by polling its API
-            for _ in range(max_retries):  # Retry up to 10 times
-                try:
-                    response = requests.get(f"{get_url()}/api/")
-                    if response.status_code == 200:
-                        app.logger.info(
-                            "PocketBase is now running and available.")
-                        break
-                except requests.ConnectionError:
-                    app.logger.info("PocketBase is still starting up...")
-                    time.sleep(10)  # Wait 10 seconds before retrying
-            else:
+                f"PocketBase launched, PID: {process.pid}")
+            startup_time = wait_until_healthy(startup_timeout)
+            if startup_time is None:
                 app.logger.error(
                     "PocketBase failed to start within the expected time.")
                 raise RuntimeError("PocketBase did not start in time.")
+            app.logger.info(f"PocketBase is now running and available, started in {startup_time * 1000:.0f} ms.")
+            supervisor.start_monitoring()
+            return
+        supervisor = PocketBaseSupervisor(app, owned=False)
+        supervisor.start_monitoring()
     except Exception as e:
         app.logger.error(f"Error ensuring PocketBase is running: {e}")
 
 
 def terminate_pocketbase(app):
     """Terminate the PocketBase process when the app shuts down."""
-    global pocketbase_process
+    global pocketbase_process, supervisor
+    if supervisor is not None:
+        supervisor.stop()  # Stop monitoring first, so the shutdown isn't mistaken for a crash
+        supervisor = None
     if pocketbase_process is not None:
         app.logger.info(
             f"Terminating PocketBase with PID: {pocketbase_process.pid}")
@@ -57,6 +357,7 @@ def terminate_pocketbase(app):
             handler.flush()
         pocketbase_process.terminate()
         pocketbase_process.wait()  # Ensure it fully terminates
+        remove_pid_file()
         app.logger.info("PocketBase terminated.")
 
 
@@ -1,347 +1,85 @@
 from flask import Flask, render_template_string, jsonify, Blueprint, current_app
 from utility_services import authenticate
+from db_schema import SCHEMA_INDEX
+from typing import Any, Dict, List
 import os
 
 home = Blueprint('home', __name__)  # Define a blueprint for the index or 'homepage' of the application
 
-SCHEMAS = { # Schema for displaying summary data - less detailed than the actual schemas
-    "Milestone_1": [
-        {
-            "name": "term_start_date",
-            "type": "date",
-            "description": "Teaching Period Start Date",
-            "required": True
-        },
-        {
-            "name": "completion_time",
-            "type": "date",
-            "description": "Submission Date",
-            "required": False
-        },
-        {
-            "name": "email",
-            "type": "email",
-            "description": "User's email address",
-            "required": False
-        },
-        {
-            "name": "name",
-            "type": "text",
-            "description": "User's full name",
-            "required": False
-        },
-        {
-            "name": "subject_coordinator",
-            "type": "text",
-            "description": "Name of the subject coordinator",
-            "required": False
-        },
-        {
-            "name": "subject_code_and_name",
-            "type": "text",
-            "description": "Subject code and name",
-            "required": False
-        },
-        {
-            "name": "subject_lms_link",
-            "type": "url",
-            "description": "URL to the subject in the Learning Management System",
-            "required": False
-        },
-        {
-            "name": "Verify_Assessments_Weightings_2Weeks",
-            "type": "checkbox",
-            "description": "Verify assessments, weightings, types, and hurdles, to match CourseLoop.",
-            "required": False
-        },
-        {
-            "name": "Ensure_LMS_Access_2Weeks",
-            "type": "checkbox",
-            "description": "Ensure LMS site is setup to allow student access and remove access 12 months after the final grade.",
-            "required": False
-        },
-        {
-            "name": "Setup_Welcome_Message_LMS_2Weeks",
+# Fields shown before and after the checklist on every milestone form
+FORM_HEADER_FIELDS: List[Dict[str, Any]] = [
+    {
+        "name": "term_start_date",
+        "type": "date",
+        "description": "Teaching Period Start Date",
+        "required": True
+    },
+    {
+        "name": "completion_time",
+        "type": "date",
+        "description": "Submission Date",
+        "required": False
+    },
+    {
+        "name": "email",
+        "type": "email",
+        "description": "User's email address",
+        "required": False
+    },
+    {
+        "name": "name",
+        "type": "text",
+        "description": "User's full name",
+        "required": False
+    },
+    {
+        "name": "subject_coordinator",
+        "type": "text",
+        "description": "Name of the subject coordinator",
+        "required": False
+    },
+    {
+        "name": "subject_code_and_name",
+        "type": "text",
+        "description": "Subject code and name",
+        "required": False
+    },
+    {
+        "name": "subject_lms_link",
+        "type": "url",
+        "description": "URL to the subject in the Learning Management System",
+        "required": False
+    }
+]
+FORM_FOOTER_FIELDS: List[Dict[str, Any]] = [
+    {
+        "name": "additional_comments",
+        "type": "text",
+        "description": "Additional comments",
+        "required": False
+    }
+]
+
+
+def build_form_schema(milestone: str) -> List[Dict[str, Any]]:
+    """
+    Fields displayed on the form for a milestone. The checklist comes from the schema index,
+    so the form always matches the collections in PocketBase.
+    """
+    index = SCHEMA_INDEX[milestone]
+    checklist: List[Dict[str, Any]] = [
+        {
+            "name": name,
             "type": "checkbox",
-            "description": "Ensure setup of Welcome message on LMS homepage, with learning materials and the latest Subject Learning Guide.",
-            "required": False
-        },
-        {
-            "name": "Add_Teaching_Team_Contact_1Week",
-            "type": "checkbox",
-            "description": "Add Teaching team contact details, including role, title, portrait, and bios.",
-            "required": False
-        },
-        {
-            "name": "Add_Welcome_Post_1Week",
-            "type": "checkbox",
-            "description": "Add Welcome post to Announcement.",
-            "required": False
-        },
-        {
-            "name": "Add_Introduce_Yourself_Post_1Week",
-            "type": "checkbox",
-            "description": "Add Introduce Yourself Discussion/Padlet post.",
-            "required": False
-        },
-        {
-            "name": "Verify_Timetable_Accuracy_By_Week1",
-            "type": "checkbox",
-            "description": "Verify timetable accuracy in Allocate+ and schedule relevant live online sessions.",
-            "required": False
-        },
-        {
-            "name": "Schedule_Student_Consults_By_Week1",
-            "type": "checkbox",
-            "description": "Schedule live student consults per week, preferably in break time or after hours.",
-            "required": False
-        },
-        {
-            "name": "Ensure_First_Assessment_Details_By_Week1",
-            "type": "checkbox",
-            "description": "Ensure the first assessment details are prepared, including Turnitin enabled submission folders, with grades and rubrics.",
-            "required": False
-        },
-        {
-            "name": "Engage_Forums_Respond_2Days_Initial_Weeks",
-            "type": "checkbox",
-            "description": "Engage regularly on forums and respond to students within 2 business days.",
-            "required": False
-        },
-        {
-            "name": "Add_Weekly_Overview_Post_Beginning_Week1",
-            "type": "checkbox",
-            "description": "Add weekly overview/review post to Announcement, summarizing key points and connecting with upcoming learning.",
-            "required": False
-        },
-        {
-            "name": "Upload_Live_Session_Recording_2Days",
-            "type": "checkbox",
-            "description": "Upload live session recording links to LMS within 2 business days.",
-            "required": False
-        },
-        {
-            "name": "post_assignment_reminder",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Post assessment and support reminder to Announcement a week before due date, where relevant.",
-            "required": False
-        },
-        {
-            "name": "accommodate_lap_requirements",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Accommodate student LAP requirements (e.g., adjusting Quiz/assessment, learning resources, delivery, communications, etc.)",
-            "required": False
-        },
-        {
-            "name": "additional_comments",
-            "type": "text",
-            "description": "Additional comments",
-            "required": False
-        }
-    ],
-    "Milestone_2": [
-        {
-            "name": "term_start_date",
-            "type": "date",
-            "description": "Teaching Period Start Date",
-            "required": True
-        },
-        {
-            "name": "completion_time",
-            "type": "date",
-            "description": "Submission Date",
-            "required": False
-        },
-        {
-            "name": "email",
-            "type": "email",
-            "description": "User's email address",
-            "required": False
-        },
-        {
-            "name": "name",
-            "type": "text",
-            "description": "User's full name",
-            "required": False
-        },
-        {
-            "name": "subject_coordinator",
-            "type": "text",
-            "description": "Name of the subject coordinator",
-            "required": False
-        },
-        {
-            "name": "subject_code_and_name",
-            "type": "text",
-            "description": "Subject code and name",
-            "required": False
-        },
-        {
-            "name": "subject_lms_link",
-            "type": "url",
-            "description": "URL to the subject in the Learning Management System",
-            "required": False
-        },
-        {
-            "name": "respond_in_2_days",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Engage on forums and respond to students within 2 business days",
-            "required": False
-        },
-        {
-            "name": "add_weekly_overview",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Add weekly overview/review post to Announcement",
-            "required": False
-        },
-        {
-            "name": "upload_live_session",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Upload live session recording links to LMS within 2 business days (1 day for Term subjects)",
-            "required": False
-        },
-        {
-            "name": "ensure_lms_materials_ready",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Ensure LMS materials are ready each week and compliant",
-            "required": False
-        },
-        {
-            "name": "ensure_remaining_assessments",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Ensure assessment details and submission folders are set up",
-            "required": False
-        },
-        {
-            "name": "post_assignment_reminder",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Post assessment and support reminder to Announcement a week before due date, where relevant",
-            "required": False
-        },
-        {
-            "name": "accommodate_lap_requirements",
-            "type": "checkbox",
-            "description": "Weeks 2 & 3 - Accommodate student LAP requirements (e.g., adjusting Quiz/assessment, learning resources, delivery, communications, etc.)",
-            "required": False
-        },
-        {
-            "name": "additional_comments",
-            "type": "text",
-            "description": "Additional comments",
-            "required": False
-        }
-    ],
-    "Milestone_3": [
-        {
-            "name": "term_start_date",
-            "type": "date",
-            "description": "Teaching Period Start Date",
-            "required": True
-        },
-        {
-            "name": "completion_time",
-            "type": "date",
-            "description": "Submission Date",
-            "required": False
-        },
-        {
-            "name": "email",
-            "type": "email",
-            "description": "User's email address",
-            "required": False
-        },
-        {
-            "name": "name",
-            "type": "text",
-            "description": "User's full name",
-            "required": False
-        },
-        {
-            "name": "subject_coordinator",
-            "type": "text",
-            "description": "Name of the subject coordinator",
-            "required": False
-        },
-        {
-            "name": "subject_code_and_name",
-            "type": "text",
-            "description": "Subject code and name",
-            "required": False
-        },
-        {
-            "name": "subject_lms_link",
-            "type": "url",
-            "description": "URL to the subject in the Learning Management System",
-            "required": False
-        },
-        {
-            "name": "Engage_Forums_Respond_2Days_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Engage regularly on forums and respond to students within 2 business days.",
-            "required": False
-        },
-        {
-            "name": "Add_Weekly_Overview_Post_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Add weekly overview/review post to Announcement, summarizing key points and connecting with upcoming learning, including live session reminders.",
-            "required": False
-        },
-        {
-            "name": "Upload_Live_Session_Recording_2Days_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Upload live session recording links to LMS within 2 business days (1 day for Term subjects).",
-            "required": False
-        },
-        {
-            "name": "Ensure_LMS_Materials_Ready_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Ensure remainder of LMS learning materials are ready each week and compliant with copyright.",
-            "required": False
-        },
-        {
-            "name": "Ensure_Remaining_Assessments_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Ensure remaining assessment details are available, including Turnitin enabled submission folders, with grades and rubrics.",
-            "required": False
-        },
-        {
-            "name": "Post_Assessment_Reminder_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Post assessment and support reminder to Announcement a week before due date, where relevant.",
-            "required": False
-        },
-        {
-            "name": "Accommodate_LAP_Requirements_Weeks_4_5_6",
-            "type": "checkbox",
-            "description": "Accommodate student LAP requirements (e.g., adjusting Quiz/assessment, learning resources, delivery, communications, etc.).",
-            "required": False
-        },
-        {
-            "name": "Add_SFS_Survey_Weeks_5_6",
-            "type": "checkbox",
-            "description": "Add SFS survey to Announcement post and live session presentation slides.",
-            "required": False
-        },
-        {
-            "name": "Post_End_Of_Subject_Review_Week_6",
-            "type": "checkbox",
-            "description": "Post end of subject review and well wishes on Announcement to students.",
-            "required": False
-        },
-        {
-            "name": "Hide_LMS_Exam_Grades_Week_6",
-            "type": "checkbox",
-            "description": "Hide LMS exam grades, final marks, assessment rubrics, grade, and lock discussions at the end of the term.",
-            "required": False
-        },
-        {
-            "name": "additional_comments",
-            "type": "text",
-            "description": "Additional comments",
-            "required": False
+            "description": index.by_name[name]["description"],
+            "required": index.by_name[name]["required"]
         }
+        for name in index.checklist
     ]
-}
+    return FORM_HEADER_FIELDS + checklist + FORM_FOOTER_FIELDS
+
+
+SCHEMAS = {milestone: build_form_schema(milestone) for milestone in SCHEMA_INDEX}  # Schema for displaying summary data - less detailed than the actual schemas
 
 # JS and HTML + CSS for rendering main view
 FORM_TEMPLATE = """
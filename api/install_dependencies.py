@@ -5,7 +5,7 @@ import sys
 
 
 packages = [
-    "flask", "flask-cors", "requests", "pandas", "pocketbase",
+    "flask", "flask-cors", "requests", "httpx", "quart", "hypercorn", "gunicorn", "pandas", "xlsxwriter", "openpyxl", "pocketbase",
     "python-dotenv", "google-auth-oauthlib", "google-api-python-client",
     "google-generativeai"
 ]
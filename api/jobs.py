@@ -0,0 +1,234 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import uuid
+from contextlib import contextmanager, suppress
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from werkzeug.datastructures import FileStorage
+from flask import current_app
+from utility_services import with_app_context
+
+# Background ingestion of uploaded spreadsheets.
+# Each upload is written to the spool directory next to a JSON job record, and processed by a small worker pool.
+# Job records are the source of truth for progress, so any worker process can answer a status poll, and
+# jobs left queued or running when the app stopped are picked up again when the spool is re-scanned at startup.
+
+SPOOL_DIR: str = os.path.abspath(os.getenv("SPOOL_DIR", "spool"))
+JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 2))  # Spreadsheets ingested at once
+ADVICE_JOB_WORKERS: int = int(os.getenv("ADVICE_JOB_WORKERS", 1))  # Advice jobs run at once, each making ADVICE_CONCURRENCY requests
+JOB_POOL_SIZES: Dict[str, int] = {"spreadsheet": JOB_WORKERS, "advice": ADVICE_JOB_WORKERS}
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+UNFINISHED_STATUSES = ("queued", "running")
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock: threading.Lock = threading.Lock()
+_record_lock: threading.Lock = threading.Lock()
+
+
+def get_executor(job_type: str = "spreadsheet") -> ThreadPoolExecutor:
+    """
+    Return the worker pool for a type of job, creating it on first use.
+    Each type has its own pool, so a long advice job never holds up spreadsheet uploads, or the other way round.
+    """
+    executor: Optional[ThreadPoolExecutor] = _executors.get(job_type)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(job_type)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=JOB_POOL_SIZES[job_type], thread_name_prefix=f"{job_type}-job")
+                _executors[job_type] = executor
+    return executor
+
+
+def job_path(job_id: str, suffix: str) -> str:
+    return os.path.join(SPOOL_DIR, f"{job_id}{suffix}")
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def read_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a job record from the spool, or None if there is no such job.
+    """
+    if not JOB_ID_PATTERN.match(job_id):
+        return None
+    try:
+        with open(job_path(job_id, ".json")) as job_file:
+            return json.load(job_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_job(job: Dict[str, Any]) -> None:
+    """
+    Atomically replace a job record, so a poll never sees a half written file.
+    """
+    job["updated"] = now()
+    with _record_lock:
+        temp_path: str = job_path(job["id"], ".json.tmp")
+        with open(temp_path, "w") as job_file:
+            json.dump(job, job_file)
+        os.replace(temp_path, job_path(job["id"], ".json"))
+
+
+@contextmanager
+def claim_job(job_id: str) -> Iterator[bool]:
+    """
+    Lock a job with flock for as long as the context is open, so when several processes share the spool
+    only one of them works on it. Yields False if another process holds the lock.
+
+    The lock file is removed while it's still locked, so a process that opened it just before can't lock it
+    afterwards and believe it holds the job: its handle no longer matches the file at the lock's path.
+    """
+    lock_path: str = job_path(job_id, ".lock")
+    with open(lock_path, "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False  # Another process is running this job
+            return
+        try:
+            claimed: bool = os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path))
+        except FileNotFoundError:
+            claimed = False  # Removed by the process that held the lock since this one opened it
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                with suppress(FileNotFoundError):
+                    os.remove(lock_path)
+
+
+def submit_spreadsheet_job(file: FileStorage, sem: bool = False, bulk: bool = False) -> Dict[str, Any]:
+    """
+    Spool an uploaded spreadsheet and queue it for ingestion.
+
+    Args:
+        file (FileStorage): The uploaded workbook.
+        sem (bool): Whether the submissions are for a semester rather than a term.
+        bulk (bool): Whether the workbook has one submission per row, rather than a single submission.
+
+    Returns:
+        Dict[str, Any]: The new job record.
+    """
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    job_id: str = uuid.uuid4().hex
+    extension: str = file.filename.rsplit('.', 1)[1].lower()
+    file.save(job_path(job_id, f".{extension}"))
+    job: Dict[str, Any] = {
+        "id": job_id,
+        "status": "queued",
+        "filename": file.filename,
+        "upload": f"{job_id}.{extension}",
+        "sem": sem,
+        "bulk": bulk,
+        "created": now(),
+        "total_rows": None,
+        "processed_rows": 0,
+        "created_rows": 0,
+        "failed_rows": 0,
+        "rows": [],
+        "error": None,
+    }
+    write_job(job)
+    get_executor().submit(with_app_context(run_job), job_id)
+    current_app.logger.info(f"Queued spreadsheet job {job_id} for {file.filename}.")
+    return job
+
+
+def run_job(job_id: str) -> None:
+    """
+    Ingest a spooled spreadsheet, recording progress in its job record.
+
+    The job is claimed with claim_job() while it runs. A job resumed after a restart skips the rows it already
+    created, though rows in the batch that was in flight when the app stopped may be inserted twice.
+    """
+    from spreadsheets import ingest_rows, read_field_values, read_workbook_rows, BULK_SPREADSHEET_ENGINE
+    with claim_job(job_id) as claimed:
+        if not claimed:
+            return
+        job: Optional[Dict[str, Any]] = read_job(job_id)
+        if not job or job["status"] not in UNFINISHED_STATUSES:
+            return
+        created_rows: List[Dict[str, Any]] = [row for row in job["rows"] if row["status"] == "created"]
+        job["status"] = "running"
+        job["started"] = now()
+        write_job(job)
+
+        def progress(report: Dict[str, Any], remaining: int) -> None:
+            rows: List[Dict[str, Any]] = created_rows + report["rows"]
+            job.update({
+                "rows": rows,
+                "processed_rows": len(rows),
+                "total_rows": len(rows) + remaining,
+                "created_rows": sum(1 for row in rows if row["status"] == "created"),
+                "failed_rows": sum(1 for row in rows if row["status"] != "created"),
+            })
+            write_job(job)
+
+        upload_path: str = os.path.join(SPOOL_DIR, job["upload"])
+        try:
+            with open(upload_path, "rb") as upload_file:
+                upload: FileStorage = FileStorage(stream=upload_file, filename=job["filename"])
+                if job["bulk"]:
+                    rows: List[Dict[str, Any]] = read_workbook_rows(upload, BULK_SPREADSHEET_ENGINE)
+                else:
+                    rows = [read_field_values(upload)]
+            ingest_rows(rows, job["sem"], progress=progress, skip_rows={row["row"] for row in created_rows})
+            job["status"] = "completed" if job["created_rows"] else "failed"
+            current_app.logger.info(
+                f"Spreadsheet job {job_id}: {job['created_rows']} of {job['total_rows']} rows created.")
+        except Exception as e:
+            current_app.logger.exception(f"Spreadsheet job {job_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        job["finished"] = now()
+        write_job(job)
+        if job["error"] is None:
+            os.remove(upload_path)  # Uploads that crashed the job are kept for inspection
+
+
+def job_type(job: Dict[str, Any]) -> str:
+    """
+    The type of a job record. Spreadsheet jobs were spooled before jobs had types, so they don't record one.
+    """
+    return job.get("type", "spreadsheet")
+
+
+def job_runner(job: Dict[str, Any]) -> Callable[[str], None]:
+    """
+    The function that runs a job of the given record's type.
+    """
+    if job_type(job) == "advice":
+        from advice_batch import run_advice_job  # Imported here since advice_batch builds on this module
+        return run_advice_job
+    return run_job
+
+
+def resume_jobs() -> int:
+    """
+    Re-scan the spool and queue every job that hadn't finished when the app last stopped, in the pool for its type.
+
+    Returns:
+        int: The number of jobs queued.
+    """
+    if not os.path.isdir(SPOOL_DIR):
+        return 0
+    resumed: int = 0
+    for name in sorted(os.listdir(SPOOL_DIR)):
+        job_id, _, suffix = name.partition(".")
+        if suffix != "json":
+            continue
+        job: Optional[Dict[str, Any]] = read_job(job_id)
+        if job and job["status"] in UNFINISHED_STATUSES:
+            get_executor(job_type(job)).submit(with_app_context(job_runner(job)), job_id)
+            resumed += 1
+    if resumed:
+        current_app.logger.info(f"Resumed {resumed} unfinished jobs from {SPOOL_DIR}.")
+    return resumed
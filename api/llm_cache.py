@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+# Persistent cache of LLM responses, kept in a SQLite file so it survives restarts and is shared by every
+# worker process. Entries are addressed by a hash of everything that determines the response: the metrics
+# sent to the model, the prompt template and the model name. Changing any of them is a cache miss.
+
+LLM_CACHE_PATH: str = os.path.abspath(os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"))
+LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))  # Seconds
+LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))  # Least recently used entries are evicted beyond this
+
+
+def normalize_metrics(metrics: Any) -> Any:
+    """
+    Put metrics in a canonical form, so the same metrics always hash the same: submissions are sorted,
+    since the order they were fetched in doesn't change what the model is told.
+    """
+    if isinstance(metrics, dict):
+        return {key: normalize_metrics(value) for key, value in metrics.items()}
+    if isinstance(metrics, (list, tuple)):
+        items: List[Any] = [normalize_metrics(item) for item in metrics]
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, default=str))
+    return metrics
+
+
+def cache_key(metrics: Any, prompt_template: str, model_name: str) -> str:
+    """
+    Hash the normalized metrics, the prompt template and the model name into a cache key.
+    """
+    payload: str = json.dumps(
+        {"metrics": normalize_metrics(metrics), "prompt": prompt_template, "model": model_name},
+        sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite backed response cache with a time to live and least recently used eviction.
+    """
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES) -> None:
+        self.path: str = path
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        with closing(self.connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")  # Readers in other workers don't block on writes
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def connect(self) -> sqlite3.Connection:
+        # A connection per call, since sqlite3 connections can't be shared between threads
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached response for a key, or None if there is none or it has expired.
+        """
+        now: float = time.time()
+        with closing(self.connect()) as connection, connection:
+            row = connection.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a response, then drop expired entries and the least recently used ones beyond max_entries.
+        """
+        now: float = time.time()
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now))
+            connection.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+            connection.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)", (self.max_entries,))
+
+    def clear(self) -> None:
+        with closing(self.connect()) as connection, connection:
+            connection.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self.connect()) as connection:
+            entries: int = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"path": self.path, "entries": entries, "ttl": self.ttl, "max_entries": self.max_entries}
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock: threading.Lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Return the shared LLM response cache, creating its database on first use.
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMCache()
+    return _llm_cache
@@ -0,0 +1,125 @@
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+import requests
+
+# Load test for the production server.
+#
+# Against a running server:
+#   python loadtest.py --url http://127.0.0.1:5000/admin/records/page/Milestone_1 --concurrency 32 --duration 20
+#
+# To show how throughput scales with worker processes, --workers starts gunicorn (gunicorn.conf.py) once per
+# worker count, loads it, stops it and prints a table:
+#   python loadtest.py --workers 1,2,4,8
+#
+# PocketBase must be running with some records in the collection being read.
+
+DEFAULT_PATH: str = "/admin/records/page/Milestone_1?per_page=50"  # Reads a page of records from PocketBase
+
+
+def run_load(url: str, concurrency: int, duration: float) -> Dict[str, float]:
+    """
+    Send requests to a URL from `concurrency` threads for `duration` seconds.
+
+    Returns:
+        Dict[str, float]: Request and error counts, requests per second and latency percentiles in milliseconds.
+    """
+    latencies: List[float] = []
+    errors: List[int] = []
+    lock: threading.Lock = threading.Lock()
+    deadline: float = time.monotonic() + duration
+
+    def client() -> None:
+        session: requests.Session = requests.Session()
+        while time.monotonic() < deadline:
+            start: float = time.perf_counter()
+            try:
+                ok: bool = session.get(url, timeout=30).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed: float = (time.perf_counter() - start) * 1000
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    threads: List[threading.Thread] = [threading.Thread(target=client) for _ in range(concurrency)]
+    started: float = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed: float = time.monotonic() - started
+    percentiles: List[float] = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+        "p99_ms": percentiles[98],
+    }
+
+
+def wait_until_ready(base_url: str, timeout: float = 120) -> None:
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout} seconds")
+
+
+def run_with_workers(workers: int, port: int, path: str, concurrency: int, duration: float) -> Dict[str, float]:
+    """
+    Start gunicorn with the given number of workers, load it, and stop it again.
+    """
+    env: Dict[str, str] = {**os.environ, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}"}
+    server: subprocess.Popen = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url: str = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url)
+        run_load(base_url + path, concurrency, min(duration, 3))  # Warm up connections and caches
+        return run_load(base_url + path, concurrency, duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+
+def print_results(rows: Dict[str, Dict[str, float]], label: str) -> None:
+    columns: List[str] = ["requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"{label:>10}" + "".join(f"{column:>10}" for column in columns))
+    for name, result in rows.items():
+        print(f"{name:>10}" + "".join(f"{result[column]:10.1f}" for column in columns))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="URL to load. Defaults to a page of records on the server started with --workers")
+    parser.add_argument("--workers", help="Comma separated gunicorn worker counts to compare, e.g. 1,2,4")
+    parser.add_argument("--port", type=int, default=5050, help="Port for the servers started with --workers")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="Path to load on the servers started with --workers")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run each test for")
+    args = parser.parse_args(argv)
+    if args.workers:
+        results: Dict[str, Dict[str, float]] = {}
+        for workers in (int(count) for count in args.workers.split(",")):
+            results[str(workers)] = run_with_workers(workers, args.port, args.path, args.concurrency, args.duration)
+        print_results(results, "workers")
+    else:
+        url: str = args.url or f"http://127.0.0.1:5000{DEFAULT_PATH}"
+        print_results({"-": run_load(url, args.concurrency, args.duration)}, "")
+
+
+if __name__ == "__main__":
+    main()
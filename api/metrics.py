@@ -1,74 +1,216 @@
+import copy
+import os
+import threading
+import time
 import requests
-from typing import Dict, List, Any, Optional
-from utility_services import get_url, authenticate
-from db_schema import SCHEMAS
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from pb_client import get_client
+from utility_services import with_app_context
+from db_schema import SCHEMAS, SCHEMA_INDEX
 from datetime import datetime
 from flask import current_app
 
 # This was intended to be used for visualisations, but now it just feeds data to the LLM for tailored advice.
 
+METRICS_CACHE_TTL: float = float(os.getenv("METRICS_CACHE_TTL", 300))  # Seconds, also bounds staleness from writes made outside this app
+METRICS_CACHE_SIZE: int = int(os.getenv("METRICS_CACHE_SIZE", 1000))  # Users cached at once, least recently used dropped beyond this
+PROMPT_METRICS_MAX_CHARS: int = int(os.getenv("PROMPT_METRICS_MAX_CHARS", 4000))  # About 1000 tokens
 
-def get_user_metrics(email: str) -> Dict[str, Any]: 
+# Per-user metrics keyed by email, with the time they were computed. Cleared for a user when their records change.
+# Expired entries are dropped whenever metrics are stored, and least recently used ones once the cache is full.
+_metrics_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_metrics_cache_lock: threading.Lock = threading.Lock()
+_metrics_generation: int = 0  # Bumped on every invalidation so results computed before a write aren't cached
+
+
+def email_filter(email: str) -> str:
+    """
+    Build a PocketBase filter matching records submitted by the given email.
+    """
+    escaped: str = email.replace("\\", "\\\\").replace("'", "\\'")
+    return f"(email='{escaped}')"
+
+
+def invalidate_user_metrics(email: Optional[str] = None) -> None:
     """
-    Retrieves user metrics for a given email.
+    Drop cached metrics for an email, or for every user when no email is given
+    (e.g. after an update or delete where the record's owner isn't known).
+    """
+    global _metrics_generation
+    with _metrics_cache_lock:
+        _metrics_generation += 1
+        if email is None:
+            _metrics_cache.clear()
+        else:
+            _metrics_cache.pop(email, None)
+
+
+def milestone_submission_fields(milestone: str) -> str:
+    """
+    The fields requested from a milestone collection to compute metrics.
+    """
+    return ",".join(('id', 'email', 'start_time', 'completion_time') + SCHEMA_INDEX[milestone].checklist)
+
+
+def summarize_submission(milestone: str, submission: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a submission to the metrics for one milestone: time taken and checklist responses.
+    """
+    start_time: Optional[str] = submission.get('start_time')
+    completion_time: Optional[str] = submission.get('completion_time')
+    time_taken: Optional[float] = None  # Time taken in minutes
+
+    if start_time and completion_time:
+        start_time_dt: datetime = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        completion_time_dt: datetime = datetime.fromisoformat(completion_time.replace('Z', '+00:00'))
+        time_taken = (completion_time_dt - start_time_dt).total_seconds() / 60
+
+    boolean_fields: Dict[str, bool] = {
+        field: submission[field] for field in SCHEMA_INDEX[milestone].checklist if field in submission
+    }
+
+    return {
+        'milestone': milestone,
+        'start_time': start_time,
+        'completion_time': completion_time,
+        'time_taken_minutes': time_taken,
+        'boolean_responses': boolean_fields,
+    }
+
+
+def get_milestone_submissions(milestone: str, email: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Retrieves the submissions made by an email to one milestone, letting PocketBase do the filtering.
 
     Args:
-        email (str): The email of the user to get metrics for.
+        milestone (str): The milestone collection to query.
+        email (str): The email of the user to get submissions for.
 
     Returns:
-        Dict[str, Any]: A dictionary containing the user's email and submission metrics.
+        Optional[List[Dict[str, Any]]]: The user's submission metrics for the milestone, or None if PocketBase couldn't be queried.
     """
-    url: str = f"{get_url()}/api/collections"
-    headers: Dict[str, str] = {
-        "Content-Type": "application/json",
-        "Authorization": authenticate()
-    }
+    collection_name: str = f"{milestone}"
+    try:
+        records = get_client().iter_records(
+            collection_name, fields=milestone_submission_fields(milestone), filter=email_filter(email))
+        return [summarize_submission(milestone, submission) for submission in records]
+    except requests.RequestException as e:
+        current_app.logger.error(f"Failed to retrieve submissions for {collection_name}: {e}")
+        return None
+
+
+def cached_user_metrics(email: str) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Look up a user's metrics in the cache.
 
+    Returns:
+        Tuple[Optional[Dict[str, Any]], int]: A copy of the cached metrics, or None if they're missing or stale,
+        and the cache generation to pass to store_user_metrics once they've been recomputed.
+    """
+    with _metrics_cache_lock:
+        cached: Optional[Tuple[float, Dict[str, Any]]] = _metrics_cache.get(email)
+        if cached:
+            _metrics_cache.move_to_end(email)
+        generation: int = _metrics_generation
+    if cached and time.monotonic() - cached[0] < METRICS_CACHE_TTL:
+        return copy.deepcopy(cached[1]), generation
+    return None, generation
+
+
+def store_user_metrics(email: str, results: List[Optional[List[Dict[str, Any]]]], generation: int,
+                       computed_at: float) -> Dict[str, Any]:
+    """
+    Combine the per-milestone results into a user's metrics and cache them, unless a milestone couldn't be
+    queried or a write has invalidated the cache since `generation` was read.
+    """
     user_metrics: Dict[str, Any] = {
         'email': email,
-        'submissions': []
+        'submissions': [submission for submissions in results if submissions for submission in submissions]
     }
+    with _metrics_cache_lock:
+        if None not in results and generation == _metrics_generation:
+            _metrics_cache[email] = (computed_at, user_metrics)
+            _metrics_cache.move_to_end(email)
+        expired: List[str] = [key for key, (stored_at, _) in _metrics_cache.items()
+                              if time.monotonic() - stored_at >= METRICS_CACHE_TTL]
+        for key in expired:
+            del _metrics_cache[key]
+        while len(_metrics_cache) > METRICS_CACHE_SIZE:
+            _metrics_cache.popitem(last=False)
+    return copy.deepcopy(user_metrics)
 
-    for milestone in SCHEMAS.keys(): 
-        collection_name: str = f"{milestone}"
-        response: requests.Response = requests.get(f"{url}/{collection_name}/records", headers=headers)
-
-        if response.status_code == 200:
-            data: Dict[str, Any] = response.json()
-            submissions: List[Dict[str, Any]] = data.get('items', [])
-
-            # Filter submissions by matching email
-            for submission in submissions:
-                if submission.get('email') != email:
-                    continue  # Skip if the email doesn't match
-
-                start_time: Optional[str] = submission.get('start_time')
-                completion_time: Optional[str] = submission.get('completion_time')
-                time_taken: Optional[float] = None  # Time taken in minutes
-
-                if start_time and completion_time:
-                    start_time_dt: datetime = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    completion_time_dt: datetime = datetime.fromisoformat(completion_time.replace('Z', '+00:00'))
-                    time_taken = (completion_time_dt - start_time_dt).total_seconds() / 60
-
-                boolean_fields: Dict[str, bool] = {
-                    field: submission[field] for field in submission 
-                    if field not in ['id', 'collectionId', 'collectionName', 'created', 'updated']
-                    and next((f for f in SCHEMAS[milestone] if f['name'] == field), {}).get('type') == 'bool'
-                }
-
-                submission_data: Dict[str, Any] = {
-                    'milestone': milestone,
-                    'start_time': start_time,
-                    'completion_time': completion_time,
-                    'time_taken_minutes': time_taken,
-                    'boolean_responses': boolean_fields,
-                }
-
-                user_metrics['submissions'].append(submission_data)
-        else:
-            current_app.logger.error(f"Failed to retrieve submissions for {collection_name}. Status code: {response.status_code}")
-            current_app.logger.error(f"Response data: {response.text}")
 
-    return user_metrics
+def get_user_metrics(email: str) -> Dict[str, Any]: 
+    """
+    Retrieves user metrics for a given email, from the cache when they haven't changed since they were last computed.
+
+    Args:
+        email (str): The email of the user to get metrics for.
+
+    Returns:
+        Dict[str, Any]: A dictionary containing the user's email and submission metrics.
+    """
+    cached, generation = cached_user_metrics(email)
+    if cached:
+        return cached
+
+    computed_at: float = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(SCHEMAS)) as executor:
+        fetch = with_app_context(get_milestone_submissions)
+        results: List[Optional[List[Dict[str, Any]]]] = list(
+            executor.map(lambda milestone: fetch(milestone, email), SCHEMAS.keys()))
+    return store_user_metrics(email, results, generation, computed_at)
+
 
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of prompt text, at about four characters per token.
+    """
+    return (len(text) + 3) // 4
+
+
+def compact_metrics(metrics: Dict[str, Any], max_chars: int = PROMPT_METRICS_MAX_CHARS) -> str:
+    """
+    Encode a user's metrics compactly for an LLM prompt: one line per milestone with its checklist completion
+    and average time taken, followed by the checklist items left undone, described as in db_schema.
+    Lines past `max_chars` are dropped, with a note saying how many.
+    """
+    lines: List[str] = []
+    for milestone in SCHEMAS.keys():
+        submissions: List[Dict[str, Any]] = [
+            submission for submission in metrics.get('submissions', []) if submission.get('milestone') == milestone
+        ]
+        if not submissions:
+            continue
+        index = SCHEMA_INDEX[milestone]
+        undone: Dict[str, int] = {
+            field: sum(1 for submission in submissions if not submission['boolean_responses'].get(field))
+            for field in index.checklist
+        }
+        total: int = len(index.checklist) * len(submissions)
+        done: int = total - sum(undone.values())
+        line: str = f"{milestone}: {len(submissions)} submission{'s' if len(submissions) > 1 else ''}"
+        if total:
+            line += f", {done}/{total} checklist items done ({done * 100 // total}%)"
+        times: List[float] = [s['time_taken_minutes'] for s in submissions if s.get('time_taken_minutes') is not None]
+        if times:
+            line += f", {sum(times) / len(times):.0f} min to complete"
+        lines.append(line)
+        for field in sorted((field for field in index.checklist if undone[field]), key=lambda field: -undone[field]):
+            count: str = f" ({undone[field]}/{len(submissions)})" if len(submissions) > 1 else ""
+            lines.append(f"- Not done{count}: {index.by_name[field].get('description') or field}")
+    if not lines:
+        return "No submissions."
+
+    kept: List[str] = []
+    length: int = 0
+    for position, line in enumerate(lines):
+        omitted: str = f"- ({len(lines) - position} more lines omitted)"
+        if length + len(line) + 1 + (len(omitted) + 1 if position < len(lines) - 1 else 0) > max_chars:
+            kept.append(omitted)
+            break
+        kept.append(line)
+        length += len(line) + 1
+    return "\n".join(kept)
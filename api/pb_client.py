@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app, has_app_context
+from utility_services import get_url, token_manager
+
+# Shared HTTP client for every call the application makes to PocketBase.
+# All modules go through one keep-alive session, so connections to PocketBase are reused between requests.
+
+POOL_SIZE: int = int(os.getenv("PB_POOL_SIZE") or os.getenv("WEB_THREADS") or 10)  # Match the number of worker threads
+CONNECT_TIMEOUT: float = float(os.getenv("PB_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT: float = float(os.getenv("PB_READ_TIMEOUT", 30))
+MAX_RETRIES: int = int(os.getenv("PB_MAX_RETRIES", 3))
+RETRY_BACKOFF: float = float(os.getenv("PB_RETRY_BACKOFF", 0.1))  # Sleeps 0.1s, 0.2s, 0.4s... between retries
+MAX_PAGE_SIZE: int = 500  # The largest perPage PocketBase accepts
+
+
+class PocketBaseClient:
+    """
+    Pooled HTTP client for the PocketBase REST API.
+
+    Idempotent verbs are retried with exponential backoff on connection errors and 502/503/504 responses,
+    every request has a connect and read timeout, and the admin token is attached and refreshed automatically.
+    """
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = POOL_SIZE,
+        timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = RETRY_BACKOFF
+    ) -> None:
+        self.base_url: str = base_url.rstrip("/")
+        self.timeout: Tuple[float, float] = timeout
+        retry: Retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=self.IDEMPOTENT_METHODS,
+            raise_on_status=False
+        )
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session: requests.Session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: str) -> str:
+        """
+        Build an absolute URL from a path such as `/api/collections`. Absolute URLs are passed through.
+        """
+        return path if path.startswith("http") else f"{self.base_url}{path}"
+
+    def request(self, method: str, path: str, authorize: bool = True, **kwargs: Any) -> requests.Response:
+        """
+        Send a request to PocketBase. When `authorize` is set the admin token is attached, and a 401
+        invalidates the cached token and retries the request once with a fresh one.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        headers: Dict[str, str] = dict(kwargs.pop("headers", None) or {})
+        if not authorize:
+            return self.session.request(method, self.url(path), headers=headers, **kwargs)
+        token: Optional[str] = token_manager.get_token()
+        headers["Authorization"] = token or ""
+        response: requests.Response = self.session.request(method, self.url(path), headers=headers, **kwargs)
+        if response.status_code == 401:
+            logger: logging.Logger = current_app.logger if has_app_context() else logging.getLogger(__name__)
+            logger.warning("PocketBase rejected the cached admin token, re-authenticating.")
+            token_manager.invalidate(token)
+            headers = {**headers, "Authorization": token_manager.get_token() or ""}
+            response = self.session.request(method, self.url(path), headers=headers, **kwargs)
+        return response
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def iter_records(
+        self,
+        collection_name: str,
+        fields: Optional[str] = None,
+        filter: Optional[str] = None,
+        sort: Optional[str] = None,
+        per_page: int = MAX_PAGE_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every record of a collection, walking all pages of the list endpoint.
+
+        Args:
+            collection_name (str): The collection to read.
+            fields (Optional[str]): Comma separated fields to return, e.g. "id,email,created".
+            filter (Optional[str]): PocketBase filter expression.
+            sort (Optional[str]): PocketBase sort expression, e.g. "-created".
+            per_page (int): Records requested per page.
+
+        Raises:
+            requests.HTTPError: If PocketBase returns an error for any page.
+        """
+        params: Dict[str, Any] = {"perPage": per_page}
+        for name, value in (("fields", fields), ("filter", filter), ("sort", sort)):
+            if value:
+                params[name] = value
+        page: int = 1
+        while True:
+            response: requests.Response = self.get(
+                f"/api/collections/{collection_name}/records", params={**params, "page": page})
+            response.raise_for_status()
+            data: Dict[str, Any] = response.json()
+            items = data.get("items", [])
+            yield from items
+            if page >= data.get("totalPages", 0) or len(items) < per_page:
+                return
+            page += 1
+
+
+_client: Optional[PocketBaseClient] = None
+_client_lock: threading.Lock = threading.Lock()
+
+
+def get_client() -> PocketBaseClient:
+    """
+    Return the process-wide PocketBase client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PocketBaseClient(get_url())
+    return _client
+
+
+def close_client() -> None:
+    """
+    Close the process-wide client's connections, e.g. in a process about to fork workers,
+    so each worker opens its own rather than sharing sockets. The next get_client() creates a new client.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.session.close()
+            _client = None
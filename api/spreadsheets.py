@@ -1,11 +1,82 @@
+import csv
+import itertools
+import os
+import tempfile
+import zipfile
+import openpyxl
 import requests
-from typing import Dict, Any, Optional
-from flask import current_app, jsonify, request, send_file, Response
-import pandas as pd
-from utility_services import get_url
+import xlsxwriter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date
+from typing import Callable, Collection, Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+from werkzeug.datastructures import FileStorage
+from flask import current_app, jsonify, request, send_file, stream_with_context, Response
+from pb_client import get_client
 from date import determine_form
-from utility_services import authenticate
-from io import BytesIO
+from db_util import coerce_record, locate_record, remember_record_location, validate_record
+from metrics import invalidate_user_metrics
+from utility_services import authenticate, with_app_context
+from db_schema import SCHEMA_INDEX
+from io import BytesIO, StringIO
+
+BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", 50))  # Rows submitted together before the next batch starts
+BULK_CONCURRENCY: int = int(os.getenv("BULK_CONCURRENCY", 8))  # Concurrent inserts into PocketBase during a bulk upload
+EXPORT_CHUNK_ROWS: int = 500  # Rows written per chunk of a streamed CSV export
+BULK_SPREADSHEET_ENGINE: str = os.getenv("BULK_SPREADSHEET_ENGINE", "openpyxl")  # "pandas" to read bulk uploads with pandas
+ZIP_EXPORT_WORKERS: int = int(os.getenv("ZIP_EXPORT_WORKERS", 8))  # Records fetched and rendered at once for a ZIP export
+
+
+def get_uploaded_file() -> Tuple[Optional[FileStorage], Optional[Tuple[Response, int]]]:
+    """
+    Get the spreadsheet uploaded with the request.
+
+    Returns:
+        The uploaded file, or an error response if the upload is missing or isn't an Excel file.
+    """
+    if 'file' not in request.files:
+        current_app.logger.error("No file part in the request.")
+        return None, (jsonify({"error": "No file part in the request"}), 400)
+    file = request.files['file']
+    if file.filename == '':
+        current_app.logger.error("No selected file.")
+        return None, (jsonify({"error": "No selected file"}), 400)
+    allowed_extensions = {'xls', 'xlsx'}
+    if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
+        current_app.logger.error("Invalid file extension.")
+        return None, (jsonify({"error": "Invalid file extension"}), 400)
+    return file, None
+
+
+def read_workbook_rows(file: FileStorage, engine: str = "openpyxl") -> List[Dict[str, Any]]:
+    """
+    Read the first sheet of an uploaded workbook into one dict per row, keyed by the header row.
+
+    .xlsx files are read with openpyxl in read-only mode, which streams the sheet without loading pandas.
+    pandas is only imported for the "pandas" engine and for legacy .xls files, which openpyxl can't read.
+    """
+    if engine == "pandas" or file.filename.rsplit('.', 1)[1].lower() == "xls":
+        import pandas as pd  # Optional, heavy import kept off the default path
+        return pd.read_excel(file).to_dict(orient="records")
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows: Iterator[Tuple[Any, ...]] = workbook.active.iter_rows(values_only=True)
+        header: Tuple[Any, ...] = next(rows, None) or ()
+        columns: List[str] = ["" if column is None else str(column).strip() for column in header]
+        return [{column: value for column, value in zip(columns, row) if column} for row in rows]
+    finally:
+        workbook.close()
+
+
+def read_field_values(file: FileStorage) -> Dict[str, Any]:
+    """
+    Read a single submission from a workbook, either in the two column Field/Value layout
+    produced by the export, or with field names as headers and the submission in the first row.
+    """
+    rows: List[Dict[str, Any]] = read_workbook_rows(file)
+    if rows and "Field" in rows[0] and "Value" in rows[0]:
+        return {row["Field"]: clean_cell(row.get("Value")) for row in rows if row.get("Field") is not None}
+    return {field: clean_cell(value) for field, value in rows[0].items()} if rows else {}
+
 
 def parse_spreadsheet(sem=False) -> Response:
     """
@@ -15,44 +86,24 @@ def parse_spreadsheet(sem=False) -> Response:
         Response: Flask JSON response indicating success or failure.
     """
     try:
-        if 'file' not in request.files:
-            current_app.logger.error("No file part in the request.")
-            return jsonify({"error": "No file part in the request"}), 400
-        file = request.files['file']
-        if file.filename == '':
-            current_app.logger.error("No selected file.")
-            return jsonify({"error": "No selected file"}), 400
-        allowed_extensions = {'xls', 'xlsx'}
-        if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
-            current_app.logger.error("Invalid file extension.")
-            return jsonify({"error": "Invalid file extension"}), 400
-        df: pd.DataFrame = pd.read_excel(file)
-        if 'Field' in df.columns and 'Value' in df.columns:
-            form_data = pd.Series(df['Value'].values, index=df['Field']).to_dict()
-        else:
-            form_data: Dict[str, Any] = df.iloc[0].to_dict()
-        term_start_date_str: Optional[str] = form_data.get("term_start_date")
-        academic_period: Optional[str] = form_data.get("academic_period", None)
-        if sem:
-            form_data["academic_period"] = "Semester"
-        if not sem and academic_period == None:
-            form_data["academic_period"] = "Term"
-        if academic_period == "Semester":
-              milestone: Optional[str] = determine_form(term_start_date_str, semesters=True)
-        else:
-            milestone: Optional[str] = determine_form(term_start_date_str)
-        if not milestone:
-            return jsonify({"message": "No active milestone for the current date"}), 400
+        file, error = get_uploaded_file()
+        if error:
+            return error
+        # Resolved and validated like each row of a bulk upload, so uploads queued with async=true get the same checks
+        milestone, record_data, errors = resolve_row(read_field_values(file), sem)
+        if errors:
+            current_app.logger.error(f"Spreadsheet failed validation: {errors}")
+            return jsonify({"error": "Spreadsheet failed validation", "details": errors}), 400
         collection_name: str = f"{milestone}"
-        record_data: Dict[str, Any] = form_data.copy()
-        url: str = f"{get_url()}/api/collections/{collection_name}/records"
+        url: str = f"/api/collections/{collection_name}/records"
         headers: Dict[str, str] = {"Content-Type": "application/json"}
-        headers['Authorization'] = f'{authenticate()}'
 
-        response: requests.Response = requests.post(
+        response: requests.Response = get_client().post(
             url, json=record_data, headers=headers)
         record_id = response.json().get("id")
         if response.status_code in [200, 201]:
+            remember_record_location(record_id, collection_name)
+            invalidate_user_metrics(record_data.get("email"))
             current_app.logger.info(
                 f"Record created successfully from spreadsheet: {response.json()}")
             return jsonify({"message": "Spreadsheet parsed and record created successfully", "record_id": record_id}), 200
@@ -74,6 +125,172 @@ def parse_spreadsheet(sem=False) -> Response:
         )
 
 
+def clean_cell(value: Any) -> Any:
+    """Convert empty spreadsheet cells (NaN/NaT) to None and numpy scalars to plain Python values."""
+    if value is None or value != value:
+        return None
+    return value.item() if type(value).__module__ == "numpy" else value
+
+
+def resolve_row(row: Dict[str, Any], sem: bool = False) -> Tuple[Optional[str], Dict[str, Any], List[str]]:
+    """
+    Resolve a spreadsheet row's milestone and convert it to a record.
+
+    Returns:
+        Tuple[Optional[str], Dict[str, Any], List[str]]: The milestone, the coerced record, and any validation errors.
+    """
+    form_data: Dict[str, Any] = {str(key).strip(): clean_cell(value) for key, value in row.items()}
+    if sem:
+        form_data["academic_period"] = "Semester"
+    elif form_data.get("academic_period") is None:
+        form_data["academic_period"] = "Term"
+    term_start_date = form_data.get("term_start_date")
+    if term_start_date is None:
+        return None, form_data, ["term_start_date is required"]
+    milestone: Optional[str] = determine_form(term_start_date, semesters=form_data["academic_period"] == "Semester")
+    if not milestone:
+        return None, form_data, [f"Could not determine the milestone for term_start_date {term_start_date}"]
+    record: Dict[str, Any] = coerce_record(milestone, form_data)
+    return milestone, record, validate_record(milestone, record)
+
+
+def insert_record(row_number: int, milestone: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create one record from a spreadsheet row and report the outcome.
+    """
+    try:
+        response: requests.Response = get_client().post(
+            f"/api/collections/{milestone}/records", json=record, headers={"Content-Type": "application/json"})
+    except requests.RequestException as e:
+        return {"row": row_number, "status": "error", "milestone": milestone, "errors": [str(e)]}
+    if response.status_code in [200, 201]:
+        record_id: str = response.json().get("id")
+        remember_record_location(record_id, milestone)
+        invalidate_user_metrics(record.get("email"))
+        return {"row": row_number, "status": "created", "milestone": milestone, "record_id": record_id}
+    return {"row": row_number, "status": "error", "milestone": milestone, "errors": [response.text]}
+
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the upload report from per-row results, numbered as in the spreadsheet.
+    """
+    results = sorted(results, key=lambda result: result["row"])
+    created: int = sum(1 for result in results if result["status"] == "created")
+    return {"total_rows": len(results), "created": created, "failed": len(results) - created, "rows": results}
+
+
+def ingest_rows(rows: List[Dict[str, Any]], sem: bool = False,
+                progress: Optional[Callable[[Dict[str, Any], int], None]] = None,
+                skip_rows: Collection[int] = ()) -> Dict[str, Any]:
+    """
+    Validate every row against the schema of its milestone and insert the valid ones
+    in concurrent batches of BULK_BATCH_SIZE, with at most BULK_CONCURRENCY requests in flight.
+
+    Args:
+        rows (List[Dict[str, Any]]): One dict per spreadsheet row, keyed by column name.
+        sem (bool): Whether the rows are for a semester rather than a term.
+        progress (Optional[Callable]): Called with the report so far and the number of rows still to insert,
+            once rows are validated and again after every batch.
+        skip_rows (Collection[int]): Row numbers to leave out, e.g. rows a resumed job has already created.
+
+    Returns:
+        Dict[str, Any]: Row counts and a per-row report. Rows are numbered as in the spreadsheet, after the header row.
+    """
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, str, Dict[str, Any]]] = []
+    for row_number, row in enumerate(rows, start=2):
+        if row_number in skip_rows or all(clean_cell(value) in (None, "") for value in row.values()):
+            continue  # Skip blank rows
+        milestone, record, errors = resolve_row(row, sem)
+        if errors:
+            results.append({"row": row_number, "status": "error", "milestone": milestone, "errors": errors})
+        else:
+            pending.append((row_number, milestone, record))
+    if progress:
+        progress(summarize_results(results), len(pending))
+
+    insert = with_app_context(insert_record)
+    with ThreadPoolExecutor(max_workers=BULK_CONCURRENCY) as executor:
+        for start in range(0, len(pending), BULK_BATCH_SIZE):
+            batch = pending[start:start + BULK_BATCH_SIZE]
+            results.extend(executor.map(lambda args: insert(*args), batch))
+            if progress:
+                progress(summarize_results(results), max(len(pending) - start - BULK_BATCH_SIZE, 0))
+
+    return summarize_results(results)
+
+
+def parse_spreadsheet_bulk(sem=False) -> Response:
+    """
+    Parses an uploaded spreadsheet with one submission per row and creates a record for every valid row.
+
+    Returns:
+        Response: Flask JSON response with a per-row success/error report. The status is 200 if every row
+        was created, 207 if only some were, and 400 if none were.
+    """
+    try:
+        file, error = get_uploaded_file()
+        if error:
+            return error
+        rows: List[Dict[str, Any]] = read_workbook_rows(file, BULK_SPREADSHEET_ENGINE)
+        report: Dict[str, Any] = ingest_rows(rows, sem)
+        current_app.logger.info(
+            f"Bulk spreadsheet upload: {report['created']} of {report['total_rows']} rows created.")
+        if report["created"] == report["total_rows"] and report["total_rows"]:
+            return jsonify(report), 200
+        return jsonify(report), 207 if report["created"] else 400
+    except Exception as e:
+        current_app.logger.exception(
+            f"An unexpected error occurred while parsing the spreadsheet: {e}")
+        return (
+            jsonify({"error": "An unexpected error occurred", "details": str(e)}),
+            500,
+        )
+
+
+def render_record_workbook(record_id: str, record: Dict[str, Any]) -> bytes:
+    """
+    Render a single record as a Field/Value workbook, the layout used for every per-record download.
+
+    Returns:
+        bytes: The contents of the .xlsx file.
+    """
+    data = [(k, v if v else "No response provided") for k, v in record.items()]  # Impute empty fields
+    output: BytesIO = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+    worksheet = workbook.add_worksheet(f"Record{record_id}")
+
+    # Define formatting
+    header_format = workbook.add_format({
+        'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter'
+    })
+    cell_format = workbook.add_format({
+        'font_size': 14, 'align': 'left', 'valign': 'top'
+    })
+    wrap_format = workbook.add_format({
+        'font_size': 14, 'align': 'left', 'valign': 'top', 'text_wrap': True
+    })
+
+    # Set column width and text wrapping
+    worksheet.set_column('A:A', 25, cell_format)  # Field column width
+    worksheet.set_column('B:B', 50, wrap_format)  # Value column width with wrapping
+
+    # Freeze the header row
+    worksheet.freeze_panes(1, 0)
+
+    # Write headers
+    worksheet.write('A1', 'Field', header_format)
+    worksheet.write('B1', 'Value', header_format)
+
+    # Write the data to the sheet
+    for i, (field, value) in enumerate(data, start=1):
+        worksheet.write(i, 0, field, cell_format)
+        worksheet.write(i, 1, str(value), wrap_format)
+    workbook.close()
+    return output.getvalue()
+
+
 def export_spreadsheet(record_id, term_start_date=None, collection_name=None) -> Response:
     """
     Exports a record from PocketBase as a downloadable spreadsheet.
@@ -93,63 +310,22 @@ def export_spreadsheet(record_id, term_start_date=None, collection_name=None) ->
 
     def inner(collection_name): # Helper function fetches the record by term_start_date or by passed collection_name.
         if term_start_date is None:
-            headers: Dict[str, str] = {"Authorization": f"{admin_token}"}
-            response: requests.Response = requests.get(
-                f"{get_url()}/api/collections/{collection_name}/records/{record_id}",
-                headers=headers,
+            response: requests.Response = get_client().get(
+                f"/api/collections/{collection_name}/records/{record_id}"
             )
             if response.status_code == 200:
                 return response.json()
 
         collection_name: str = determine_form(term_start_date)
-        headers: Dict[str, str] = {"Authorization": f"{admin_token}"}
-        response: requests.Response = requests.get(
-            f"{get_url()}/api/collections/{collection_name}/records/{record_id}",
-            headers=headers,
+        response: requests.Response = get_client().get(
+            f"/api/collections/{collection_name}/records/{record_id}"
         )
         if response.status_code == 200:
             return response.json()
 
     try:
         record: Dict[str, Any] = inner(collection_name)
-        data = [(k, v if v else "No response provided") for k, v in record.items()]  # Impute empty fields
-        df: pd.DataFrame = pd.DataFrame(data, columns=["Field", "Value"])
-        df = df.sort_values(by="Field")
-
-        # Prepare the output stream for Excel
-        output: BytesIO = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            worksheet = workbook.add_worksheet(f"Record{record_id}")
-
-            # Define formatting
-            header_format = workbook.add_format({
-                'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter'
-            })
-            cell_format = workbook.add_format({
-                'font_size': 14, 'align': 'left', 'valign': 'top'
-            })
-            wrap_format = workbook.add_format({
-                'font_size': 14, 'align': 'left', 'valign': 'top', 'text_wrap': True
-            })
-
-            # Set column width and text wrapping
-            worksheet.set_column('A:A', 25, cell_format)  # Field column width
-            worksheet.set_column('B:B', 50, wrap_format)  # Value column width with wrapping
-
-            # Freeze the header row
-            worksheet.freeze_panes(1, 0)
-
-            # Write headers
-            worksheet.write('A1', 'Field', header_format)
-            worksheet.write('B1', 'Value', header_format)
-
-            # Write the data to the sheet
-            for i, (field, value) in enumerate(data, start=1):
-                worksheet.write(i, 0, field, cell_format)
-                worksheet.write(i, 1, str(value), wrap_format)
-
-        output.seek(0)
+        output: BytesIO = BytesIO(render_record_workbook(record_id, record))
         current_app.logger.info(f"Exported record {record_id} to spreadsheet.")
         return send_file(
             output,
@@ -163,3 +339,246 @@ def export_spreadsheet(record_id, term_start_date=None, collection_name=None) ->
             f"An unexpected error occurred while exporting the spreadsheet: {e}"
         )
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+EXPORT_SYSTEM_FIELDS: Tuple[str, ...] = ("id", "created", "updated")
+
+
+def term_range_filter(term_start_from: Optional[date] = None, term_start_to: Optional[date] = None) -> Optional[str]:
+    """
+    Build a PocketBase filter selecting records whose term start date falls within the given (inclusive) range.
+    """
+    clauses: List[str] = []
+    if term_start_from:
+        clauses.append(f"term_start_date >= '{term_start_from.isoformat()} 00:00:00'")
+    if term_start_to:
+        clauses.append(f"term_start_date <= '{term_start_to.isoformat()} 23:59:59'")
+    return " && ".join(clauses) or None
+
+
+def iter_export_rows(milestone: str, record_filter: Optional[str] = None) -> Iterator[List[Any]]:
+    """
+    Yield the header row and then one row per record of a milestone collection, a page at a time,
+    so only one page of records is held in memory.
+    """
+    columns: Tuple[str, ...] = EXPORT_SYSTEM_FIELDS + SCHEMA_INDEX[milestone].fields
+    yield list(columns)
+    for record in get_client().iter_records(milestone, fields=",".join(columns), filter=record_filter, sort="created"):
+        yield ["" if record.get(column) is None else record.get(column) for column in columns]
+
+
+def export_collection(milestone: str, file_format: str = "xlsx", term_start_from: Optional[date] = None,
+                      term_start_to: Optional[date] = None) -> Response:
+    """
+    Exports every record of a milestone collection, optionally limited to a range of term start dates.
+
+    XLSX files are written row by row with xlsxwriter's constant_memory mode to a temporary file, and CSV is
+    streamed with chunked transfer encoding, so memory use doesn't grow with the number of records.
+
+    Args:
+        milestone (str): The milestone collection to export.
+        file_format (str): "xlsx" or "csv".
+        term_start_from (Optional[date]): Earliest term start date to include.
+        term_start_to (Optional[date]): Latest term start date to include.
+
+    Returns:
+        Response: Flask response to download the export or an error message.
+    """
+    if milestone not in SCHEMA_INDEX:
+        return jsonify({"error": f"Unknown milestone: {milestone}"}), 404
+    record_filter: Optional[str] = term_range_filter(term_start_from, term_start_to)
+    download_name: str = f"{milestone}_export.{file_format}"
+    if file_format not in ("csv", "xlsx"):
+        return jsonify({"error": "Format must be xlsx or csv"}), 400
+    if file_format == "csv":
+        rows: Iterator[List[Any]] = iter_export_rows(milestone, record_filter)
+        try:
+            # Read the first page before the response starts, so PocketBase being unreachable is still a 502
+            first_rows: List[List[Any]] = [next(rows)] + list(itertools.islice(rows, 1))
+        except requests.RequestException as e:
+            current_app.logger.exception(f"Failed to export {milestone}: {e}")
+            return jsonify({"error": "Failed to read records from PocketBase", "details": str(e)}), 502
+
+        def generate() -> Iterator[str]:
+            buffer: StringIO = StringIO()
+            writer = csv.writer(buffer)
+            try:
+                for count, row in enumerate(itertools.chain(first_rows, rows)):
+                    writer.writerow(row)
+                    if count % EXPORT_CHUNK_ROWS == 0:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+            except requests.RequestException as e:
+                # The status has already been sent, so all that's left is to end the download early
+                current_app.logger.exception(f"Export of {milestone} cut short, failed to read records from PocketBase: {e}")
+            yield buffer.getvalue()
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={download_name}"}
+        )
+
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        try:
+            worksheet = workbook.add_worksheet(milestone)
+            header_format = workbook.add_format({"bold": True})
+            worksheet.freeze_panes(1, 0)
+            rows = iter_export_rows(milestone, record_filter)
+            worksheet.write_row(0, 0, next(rows), header_format)
+            count: int = 0
+            for count, row in enumerate(rows, start=1):
+                worksheet.write_row(count, 0, row)
+        finally:
+            workbook.close()
+    except requests.RequestException as e:
+        os.remove(path)
+        current_app.logger.exception(f"Failed to export {milestone}: {e}")
+        return jsonify({"error": "Failed to read records from PocketBase", "details": str(e)}), 502
+    except Exception:
+        os.remove(path)
+        raise
+    current_app.logger.info(f"Exported {count} records from {milestone} to spreadsheet.")
+
+    def stream_file() -> Iterator[bytes]:
+        with open(path, "rb") as export_file:
+            while chunk := export_file.read(65536):
+                yield chunk
+
+    response: Response = Response(
+        stream_file(),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={
+            "Content-Disposition": f"attachment; filename={download_name}",
+            "Content-Length": str(os.path.getsize(path))
+        }
+    )
+    response.call_on_close(lambda: os.remove(path))  # Runs once the download has been sent
+    return response
+
+
+class ZipStream:
+    """
+    Write-only, non-seekable file object for zipfile. Entries are written with data descriptors instead of
+    seeking back to patch headers, so the archive can be sent while it is being built.
+    """
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        """
+        Return everything written since the last call.
+        """
+        data: bytes = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def fetch_and_render(record_id: str) -> Tuple[str, Optional[bytes]]:
+    """
+    Locate a record by ID and render its workbook.
+
+    Returns:
+        Tuple[str, Optional[bytes]]: The archive entry name and the workbook, or the ID and None if no collection has it.
+    """
+    located: Optional[Tuple[str, Dict[str, Any]]] = locate_record(record_id)
+    if not located:
+        return record_id, None
+    milestone, record = located
+    return f"{milestone}/record_{record_id}.xlsx", render_record_workbook(record_id, record)
+
+
+def render_collection_record(milestone: str, record: Dict[str, Any]) -> Tuple[str, Optional[bytes]]:
+    """
+    Render a record already read from its collection.
+    """
+    return f"{milestone}/record_{record['id']}.xlsx", render_record_workbook(record["id"], record)
+
+
+def iter_rendered(tasks: Iterable[Tuple[Any, ...]], workers: int = ZIP_EXPORT_WORKERS) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Run (function, *args) tasks in a worker pool and yield their results as they complete.
+    At most twice as many tasks as workers are in flight, so a large export never piles up rendered workbooks in memory.
+    """
+    pending: Set[Future] = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for func, *args in tasks:
+            pending.add(executor.submit(with_app_context(func), *args))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def export_records_zip(record_ids: Optional[List[str]] = None, milestone: Optional[str] = None,
+                       term_start_from: Optional[date] = None, term_start_to: Optional[date] = None) -> Response:
+    """
+    Exports many records as a ZIP archive of per-record spreadsheets, one folder per milestone.
+
+    Records are either listed by ID or selected by milestone and an optional range of term start dates.
+    They are fetched and rendered concurrently, and each workbook is streamed to the client as soon as it is ready.
+    IDs that couldn't be found or rendered are listed in `errors.txt` at the end of the archive.
+
+    Args:
+        record_ids (Optional[List[str]]): The IDs of the records to export.
+        milestone (Optional[str]): Export every record of this milestone instead.
+        term_start_from (Optional[date]): Earliest term start date to include with a milestone.
+        term_start_to (Optional[date]): Latest term start date to include with a milestone.
+
+    Returns:
+        Response: Flask response streaming the archive or an error message.
+    """
+    if record_ids:
+        tasks: Iterable[Tuple[Any, ...]] = ((fetch_and_render, record_id) for record_id in dict.fromkeys(record_ids))
+        download_name: str = "records_export.zip"
+    elif milestone in SCHEMA_INDEX:
+        record_filter: Optional[str] = term_range_filter(term_start_from, term_start_to)
+        tasks = ((render_collection_record, milestone, record)
+                 for record in get_client().iter_records(milestone, filter=record_filter, sort="created"))
+        download_name = f"{milestone}_records.zip"
+    elif milestone:
+        return jsonify({"error": f"Unknown milestone: {milestone}"}), 404
+    else:
+        return jsonify({"error": "Provide record IDs or a milestone"}), 400
+
+    def generate() -> Iterator[bytes]:
+        stream: ZipStream = ZipStream()
+        errors: List[str] = []
+        count: int = 0
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            try:
+                for name, workbook in iter_rendered(tasks):
+                    if workbook is None:
+                        errors.append(f"{name}: record not found")
+                        continue
+                    archive.writestr(name, workbook)
+                    count += 1
+                    yield stream.drain()
+            except requests.RequestException as e:  # Send what was exported rather than a truncated archive
+                current_app.logger.exception(f"ZIP export stopped early: {e}")
+                errors.append(f"Export stopped early, failed to read records from PocketBase: {e}")
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        current_app.logger.info(f"Exported {count} records to a ZIP archive, {len(errors)} errors.")
+        yield stream.drain()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={download_name}"}
+    )
@@ -9,6 +9,9 @@ import logging
 import signal
 import requests
 import subprocess
+import shutil
+import tempfile
+import time
 from unittest.mock import patch, Mock
 import unittest
 
@@ -18,6 +21,15 @@ class TestPocketBaseManagement(unittest.TestCase):
     def setUp(self):
         # Reset the global variable before each test
         handle_PB.pocketbase_process = None
+        handle_PB.supervisor = None
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_patches = [
+            patch('handle_PB.PB_STATS_FILE', os.path.join(self.temp_dir, 'stats.json')),
+            patch('handle_PB.PB_LOG_FILE', os.path.join(self.temp_dir, 'pocketbase.log')),
+            patch('handle_PB.PID_FILE', os.path.join(self.temp_dir, 'pocketbase.pid')),
+        ]
+        for file_patch in self.file_patches:
+            file_patch.start()
         self.app = Flask(__name__)
         logs_path = os.path.abspath('logs.txt')
         if not os.path.exists(logs_path):
@@ -37,74 +49,103 @@ class TestPocketBaseManagement(unittest.TestCase):
         self.handler.setFormatter(formatter)
 
     def tearDown(self):
+        if handle_PB.supervisor:
+            handle_PB.supervisor.stop()
         handle_PB.pocketbase_process = None
+        handle_PB.supervisor = None
+        for file_patch in self.file_patches:
+            file_patch.stop()
+        output_logger = logging.getLogger("pocketbase")
+        for handler in list(output_logger.handlers):
+            handler.close()
+            output_logger.removeHandler(handler)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch('handle_PB.subprocess.run')
+    @patch('handle_PB.write_pid_file')
+    @patch('handle_PB.port_open', return_value=False)
+    @patch('handle_PB.read_pid_file', return_value=None)
     @patch('handle_PB.subprocess.Popen')
     @patch('handle_PB.requests.get')
-    def test_ensure_pocketbase_running_starts_pocketbase(self, mock_requests_get, mock_popen, mock_subprocess_run):
+    def test_ensure_pocketbase_running_starts_pocketbase(self, mock_requests_get, mock_popen, mock_read_pid_file,
+                                                         mock_port_open, mock_write_pid_file):
         """Test that PocketBase starts when not already running."""
-        # Simulate `pgrep` returning non-zero exit code (PocketBase not running)
-        mock_subprocess_run.return_value.returncode = 1
         # Simulate starting PocketBase
         mock_pocketbase_process = Mock()
         mock_pocketbase_process.pid = 12345
+        mock_pocketbase_process.stdout.readline.return_value = b""
         mock_popen.return_value = mock_pocketbase_process
         # Simulate PocketBase API becoming available after retries
         responses = [requests.ConnectionError(
         ), requests.ConnectionError(), Mock(status_code=200)]
         mock_requests_get.side_effect = responses
-        handle_PB.ensure_pocketbase_running(self.app)
-        mock_subprocess_run.assert_called_with(
-            ['pgrep', '-f', 'pocketbase'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with self.assertLogs(self.app.logger, level='INFO') as logs:
+            handle_PB.ensure_pocketbase_running(self.app)
         mock_popen.assert_called_with(
-            ['../pocketbase', 'serve'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            ['../pocketbase', 'serve', '--dir', './pb_data'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        mock_write_pid_file.assert_called_once_with(12345)
         self.assertEqual(mock_requests_get.call_count, 3)
-        self.app.logger.info(
-            "PocketBase process not running, attempting to start it...")
-        self.app.logger.info(
-            f"PocketBase launched, PID: {mock_pocketbase_process.pid}")
-        self.app.logger.info("PocketBase is now running and available.")
-        self.app.logger.info(
-            "Test: test_ensure_pocketbase_running_starts_pocketbase - Successful")
+        mock_requests_get.assert_called_with(f"{handle_PB.get_url()}/api/health", timeout=1.0)
+        self.assertTrue(any("started in" in line for line in logs.output))
 
-    @patch('handle_PB.subprocess.run')
+    @patch('handle_PB.read_pid_file_owner', return_value=54321)
+    @patch('handle_PB.read_pid_file', return_value=12345)
     @patch('handle_PB.subprocess.Popen')
-    def test_ensure_pocketbase_running_already_running(self, mock_popen, mock_subprocess_run):
-        """Test that PocketBase does not start again if already running."""
-        # Simulate `pgrep` returning zero exit code (PocketBase is running)
-        mock_subprocess_run.return_value.returncode = 0
-        mock_subprocess_run.return_value.stdout = b'12345\n'
-        # Mock Popen for 'kill -0' command
-        mock_popen.return_value = Mock()
+    @patch('handle_PB.requests.get')
+    def test_ensure_pocketbase_running_already_running(self, mock_requests_get, mock_popen, mock_read_pid_file,
+                                                       mock_read_pid_file_owner):
+        """Test that PocketBase does not start again if already running under a live process of the app."""
+        mock_requests_get.return_value = Mock(status_code=200)
         handle_PB.ensure_pocketbase_running(self.app)
-        # Assertions
-        mock_subprocess_run.assert_called_with(
-            ['pgrep', '-f', 'pocketbase'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        mock_popen.assert_called_with(['kill', '-0', '12345'])
-        self.app.logger.info("PocketBase instance already running, PID: 12345")
-        calls = [args[0] for args, _ in mock_popen.call_args_list]
-        self.assertNotIn(['../pocketbase', 'serve'], calls)
+        mock_popen.assert_not_called()
+        self.assertIsNone(handle_PB.pocketbase_process)  # Not ours to terminate
 
+    @patch('handle_PB.stop_orphaned_pocketbase')
+    @patch('handle_PB.port_open', return_value=False)
+    @patch('handle_PB.subprocess.Popen')
     @patch('handle_PB.requests.get')
+    def test_instance_left_by_earlier_run_is_replaced(self, mock_requests_get, mock_popen, mock_port_open,
+                                                      mock_stop_orphaned_pocketbase):
+        """Test that an instance whose output reader died with an earlier run is restarted under the supervisor."""
+        with open(handle_PB.PID_FILE, "w") as pid_file:
+            # This process stands in for the live PocketBase, started by a process that no longer exists
+            pid_file.write(f"{os.getpid()}\n999999999")
+        mock_popen.return_value.pid = 12345
+        mock_popen.return_value.stdout.readline.return_value = b""
+        mock_requests_get.return_value = Mock(status_code=200)
+        handle_PB.ensure_pocketbase_running(self.app)
+        mock_stop_orphaned_pocketbase.assert_called_once_with(os.getpid())
+        mock_popen.assert_called_once()
+        self.assertTrue(handle_PB.supervisor.owned)
+        self.assertEqual(handle_PB.read_pid_file_entries(), [12345, os.getpid()])
+
+    @patch('handle_PB.read_pid_file', return_value=None)
+    @patch('handle_PB.port_open', return_value=True)
     @patch('handle_PB.subprocess.Popen')
-    @patch('handle_PB.subprocess.run')
-    def test_ensure_pocketbase_running_timeout(self, mock_requests_get, mock_popen, mock_subprocess_run):
-        """Test that an error is raised if PocketBase fails to start in time."""
-        # Simulate `pgrep` returning non-zero exit code
-        mock_subprocess_run.return_value.returncode = 1
-        # Simulate starting PocketBase
-        mock_pocketbase_process = Mock()
-        mock_pocketbase_process.pid = 12345
-        mock_popen.return_value = mock_pocketbase_process
+    @patch('handle_PB.requests.get')
+    def test_ensure_pocketbase_running_detects_port(self, mock_requests_get, mock_popen, mock_port_open, mock_read_pid_file):
+        """Test that an instance started outside the app is found by probing its port."""
+        mock_requests_get.return_value = Mock(status_code=200)
+        handle_PB.ensure_pocketbase_running(self.app)
+        mock_popen.assert_not_called()
+
+    @patch('handle_PB.write_pid_file')
+    @patch('handle_PB.port_open', return_value=False)
+    @patch('handle_PB.read_pid_file', return_value=None)
+    @patch('handle_PB.time.sleep')
+    @patch('handle_PB.requests.get')
+    @patch('handle_PB.subprocess.Popen')
+    def test_ensure_pocketbase_running_timeout(self, mock_popen, mock_requests_get, mock_sleep, mock_read_pid_file,
+                                               mock_port_open, mock_write_pid_file):
+        """Test that an error is logged if PocketBase fails to start in time."""
+        mock_popen.return_value.pid = 12345
+        mock_popen.return_value.stdout.readline.return_value = b""
         # Simulate PocketBase API never becoming available
         mock_requests_get.side_effect = requests.ConnectionError()
-        with patch('handle_PB.pocketbase_process', None):
-            handle_PB.ensure_pocketbase_running(self.app)
-        # Assertions
-        assert (mock_requests_get.call_count >= 1)
-        self.app.logger.error(
-            "PocketBase failed to start within the expected time.")
+        with self.assertLogs(self.app.logger, level='ERROR') as logs:
+            handle_PB.ensure_pocketbase_running(self.app, startup_timeout=0.05)
+        self.assertTrue(any("failed to start within the expected time" in line for line in logs.output))
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(delays[:3], [0.005, 0.01, 0.02])  # Exponential backoff from a few milliseconds
 
     def test_terminate_pocketbase(self):
         """Test that PocketBase is terminated when the app shuts down."""
@@ -132,6 +173,42 @@ class TestPocketBaseManagement(unittest.TestCase):
             mock_terminate_pocketbase(self.app)
             mock_os_exit.assert_called_once_with(0)
 
+    @patch('handle_PB.check_health', return_value=0.002)
+    def test_supervisor_drains_output_and_restarts_crashed_process(self, mock_check_health):
+        """Test that PocketBase output is logged and a crashed process is restarted."""
+        command = [sys.executable, '-c', 'print("pocketbase output"); import time; time.sleep(0.1)']
+        with patch('handle_PB.POCKETBASE_COMMAND', command):
+            supervisor = handle_PB.PocketBaseSupervisor(self.app, check_interval=0.05)
+            handle_PB.supervisor = supervisor
+            supervisor.launch()
+            supervisor.start_monitoring()
+            deadline = time.monotonic() + 10
+            while (handle_PB.read_supervisor_stats() or {}).get("restarts", 0) < 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertGreaterEqual(supervisor.restarts, 1)
+        self.assertEqual(supervisor.last_exit_code, 0)
+        stats = handle_PB.read_supervisor_stats()
+        self.assertTrue(stats["managed"])
+        self.assertGreaterEqual(stats["restarts"], 1)
+        supervisor.stop()
+        with open(handle_PB.PB_LOG_FILE) as log_file:
+            self.assertIn("pocketbase output", log_file.read())
+
+    @patch('handle_PB.check_health', return_value=None)
+    def test_supervisor_restarts_stalled_process(self, mock_check_health):
+        """Test that a process failing its health checks is killed and restarted."""
+        command = [sys.executable, '-c', 'import time; time.sleep(30)']
+        with patch('handle_PB.POCKETBASE_COMMAND', command), patch('handle_PB.wait_until_healthy', return_value=0.01):
+            supervisor = handle_PB.PocketBaseSupervisor(self.app, check_interval=0.02, failure_threshold=2)
+            handle_PB.supervisor = supervisor
+            first = supervisor.launch()
+            supervisor.start_monitoring()
+            deadline = time.monotonic() + 10
+            while supervisor.restarts < 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertIsNotNone(first.poll())  # The stalled process was stopped
+            self.assertIsNot(supervisor.process, first)
+
     @patch('signal.signal')
     @patch('app.ensure_pocketbase_running')
     def test_startup_registers_signal_handlers(self, mock_ensure_pocketbase_running, mock_signal):
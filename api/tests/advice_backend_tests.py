@@ -0,0 +1,105 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from flask import Flask
+import advice_batch
+import app as app_module
+import gemini
+from advice_backends import LocalAdviceBackend, create_advice_backend, set_advice_backend
+from advice_batch import TokenBucket
+from db_schema import SCHEMA_INDEX
+from llm_cache import LLMCache
+
+
+def user_metrics(email):  # One Milestone_2 submission with its first two checklist items left undone
+    checklist = SCHEMA_INDEX["Milestone_2"].checklist
+    return {'email': email, 'submissions': [{
+        'milestone': 'Milestone_2',
+        'time_taken_minutes': 20,
+        'boolean_responses': {field: field not in checklist[:2] for field in checklist},
+    }]}
+
+
+class RateLimitedError(Exception):
+    code = 429
+
+
+class LocalAdviceBackendTests(unittest.TestCase):
+    def test_undone_items_become_ideas(self):
+        backend = LocalAdviceBackend(latency=0)
+        ideas = list(gemini.iter_ideas([backend.generate(gemini.PROMPT_TEMPLATE.format(
+            metrics=gemini.compact_metrics(user_metrics("a@example.com"))))]))
+        descriptions = [SCHEMA_INDEX["Milestone_2"].by_name[field]["description"]
+                        for field in SCHEMA_INDEX["Milestone_2"].checklist[:2]]
+        self.assertEqual(ideas, [f"Prioritize this checklist item: {description.rstrip('.')}." for description in descriptions])
+        self.assertEqual(backend.generate("No submissions."), backend.generate("No submissions."))
+
+    def test_latency_is_spread_over_streamed_lines(self):
+        backend = LocalAdviceBackend(latency=0.1, fixture="- First\n- Second\n")
+        start = time.monotonic()
+        chunks = backend.stream("prompt")
+        self.assertEqual(next(chunks), "- First\n")
+        first_chunk = time.monotonic() - start
+        self.assertEqual(list(chunks), ["- Second\n"])
+        self.assertGreaterEqual(first_chunk, 0.05)
+        self.assertLess(first_chunk, 0.1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_advice_backend("gpt")
+
+
+class AdvicePipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(app_module.api)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.temp_dir = tempfile.mkdtemp()
+        self.backend = LocalAdviceBackend(latency=0)
+        set_advice_backend(self.backend)
+        self.patches = [
+            patch('gemini.get_llm_cache', return_value=LLMCache(os.path.join(self.temp_dir, "cache.sqlite3"))),
+            patch('gemini.get_user_metrics', side_effect=user_metrics),
+        ]
+        for active in self.patches:
+            active.start()
+
+    def tearDown(self):
+        for active in self.patches:
+            active.stop()
+        set_advice_backend(None)
+        shutil.rmtree(self.temp_dir)
+        self.ctx.pop()
+
+    def test_ideas_are_cached(self):
+        with patch.object(self.backend, 'generate', wraps=self.backend.generate) as spy:
+            ideas = gemini.get_course_improvement_ideas("a@example.com")
+            self.assertEqual(gemini.get_course_improvement_ideas("a@example.com"), ideas)
+        self.assertEqual(len(ideas), 2)
+        spy.assert_called_once()
+
+    def test_ideas_streamed_over_sse(self):
+        response = self.app.test_client().get('/api/improvement_ideas/a@example.com/stream')
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = response.get_data(as_text=True).split("\n\n")
+        self.assertTrue(events[0].startswith('data: "Prioritize this checklist item'))
+        self.assertEqual(events[2], 'event: done\ndata: {"count": 2}')
+        # The streamed ideas were cached, so the batch path gets them without generating again
+        self.assertEqual(len(gemini.get_cached_ideas(user_metrics("a@example.com"))), 2)
+
+    @patch('advice_batch.ADVICE_RETRY_BACKOFF', 0)
+    def test_rate_limited_requests_are_retried(self):
+        with patch.object(self.backend, 'generate', side_effect=[RateLimitedError(), "- Post a weekly overview."]):
+            ideas = advice_batch.generate_with_retry(user_metrics("b@example.com"), TokenBucket(rate=1000))
+        self.assertEqual(ideas, ["Post a weekly overview."])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+from unittest.mock import patch, MagicMock
+from flask import Flask
+import jobs
+from admin import admin_bp
+from advice_batch import TokenBucket, collect_term_metrics, is_rate_limited
+
+
+class RateLimitTests(unittest.TestCase):
+    def test_token_bucket_spaces_requests(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)  # The first token is free, then one every 20 ms
+
+    def test_is_rate_limited(self):
+        self.assertTrue(is_rate_limited(MagicMock(code=429)))
+        self.assertFalse(is_rate_limited(MagicMock(code=500)))
+        self.assertFalse(is_rate_limited(ValueError("no code")))
+
+
+class AdviceJobTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(admin_bp)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.spool = tempfile.mkdtemp()
+        self.spool_patch = patch('jobs.SPOOL_DIR', self.spool)
+        self.spool_patch.start()
+
+    def tearDown(self):
+        self.spool_patch.stop()
+        shutil.rmtree(self.spool, ignore_errors=True)
+        self.ctx.pop()
+
+    def wait_for(self, job_id):
+        for _ in range(500):
+            job = jobs.read_job(job_id)
+            if job["status"] not in jobs.UNFINISHED_STATUSES:
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} did not finish")
+
+    @patch('advice_batch.get_client')
+    def test_term_metrics_grouped_by_email(self, mock_get_client):
+        records = {
+            "Milestone_1": [{"email": "a@example.com", "respond_in_2_days": True}, {"email": "b@example.com"}],
+            "Milestone_2": [{"email": "a@example.com", "add_weekly_overview": False}, {"email": ""}],
+            "Milestone_3": [],
+        }
+        mock_get_client.return_value.iter_records.side_effect = lambda milestone, **kwargs: iter(records[milestone])
+        metrics = collect_term_metrics(date(2024, 10, 14))
+        self.assertEqual(sorted(metrics), ["a@example.com", "b@example.com"])
+        self.assertEqual([s["milestone"] for s in metrics["a@example.com"]["submissions"]], ["Milestone_1", "Milestone_2"])
+        for call in mock_get_client.return_value.iter_records.call_args_list:  # One filtered pass per collection
+            self.assertIn("term_start_date >= '2024-10-14 00:00:00'", call.kwargs["filter"])
+        self.assertEqual(mock_get_client.return_value.iter_records.call_count, 3)
+
+    @patch('advice_batch.generate_with_retry')
+    @patch('advice_batch.collect_term_metrics')
+    def test_job_stores_results_per_coordinator(self, mock_collect, mock_generate):
+        mock_collect.return_value = {
+            email: {"email": email, "submissions": []} for email in ["a@example.com", "b@example.com"]
+        }
+
+        def generate(metrics, bucket):
+            if metrics["email"] == "b@example.com":
+                raise RuntimeError("quota exceeded")
+            return ["Post a weekly overview."]
+
+        mock_generate.side_effect = generate
+        response = self.client.post('/admin/advice?term_start_date=2024-10-14')
+        self.assertEqual(response.status_code, 202)
+        job = self.wait_for(response.get_json()["job_id"])
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual((job["total"], job["completed"], job["failed"]), (2, 1, 1))
+        mock_collect.assert_called_once_with(date(2024, 10, 14))
+
+        response = self.client.get(f"/admin/advice/{job['id']}?email=a@example.com")
+        self.assertEqual(response.get_json(), {"status": "completed", "ideas": ["Post a weekly overview."]})
+        response = self.client.get(f"/admin/advice/{job['id']}?email=b@example.com")
+        self.assertEqual(response.get_json()["status"], "failed")
+
+    @patch('advice_batch.run_advice_job')
+    @patch('jobs.run_job')
+    def test_unfinished_advice_jobs_are_resumed(self, mock_run_job, mock_run_advice_job):
+        threads = []
+        mock_run_advice_job.side_effect = lambda job_id: threads.append(threading.current_thread().name)
+        jobs.write_job({"id": "a" * 32, "type": "advice", "status": "running"})
+        self.assertEqual(jobs.resume_jobs(), 1)
+        for _ in range(100):  # Wait for the queued job to be picked up
+            if mock_run_advice_job.called:
+                break
+            time.sleep(0.01)
+        mock_run_advice_job.assert_called_once_with("a" * 32)
+        mock_run_job.assert_not_called()
+        self.assertTrue(threads[0].startswith("advice-job"))  # Resumed in the advice pool, not the spreadsheet one
+
+    def test_advice_jobs_have_their_own_pool(self):
+        self.assertIsNot(jobs.get_executor("advice"), jobs.get_executor())
+        threads = []
+        jobs.get_executor("advice").submit(lambda: threads.append(threading.current_thread().name)).result()
+        self.assertTrue(threads[0].startswith("advice-job"))
+
+    def test_routes_validate_input(self):
+        self.assertEqual(self.client.post('/admin/advice?term_start_date=14/10/2024').status_code, 400)
+        self.assertEqual(self.client.get('/admin/advice/' + 'f' * 32).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import json
+import threading
+import unittest
+from datetime import datetime, timezone
+from io import BytesIO
+from unittest.mock import patch
+import httpx
+from openpyxl import load_workbook
+import app as app_module
+import async_pb_client
+import date as date_module
+import db_schema
+import db_util
+from async_pb_client import AsyncPocketBaseClient
+from date import AESTClock, set_clock
+from metrics import invalidate_user_metrics
+
+# async_app serves the Flask app as its fallback, so it's imported with one built without PocketBase
+with patch('app.initialize_collections'), patch('app.resume_jobs'), \
+        patch.dict(vars(app_module), {"app": app_module.create_app(manage_pocketbase=False)}):
+    import async_app
+
+
+class FakePocketBase:
+    """
+    Records of each milestone collection, served through httpx's mock transport like the PocketBase REST API.
+    """
+    def __init__(self):
+        self.records = {milestone: {} for milestone in db_schema.SCHEMAS}
+        self.requests = []
+        self.unreachable = False
+        self.unreachable_collections = set()
+
+    def __call__(self, request):
+        self.requests.append(request)
+        parts = request.url.path.strip("/").split("/")  # api/collections/<milestone>/records[/<id>]
+        if self.unreachable or parts[2] in self.unreachable_collections:
+            raise httpx.ConnectError("Connection refused", request=request)
+        records = self.records.get(parts[2])
+        if records is None:
+            return httpx.Response(404, json={"message": "Collection not found"})
+        if len(parts) == 4:
+            if request.method == "POST":
+                record = {"id": f"record{len(self.requests)}", **json.loads(request.content)}
+                records[record["id"]] = record
+                return httpx.Response(200, json=record)
+            items = list(records.values())
+            return httpx.Response(200, json={"page": 1, "totalPages": 1, "items": items})
+        record = records.get(parts[4])
+        if record is None:
+            return httpx.Response(404, json={"message": "Record not found"})
+        if request.method == "DELETE":
+            del records[parts[4]]
+            return httpx.Response(204)
+        if request.method == "PATCH":
+            record.update(json.loads(request.content))
+        return httpx.Response(200, json=record)
+
+
+class AsyncAppTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.original_clock = date_module.clock
+        # 10 days after the 2024-10-14 term start, so submissions for that term go to Milestone_2
+        set_clock(AESTClock(now=lambda: datetime(2024, 10, 24, 1, 0, tzinfo=timezone.utc), time_source_url=None))
+        db_util._field_registry.clear()
+        db_util._field_registry.update({milestone: list(index.fields) for milestone, index in db_schema.SCHEMA_INDEX.items()})
+        db_util._registry_version = db_schema.SCHEMA_VERSION
+        self.token_patch = patch('async_pb_client.token_manager')
+        self.token_patch.start().peek.return_value = "token"
+        self.pocketbase = FakePocketBase()
+        async_pb_client._async_client = AsyncPocketBaseClient(
+            "http://pocketbase.test", backoff_factor=0, transport=httpx.MockTransport(self.pocketbase))
+        self.client = async_app.asgi_app.test_client()
+        invalidate_user_metrics()
+
+    async def asyncTearDown(self):
+        await async_pb_client.close_async_client()
+        self.token_patch.stop()
+        db_util._field_registry.clear()
+        db_util._registry_version = None
+        set_clock(self.original_clock)
+
+    def add_record(self, milestone, **fields):
+        record = {"id": f"{milestone.lower()}abc", "term_start_date": "2024-10-14 00:00:00.000Z", **fields}
+        self.pocketbase.records[milestone][record["id"]] = record
+        return record
+
+    async def test_submit_form(self):
+        response = await self.client.post('/api/submit_form', json={
+            "term_start_date": "2024-10-14", "email": "coordinator@example.com", "name": "Jane"})
+        self.assertEqual(response.status_code, 200)
+        record_id = (await response.get_json())["record_id"]
+        self.assertEqual(self.pocketbase.records["Milestone_2"][record_id]["email"], "coordinator@example.com")
+        self.assertEqual(db_util.get_record_location(record_id), "Milestone_2")
+
+    async def test_submit_form_sends_values_as_entered(self):
+        response = await self.client.post('/api/submit_form', json={"term_start_date": "2024-10-14", "respond_in_2_days": "x"})
+        record = self.pocketbase.records["Milestone_2"][(await response.get_json())["record_id"]]
+        self.assertEqual(record["respond_in_2_days"], "x")
+        self.assertIsNone(record["add_weekly_overview"])
+        self.assertEqual(record["term_start_date"], "2024-10-14")
+
+    async def test_submit_form_rejects_bad_dates(self):
+        response = await self.client.post('/api/submit_form', json={"term_start_date": "14/10/2024"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.pocketbase.requests, [])
+
+    async def test_submit_form_reports_unreachable_pocketbase(self):
+        self.pocketbase.unreachable = True
+        response = await self.client.post('/api/submit_form', json={"term_start_date": "2024-10-14"})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual((await response.get_json())["error"], "An unexpected error occurred")
+
+    async def test_submit_form_syncs_registry_off_the_event_loop(self):
+        db_util._registry_version = None
+        sync_threads = []
+
+        def sync(reconcile=True):
+            sync_threads.append(threading.current_thread())
+            db_util._registry_version = db_schema.SCHEMA_VERSION
+
+        with patch('db_util.sync_collection_schemas', side_effect=sync):
+            response = await self.client.post('/api/submit_form', json={"term_start_date": "2024-10-14"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(sync_threads), 1)
+        self.assertIsNot(sync_threads[0], threading.current_thread())
+
+    async def test_get_record(self):
+        record = self.add_record("Milestone_2", email="coordinator@example.com")
+        response = await self.client.get(f'/api/get_record/{record["id"]}?term_start_date=2024-10-14')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await response.get_json())["reponse data"]["email"], "coordinator@example.com")
+        self.assertEqual((await self.client.get('/api/get_record/missing?term_start_date=2024-10-14')).status_code, 404)
+        self.assertEqual((await self.client.get('/api/get_record/abc?term_start_date=soon')).status_code, 400)
+
+    async def test_get_record_without_term_searches_every_milestone(self):
+        record = self.add_record("Milestone_3", email="coordinator@example.com")
+        response = await self.client.get(f'/api/get_record/{record["id"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(db_util.get_record_location(record["id"]), "Milestone_3")
+        self.assertEqual((await self.client.get('/api/get_record/missing')).status_code, 404)
+
+    async def test_unreachable_location_falls_back_to_every_milestone(self):
+        record = self.add_record("Milestone_3")
+        db_util.remember_record_location(record["id"], "Milestone_1")
+        self.pocketbase.unreachable_collections.add("Milestone_1")
+        response = await self.client.get(f'/api/get_record/{record["id"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(db_util.get_record_location(record["id"]), "Milestone_3")
+
+    async def test_update_record(self):
+        record = self.add_record("Milestone_2", name="Jane")
+        response = await self.client.patch(
+            f'/api/update_record/{record["id"]}?term_start_date=2024-10-14', json={"name": "Janet"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.pocketbase.records["Milestone_2"][record["id"]]["name"], "Janet")
+        response = await self.client.patch(f'/api/update_record/{record["id"]}', json={"name": "Janet"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_delete_record(self):
+        record = self.add_record("Milestone_2")
+        response = await self.client.delete(f'/api/delete_record/{record["id"]}?term_start_date=2024-10-14')
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn(record["id"], self.pocketbase.records["Milestone_2"])
+        response = await self.client.delete(f'/api/delete_record/{record["id"]}?term_start_date=2024-10-14')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual((await self.client.delete('/api/delete_record/abc')).status_code, 400)
+
+    async def test_get_spreadsheet(self):
+        record = self.add_record("Milestone_1", email="coordinator@example.com")
+        response = await self.client.get(f'/api/get_spreadsheet/{record["id"]}?milestone=Milestone_1')
+        self.assertEqual(response.status_code, 200)
+        worksheet = load_workbook(BytesIO(await response.get_data())).active
+        values = {row[0]: row[1] for row in worksheet.iter_rows(min_row=2, values_only=True)}
+        self.assertEqual(values["email"], "coordinator@example.com")
+        self.assertEqual((await self.client.get('/api/get_spreadsheet/missing?milestone=Milestone_1')).status_code, 404)
+        self.assertEqual((await self.client.get(f'/api/get_spreadsheet/{record["id"]}')).status_code, 400)
+
+    async def test_metrics(self):
+        self.add_record("Milestone_1", email="coordinator@example.com", start_time="2024-10-14T10:00:00Z",
+                        completion_time="2024-10-14T10:30:00Z")
+        response = await self.client.get('/api/metrics/coordinator@example.com')
+        self.assertEqual(response.status_code, 200)
+        submissions = (await response.get_json())["submissions"]
+        self.assertEqual([submission["time_taken_minutes"] for submission in submissions], [30])
+        filters = {request.url.params.get("filter") for request in self.pocketbase.requests}
+        self.assertEqual(filters, {"(email='coordinator@example.com')"})
+
+    async def test_other_routes_are_served_by_flask(self):
+        response = await self.client.get('/api/jobs/' + 'f' * 32)  # Only defined in the Flask app
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(await response.get_json(), {"error": "Job not found"})
+        response = await self.client.get('/api/submit_form')  # Async path, but not an async method
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.pocketbase.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import unittest
+from unittest.mock import patch
+import httpx
+from flask import Flask
+from async_pb_client import AsyncPocketBaseClient
+
+
+class AsyncPocketBaseClientTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.requests = []
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def client(self, handler):
+        def record(request):
+            self.requests.append(request)
+            return handler(request)
+        return AsyncPocketBaseClient("http://pocketbase.test", backoff_factor=0, transport=httpx.MockTransport(record))
+
+    @patch('async_pb_client.token_manager')
+    async def test_rejected_token_is_refreshed_once(self, mock_token_manager):
+        mock_token_manager.peek.side_effect = ["stale", "fresh"]
+        client = self.client(lambda request: httpx.Response(
+            200 if request.headers["Authorization"] == "fresh" else 401, json={}))
+        response = await client.get("/api/collections/Milestone_1/records/abc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([request.headers["Authorization"] for request in self.requests], ["stale", "fresh"])
+        mock_token_manager.invalidate.assert_called_once_with("stale")
+        await client.aclose()
+
+    @patch('async_pb_client.token_manager')
+    async def test_only_idempotent_requests_are_retried(self, mock_token_manager):
+        mock_token_manager.peek.return_value = "token"
+        client = self.client(lambda request: httpx.Response(503))
+        self.assertEqual((await client.get("/api/health")).status_code, 503)
+        self.assertEqual(len(self.requests), client.max_retries + 1)
+        self.requests.clear()
+        await client.post("/api/collections/Milestone_1/records", json={})
+        self.assertEqual(len(self.requests), 1)
+        await client.aclose()
+
+    @patch('async_pb_client.token_manager')
+    async def test_iter_records_walks_every_page(self, mock_token_manager):
+        mock_token_manager.peek.return_value = "token"
+
+        def page(request):
+            number = int(request.url.params["page"])
+            return httpx.Response(200, json={"page": number, "totalPages": 3, "items": [{"id": f"record{number}"}] * 2})
+        client = self.client(page)
+        records = [record async for record in client.iter_records("Milestone_1", per_page=2)]
+        self.assertEqual(len(records), 6)
+        self.assertEqual([request.url.params["page"] for request in self.requests], ["1", "2", "3"])
+        await client.aclose()
+
+
+if __name__ == '__main__':
+    unittest.main()
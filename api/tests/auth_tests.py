@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import base64
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from utility_services import TokenManager
+
+
+def make_token(exp: float) -> str:  # Build an unsigned JWT with the given expiry
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class TokenManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def test_decode_expiry(self):
+        token = make_token(1700000000)
+        self.assertEqual(TokenManager.decode_expiry(token), 1700000000)
+        self.assertEqual(TokenManager.decode_expiry("not-a-jwt"), 0)
+
+    @patch('utility_services._request_admin_token')
+    def test_token_is_cached_until_close_to_expiry(self, mock_request_token):
+        manager = TokenManager(refresh_margin=60)
+        mock_request_token.return_value = make_token(time.time() + 3600)
+        first = manager.get_token()
+        second = manager.get_token()
+        self.assertEqual(first, second)
+        self.assertEqual(mock_request_token.call_count, 1)
+        # A token inside the refresh margin is replaced
+        mock_request_token.return_value = make_token(time.time() + 30)
+        manager.invalidate()
+        manager.get_token()
+        manager.get_token()
+        self.assertEqual(mock_request_token.call_count, 3)
+
+    @patch('utility_services._request_admin_token')
+    def test_concurrent_callers_share_one_refresh(self, mock_request_token):
+        manager = TokenManager()
+
+        def slow_token():
+            time.sleep(0.05)
+            return make_token(time.time() + 3600)
+        mock_request_token.side_effect = slow_token
+        threads = [threading.Thread(target=manager.get_token) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mock_request_token.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import itertools
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch, Mock
+from flask import Flask
+import date as date_module
+from date import AESTClock, set_clock
+from spreadsheets import ingest_rows
+
+
+class BulkUploadTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.original_clock = date_module.clock
+        # 10 days after the term start below, so rows resolve to Milestone_2
+        set_clock(AESTClock(now=lambda: datetime(2024, 10, 24, 1, 0, tzinfo=timezone.utc), time_source_url=None))
+        self.ids = itertools.count()
+
+    def tearDown(self):
+        set_clock(self.original_clock)
+        self.ctx.pop()
+
+    def created_response(self, path, **kwargs):
+        response = Mock(status_code=200)
+        response.json.return_value = {"id": f"record{next(self.ids)}"}
+        return response
+
+    @patch('spreadsheets.get_client')
+    def test_rows_are_validated_and_reported(self, mock_get_client):
+        mock_get_client.return_value.post.side_effect = self.created_response
+        rows = [
+            {"term_start_date": "2024-10-14", "email": "a@example.com", "respond_in_2_days": "yes"},
+            {"term_start_date": "2024-10-14", "email": "not-an-email", "respond_in_2_days": True},
+            {"term_start_date": None, "email": None, "respond_in_2_days": None},  # Blank row
+            {"term_start_date": None, "email": "b@example.com", "respond_in_2_days": False},
+            {"term_start_date": "2024-10-14", "email": "c@example.com", "respond_in_2_days": float("nan")},
+        ]
+        report = ingest_rows(rows)
+        self.assertEqual(report["total_rows"], 4)
+        self.assertEqual(report["created"], 2)
+        self.assertEqual(report["failed"], 2)
+        self.assertEqual([result["row"] for result in report["rows"]], [2, 3, 5, 6])
+        self.assertEqual(report["rows"][0]["milestone"], "Milestone_2")
+        self.assertIn("email is not a valid email address: not-an-email", report["rows"][1]["errors"])
+        self.assertIn("term_start_date is required", report["rows"][2]["errors"])
+        posted = [call.kwargs["json"] for call in mock_get_client.return_value.post.call_args_list]
+        self.assertEqual(len(posted), 2)
+        self.assertTrue(all(record["academic_period"] == "Term" for record in posted))
+        self.assertEqual([record["respond_in_2_days"] for record in posted], ["yes", None])
+
+    @patch('spreadsheets.get_client')
+    def test_date_cells_are_sent_as_iso_strings(self, mock_get_client):
+        mock_get_client.return_value.post.side_effect = self.created_response
+        ingest_rows([{"term_start_date": datetime(2024, 10, 14), "completion_time": datetime(2024, 10, 20, 9, 30)}])
+        posted = mock_get_client.return_value.post.call_args.kwargs["json"]
+        self.assertEqual(posted["term_start_date"], "2024-10-14T00:00:00")
+        self.assertEqual(posted["completion_time"], "2024-10-20T09:30:00")
+
+    @patch('spreadsheets.BULK_BATCH_SIZE', 3)
+    @patch('spreadsheets.get_client')
+    def test_rows_are_inserted_in_batches(self, mock_get_client):
+        mock_get_client.return_value.post.side_effect = self.created_response
+        rows = [{"term_start_date": "2024-10-14", "email": f"user{i}@example.com"} for i in range(10)]
+        report = ingest_rows(rows, sem=True)
+        self.assertEqual(report["created"], 10)
+        self.assertEqual(len({result["record_id"] for result in report["rows"]}), 10)
+        for call in mock_get_client.return_value.post.call_args_list:
+            self.assertEqual(call.kwargs["json"]["academic_period"], "Semester")
+
+    @patch('spreadsheets.get_client')
+    def test_failed_inserts_are_reported(self, mock_get_client):
+        mock_get_client.return_value.post.return_value = Mock(status_code=400, text="Failed to create record.")
+        report = ingest_rows([{"term_start_date": "2024-10-14"}])
+        self.assertEqual(report["rows"][0], {
+            "row": 2, "status": "error", "milestone": "Milestone_2", "errors": ["Failed to create record."]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import logging
+import unittest
+from unittest.mock import patch, Mock
+from datetime import datetime, date, timedelta, timezone
+from flask import Flask
+import date as date_module
+from date import AESTClock, determine_form, set_clock
+
+
+class FakeTime:  # Injectable UTC clock that tests can move forward
+    def __init__(self, current: datetime):
+        self.current = current
+
+    def __call__(self) -> datetime:
+        return self.current
+
+
+class AESTClockTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.original_clock = date_module.clock
+
+    def tearDown(self):
+        set_clock(self.original_clock)
+        self.ctx.pop()
+
+    def test_date_rolls_over_at_melbourne_midnight(self):
+        fake_now = FakeTime(datetime(2024, 10, 14, 12, 59, tzinfo=timezone.utc))  # 11:59 pm AEDT
+        clock = AESTClock(now=fake_now, time_source_url=None)
+        self.assertEqual(clock.today(), date(2024, 10, 14))
+        fake_now.current += timedelta(minutes=1)
+        self.assertEqual(clock.today(), date(2024, 10, 15))
+
+    def test_determine_form_uses_injected_clock(self):
+        fake_now = FakeTime(datetime(2024, 10, 24, 1, 0, tzinfo=timezone.utc))
+        set_clock(AESTClock(now=fake_now, time_source_url=None))
+        self.assertEqual(determine_form(date(2024, 10, 14)), "Milestone_2")
+        fake_now.current += timedelta(days=10)
+        self.assertEqual(determine_form(date(2024, 10, 14)), "Milestone_3")
+
+    @patch('date.AESTClock._maybe_check_drift')  # today() would otherwise check again on a thread, unpatched
+    @patch('date.requests.get')
+    def test_drift_check_applies_offset(self, mock_get, mock_maybe_check_drift):
+        fake_now = FakeTime(datetime(2024, 10, 14, 12, 0, tzinfo=timezone.utc))
+        mock_get.return_value = Mock(status_code=200)
+        mock_get.return_value.json.return_value = {"utc_datetime": "2024-10-14T13:30:00+00:00"}
+        clock = AESTClock(now=fake_now, time_source_url="http://time.example.com")
+        offset = clock.check_drift(logging.getLogger(__name__))
+        self.assertEqual(offset, timedelta(minutes=90))
+        self.assertEqual(clock.today(), date(2024, 10, 15))
+
+    @patch('date.AESTClock._maybe_check_drift')  # today() would otherwise check again on a thread, unpatched
+    @patch('date.requests.get')
+    def test_failed_drift_check_keeps_local_time(self, mock_get, mock_maybe_check_drift):
+        fake_now = FakeTime(datetime(2024, 10, 14, 1, 0, tzinfo=timezone.utc))
+        mock_get.side_effect = date_module.requests.ConnectionError()
+        clock = AESTClock(now=fake_now, time_source_url="http://time.example.com")
+        self.assertIsNone(clock.check_drift(logging.getLogger(__name__)))
+        self.assertEqual(clock.today(), date(2024, 10, 14))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import csv
+import itertools
+import tempfile
+import unittest
+import zipfile
+from datetime import date
+from io import BytesIO, StringIO
+from unittest.mock import patch
+import requests
+from flask import Flask, request
+from openpyxl import Workbook, load_workbook
+from werkzeug.datastructures import FileStorage
+from spreadsheets import (export_collection, export_records_zip, read_field_values, read_workbook_rows,
+                          render_record_workbook, term_range_filter)
+
+
+def fake_records(collection_name, **kwargs):  # A collection larger than one CSV chunk
+    for i in range(1201):
+        yield {"id": f"record{i}", "email": f"user{i}@example.com", "respond_in_2_days": i % 2 == 0}
+
+
+def failing_records(collection_name, **kwargs):  # PocketBase goes away after the first page
+    yield from itertools.islice(fake_records(collection_name), 500)
+    raise requests.ConnectionError("PocketBase went away")
+
+
+class CollectionExportTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.add_url_rule(
+            '/export/<milestone>', 'export',
+            view_func=lambda milestone: export_collection(milestone, request.args.get('format', 'xlsx')))
+        self.app.add_url_rule(
+            '/zip', 'zip', methods=['POST'],
+            view_func=lambda: export_records_zip(request.json.get('ids'), request.json.get('milestone')))
+        self.client = self.app.test_client()
+
+    def test_term_range_filter(self):
+        self.assertIsNone(term_range_filter())
+        self.assertEqual(
+            term_range_filter(date(2024, 10, 1), date(2024, 10, 31)),
+            "term_start_date >= '2024-10-01 00:00:00' && term_start_date <= '2024-10-31 23:59:59'")
+
+    @patch('spreadsheets.get_client')
+    def test_csv_export_is_streamed(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = fake_records
+        response = self.client.get('/export/Milestone_2?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        rows = list(csv.reader(StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[0][:3], ["id", "created", "updated"])
+        self.assertEqual(len(rows), 1202)
+        self.assertEqual(rows[1][rows[0].index("email")], "user0@example.com")
+
+    @patch('spreadsheets.get_client')
+    def test_xlsx_export_contains_every_record(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = fake_records
+        response = self.client.get('/export/Milestone_2')
+        self.assertEqual(response.status_code, 200)
+        worksheet = load_workbook(BytesIO(response.get_data())).active
+        response.close()
+        self.assertEqual(worksheet.max_row, 1202)
+        self.assertEqual(worksheet.cell(row=2, column=1).value, "record0")
+
+    @patch('spreadsheets.get_client')
+    def test_csv_export_ends_early_when_pocketbase_fails(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = failing_records
+        with self.assertLogs(self.app.logger, level="ERROR"):
+            response = self.client.get('/export/Milestone_2?format=csv')
+            rows = list(csv.reader(StringIO(response.get_data(as_text=True))))
+        self.assertEqual(response.status_code, 200)  # Already sent when the failure happened
+        self.assertEqual(len(rows), 501)
+
+    @patch('spreadsheets.get_client')
+    def test_csv_export_fails_when_pocketbase_is_unreachable(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = requests.ConnectionError("refused")
+        self.assertEqual(self.client.get('/export/Milestone_2?format=csv').status_code, 502)
+
+    @patch('spreadsheets.get_client')
+    def test_xlsx_export_failure_removes_temporary_file(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = failing_records
+        before = set(os.listdir(tempfile.gettempdir()))
+        response = self.client.get('/export/Milestone_2')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(set(os.listdir(tempfile.gettempdir())) - before, set())
+
+    def test_unknown_milestone(self):
+        self.assertEqual(self.client.get('/export/Milestone_9').status_code, 404)
+
+    @patch('spreadsheets.locate_record')
+    def test_zip_export_by_ids(self, mock_locate_record):
+        mock_locate_record.side_effect = lambda record_id: None if record_id == "missing" else (
+            "Milestone_1", {"id": record_id, "email": "user@example.com"})
+        response = self.client.post('/zip', json={"ids": ["abc", "def", "missing", "abc"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        archive = zipfile.ZipFile(BytesIO(response.get_data()))
+        names = sorted(archive.namelist())
+        self.assertEqual(names, ["Milestone_1/record_abc.xlsx", "Milestone_1/record_def.xlsx", "errors.txt"])
+        self.assertIn("missing", archive.read("errors.txt").decode())
+        worksheet = load_workbook(BytesIO(archive.read("Milestone_1/record_abc.xlsx"))).active
+        self.assertEqual(worksheet.cell(row=2, column=2).value, "abc")
+
+    @patch('spreadsheets.get_client')
+    def test_zip_export_by_milestone(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = fake_records
+        response = self.client.post('/zip', json={"milestone": "Milestone_2"})
+        archive = zipfile.ZipFile(BytesIO(response.get_data()))
+        self.assertEqual(len(archive.namelist()), 1201)
+        self.assertIsNone(archive.testzip())
+
+    def test_zip_export_needs_ids_or_milestone(self):
+        self.assertEqual(self.client.post('/zip', json={}).status_code, 400)
+        self.assertEqual(self.client.post('/zip', json={"milestone": "Milestone_9"}).status_code, 404)
+
+
+def upload(rows, filename='upload.xlsx'):  # Build an uploaded workbook from a list of rows
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    content = BytesIO()
+    workbook.save(content)
+    content.seek(0)
+    return FileStorage(stream=content, filename=filename)
+
+
+class SpreadsheetReaderTests(unittest.TestCase):
+    def test_exported_record_reads_back(self):
+        record = {"id": "abc", "email": "user@example.com", "respond_in_2_days": True, "name": ""}
+        form_data = read_field_values(FileStorage(
+            stream=BytesIO(render_record_workbook("abc", record)), filename="record_abc.xlsx"))
+        self.assertEqual(form_data["email"], "user@example.com")
+        self.assertEqual(form_data["respond_in_2_days"], "True")
+        self.assertEqual(form_data["name"], "No response provided")
+
+    def test_header_row_layout(self):
+        form_data = read_field_values(upload([
+            ["term_start_date", "email", None], [date(2024, 10, 14), "user@example.com", None]]))
+        self.assertEqual(form_data["email"], "user@example.com")
+        self.assertEqual(form_data["term_start_date"].date(), date(2024, 10, 14))
+        self.assertNotIn("", form_data)
+
+    def test_rows_are_keyed_by_header(self):
+        rows = read_workbook_rows(upload([["email", " name "], ["a@example.com", None], ["b@example.com", "B"]]))
+        self.assertEqual(rows, [{"email": "a@example.com", "name": None}, {"email": "b@example.com", "name": "B"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import unittest
+from unittest.mock import patch
+import app as app_module
+
+
+@patch('app.resume_jobs')
+@patch('app.initialize_collections')
+class AppFactoryTests(unittest.TestCase):
+    def test_import_has_no_side_effects(self, mock_initialize_collections, mock_resume_jobs):
+        self.assertNotIn('app', vars(app_module))
+        mock_initialize_collections.assert_not_called()
+
+    @patch('app.signal.signal')
+    @patch('app.ensure_pocketbase_running')
+    def test_supervised_workers_leave_pocketbase_alone(self, mock_ensure_pocketbase_running, mock_signal,
+                                                      mock_initialize_collections, mock_resume_jobs):
+        app = app_module.create_app(manage_pocketbase=False)
+        mock_ensure_pocketbase_running.assert_not_called()
+        mock_signal.assert_not_called()
+        mock_initialize_collections.assert_called_once()
+        rules = {rule.rule for rule in app.url_map.iter_rules()}
+        self.assertIn('/api/submit_form', rules)
+        self.assertIn('/admin/dashboard', rules)
+
+    def test_workers_only_load_schemas(self, mock_initialize_collections, mock_resume_jobs):
+        app_module.create_app(manage_pocketbase=False, reconcile_schemas=False)
+        mock_initialize_collections.assert_called_once_with(reconcile=False)
+        mock_resume_jobs.assert_called_once()  # Including workers replaced after max_requests, see wsgi.py
+
+
+@patch('app.resume_jobs')
+@patch('app.initialize_collections')
+class FormSubmitTests(unittest.TestCase):
+    @patch('core_api_logic.get_collection_fields', return_value=["term_start_date", "email", "respond_in_2_days", "add_weekly_overview"])
+    @patch('core_api_logic.get_client')
+    @patch('core_api_logic.authenticate', return_value="token")
+    @patch('core_api_logic.determine_form', return_value="Milestone_2")
+    def test_values_are_sent_as_entered(self, mock_determine_form, mock_authenticate, mock_get_client,
+                                        mock_get_collection_fields, mock_initialize_collections, mock_resume_jobs):
+        mock_get_client.return_value.post.return_value.status_code = 200
+        mock_get_client.return_value.post.return_value.json.return_value = {"id": "abc"}
+        client = app_module.create_app(manage_pocketbase=False).test_client()
+        response = client.post('/api/submit_form', json={
+            "term_start_date": "2024-10-14", "email": "coordinator@example.com", "respond_in_2_days": "done"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_client.return_value.post.call_args.kwargs["json"], {
+            "term_start_date": "2024-10-14", "email": "coordinator@example.com",
+            "respond_in_2_days": "done", "add_weekly_overview": None})
+
+
+class ServerSentEventTests(unittest.TestCase):
+    def test_ideas_streamed_as_events(self):
+        events = list(app_module.sse_ideas(iter(["Post a weekly overview.", 'Reply to "urgent" posts first.'])))
+        self.assertEqual(events, [
+            'data: "Post a weekly overview."\n\n',
+            'data: "Reply to \\"urgent\\" posts first."\n\n',
+            'event: done\ndata: {"count": 2}\n\n',
+        ])
+
+    def test_error_ends_the_stream(self):
+        def ideas():
+            yield "Post a weekly overview."
+            raise RuntimeError("quota exceeded")
+
+        with app_module.Flask(__name__).app_context():
+            events = list(app_module.sse_ideas(ideas()))
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[1].startswith("event: error\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
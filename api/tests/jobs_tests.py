@@ -0,0 +1,150 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import itertools
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from io import BytesIO
+from unittest.mock import patch, Mock
+from flask import Flask
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+import date as date_module
+import jobs
+from date import AESTClock, set_clock
+
+
+def workbook_upload(rows, filename='upload.xlsx'):  # Build an uploaded workbook from a list of rows
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    content = BytesIO()
+    workbook.save(content)
+    content.seek(0)
+    return FileStorage(stream=content, filename=filename)
+
+
+class SpreadsheetJobTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.original_clock = date_module.clock
+        # 10 days after the term start below, so rows resolve to Milestone_2
+        set_clock(AESTClock(now=lambda: datetime(2024, 10, 24, 1, 0, tzinfo=timezone.utc), time_source_url=None))
+        self.spool = tempfile.mkdtemp()
+        self.spool_patch = patch('jobs.SPOOL_DIR', self.spool)
+        self.spool_patch.start()
+        self.ids = itertools.count()
+
+    def tearDown(self):
+        self.spool_patch.stop()
+        shutil.rmtree(self.spool, ignore_errors=True)
+        set_clock(self.original_clock)
+        self.ctx.pop()
+
+    def created_response(self, path, **kwargs):
+        response = Mock(status_code=200)
+        response.json.return_value = {"id": f"record{next(self.ids)}"}
+        return response
+
+    def wait_for(self, job_id):  # Poll the job record like a client would
+        for _ in range(500):
+            job = jobs.read_job(job_id)
+            if job["status"] not in jobs.UNFINISHED_STATUSES:
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} did not finish")
+
+    @patch('spreadsheets.get_client')
+    def test_bulk_job_records_progress_and_report(self, mock_get_client):
+        mock_get_client.return_value.post.side_effect = self.created_response
+        upload = workbook_upload([
+            ["term_start_date", "email"],
+            ["2024-10-14", "a@example.com"],
+            ["2024-10-14", "not-an-email"],
+            ["2024-10-14", "b@example.com"],
+        ])
+        job = jobs.submit_spreadsheet_job(upload, bulk=True)
+        self.assertEqual(job["status"], "queued")
+        job = self.wait_for(job["id"])
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual((job["total_rows"], job["created_rows"], job["failed_rows"]), (3, 2, 1))
+        self.assertEqual([row["row"] for row in job["rows"]], [2, 3, 4])
+        for _ in range(100):  # The upload is removed just after the final job record is written
+            if not os.path.exists(os.path.join(self.spool, job["upload"])):
+                break
+            time.sleep(0.01)
+        self.assertFalse(os.path.exists(os.path.join(self.spool, job["upload"])))
+
+    @patch('spreadsheets.get_client')
+    def test_unfinished_jobs_resume_without_duplicates(self, mock_get_client):
+        mock_get_client.return_value.post.side_effect = self.created_response
+        job_id = "0" * 32
+        workbook_upload([
+            ["term_start_date", "email"], ["2024-10-14", "a@example.com"], ["2024-10-14", "b@example.com"]
+        ]).save(os.path.join(self.spool, f"{job_id}.xlsx"))
+        with open(os.path.join(self.spool, f"{job_id}.json"), "w") as job_file:
+            json.dump({
+                "id": job_id, "status": "running", "filename": "upload.xlsx", "upload": f"{job_id}.xlsx",
+                "sem": False, "bulk": True, "rows": [
+                    {"row": 2, "status": "created", "milestone": "Milestone_2", "record_id": "existing"}],
+                "total_rows": 2, "processed_rows": 1, "created_rows": 1, "failed_rows": 0, "error": None
+            }, job_file)
+        self.assertEqual(jobs.resume_jobs(), 1)
+        job = self.wait_for(job_id)
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["created_rows"], 2)
+        posted = [call.kwargs["json"]["email"] for call in mock_get_client.return_value.post.call_args_list]
+        self.assertEqual(posted, ["b@example.com"])
+
+    @patch('spreadsheets.get_client')
+    def test_single_uploads_are_validated_the_same_queued_or_not(self, mock_get_client):
+        from spreadsheets import parse_spreadsheet
+        rows = [["Field", "Value"], ["term_start_date", "2024-10-14"], ["email", "not-an-email"]]
+        with self.app.test_request_context(method="POST", data={"file": workbook_upload(rows)}):
+            response, status = parse_spreadsheet()
+        self.assertEqual(status, 400)
+        self.assertIn("email is not a valid email address: not-an-email", response.get_json()["details"])
+        job = self.wait_for(jobs.submit_spreadsheet_job(workbook_upload(rows))["id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["rows"][0]["errors"], response.get_json()["details"])
+        mock_get_client.return_value.post.assert_not_called()
+
+    def test_claim_removes_its_lock_file(self):
+        lock_path = jobs.job_path("a" * 32, ".lock")
+        with self.assertRaises(RuntimeError):
+            with jobs.claim_job("a" * 32) as claimed:
+                self.assertTrue(claimed)
+                with jobs.claim_job("a" * 32) as claimed_again:  # Another claimant while the lock is held
+                    self.assertFalse(claimed_again)
+                raise RuntimeError("job crashed")
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_stale_lock_handle_does_not_claim(self):
+        lock_path = jobs.job_path("a" * 32, ".lock")
+        real_open = open
+
+        def open_then_release(path, mode):  # The holder finishes between this claimant opening and locking the file
+            lock_file = real_open(path, mode)
+            os.remove(path)
+            return lock_file
+
+        with patch('jobs.open', side_effect=open_then_release, create=True):
+            with jobs.claim_job("a" * 32) as claimed:
+                self.assertFalse(claimed)
+        with jobs.claim_job("a" * 32) as claimed:
+            self.assertTrue(claimed)
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_unknown_job(self):
+        self.assertIsNone(jobs.read_job("0" * 32))
+        self.assertIsNone(jobs.read_job("../secrets"))
+
+
+if __name__ == '__main__':
+    unittest.main()
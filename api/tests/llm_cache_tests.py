@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from llm_cache import LLMCache, cache_key
+
+
+class LLMCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = LLMCache(os.path.join(self.temp_dir, "cache.sqlite3"), ttl=60, max_entries=3)
+        self.metrics = {
+            "email": "coordinator@example.com",
+            "submissions": [
+                {"milestone": "Milestone_1", "time_taken_minutes": 12.5, "boolean_responses": {"respond_in_2_days": True}},
+                {"milestone": "Milestone_2", "time_taken_minutes": None, "boolean_responses": {"add_weekly_overview": False}},
+            ],
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_key_ignores_submission_order(self):
+        reordered = {**self.metrics, "submissions": list(reversed(self.metrics["submissions"]))}
+        self.assertEqual(cache_key(self.metrics, "prompt {metrics}", "model"),
+                         cache_key(reordered, "prompt {metrics}", "model"))
+
+    def test_key_changes_with_metrics_prompt_and_model(self):
+        key = cache_key(self.metrics, "prompt {metrics}", "model")
+        changed = {**self.metrics, "submissions": self.metrics["submissions"][:1]}
+        self.assertNotEqual(key, cache_key(changed, "prompt {metrics}", "model"))
+        self.assertNotEqual(key, cache_key(self.metrics, "other prompt {metrics}", "model"))
+        self.assertNotEqual(key, cache_key(self.metrics, "prompt {metrics}", "other model"))
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get("key"))
+        self.cache.set("key", ["Post a weekly overview.", "Respond within 2 days."])
+        self.assertEqual(self.cache.get("key"), ["Post a weekly overview.", "Respond within 2 days."])
+        # Shared with other processes through the database file
+        self.assertEqual(LLMCache(self.cache.path).get("key"), ["Post a weekly overview.", "Respond within 2 days."])
+
+    def test_entries_expire(self):
+        with patch("llm_cache.time.time", return_value=1000.0):
+            self.cache.set("key", ["idea"])
+        with patch("llm_cache.time.time", return_value=1059.0):
+            self.assertEqual(self.cache.get("key"), ["idea"])
+        with patch("llm_cache.time.time", return_value=1060.0):
+            self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for second, key in enumerate(["a", "b", "c"]):
+            with patch("llm_cache.time.time", return_value=1000.0 + second):
+                self.cache.set(key, [key])
+        with patch("llm_cache.time.time", return_value=1010.0):
+            self.cache.get("a")  # "b" is now the least recently used
+        with patch("llm_cache.time.time", return_value=1011.0):
+            self.cache.set("d", ["d"])
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        with patch("llm_cache.time.time", return_value=1012.0):
+            self.assertIsNone(self.cache.get("b"))
+            for key in ["a", "c", "d"]:
+                self.assertEqual(self.cache.get(key), [key])
+
+
+if __name__ == '__main__':
+    unittest.main()
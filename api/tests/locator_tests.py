@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import unittest
+from unittest.mock import patch, Mock
+from flask import Flask
+import db_util
+from db_util import forget_record_location, locate_record, remember_record_location
+
+
+def record_response(path, **kwargs):  # The record only exists in Milestone_3
+    if path.startswith("/api/collections/Milestone_3/"):
+        response = Mock(status_code=200)
+        response.json.return_value = {"id": "abc123", "collectionName": "Milestone_3"}
+        return response
+    return Mock(status_code=404)
+
+
+class RecordLocatorTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db_util._record_locations.clear()
+
+    def tearDown(self):
+        db_util._record_locations.clear()
+        self.ctx.pop()
+
+    @patch('db_util.get_client')
+    def test_fan_out_finds_record_and_remembers_it(self, mock_get_client):
+        mock_get_client.return_value.get.side_effect = record_response
+        milestone, record = locate_record("abc123")
+        self.assertEqual(milestone, "Milestone_3")
+        self.assertEqual(record["id"], "abc123")
+        mock_get_client.return_value.get.reset_mock()
+        # The second lookup goes straight to the right collection
+        self.assertEqual(locate_record("abc123")[0], "Milestone_3")
+        mock_get_client.return_value.get.assert_called_once_with("/api/collections/Milestone_3/records/abc123")
+
+    @patch('db_util.get_client')
+    def test_stale_location_falls_back_to_fan_out(self, mock_get_client):
+        mock_get_client.return_value.get.side_effect = record_response
+        remember_record_location("abc123", "Milestone_1")
+        self.assertEqual(locate_record("abc123")[0], "Milestone_3")
+
+    @patch('db_util.get_client')
+    def test_unreachable_location_falls_back_to_fan_out(self, mock_get_client):
+        def get(path, **kwargs):
+            if path.startswith("/api/collections/Milestone_1/"):
+                raise db_util.requests.ConnectionError("Connection refused")
+            return record_response(path, **kwargs)
+
+        mock_get_client.return_value.get.side_effect = get
+        remember_record_location("abc123", "Milestone_1")
+        self.assertEqual(locate_record("abc123")[0], "Milestone_3")
+        self.assertEqual(db_util.get_record_location("abc123"), "Milestone_3")
+
+    @patch('db_util.get_client')
+    def test_missing_record(self, mock_get_client):
+        mock_get_client.return_value.get.return_value = Mock(status_code=404)
+        remember_record_location("gone", "Milestone_2")
+        forget_record_location("gone")
+        self.assertIsNone(locate_record("gone"))
+        self.assertEqual(mock_get_client.return_value.get.call_count, len(db_util.db_schema.SCHEMAS))
+
+    def test_cache_is_bounded(self):
+        with patch('db_util.RECORD_LOCATION_CACHE_SIZE', 2):
+            for record_id in ("a", "b", "c"):
+                remember_record_location(record_id, "Milestone_1")
+        self.assertEqual(list(db_util._record_locations), ["b", "c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import time
+import unittest
+from unittest.mock import patch
+from flask import Flask
+import metrics
+from db_schema import SCHEMA_INDEX
+from metrics import compact_metrics, email_filter, estimate_tokens, get_user_metrics, invalidate_user_metrics
+
+
+def fake_records(collection_name, fields=None, filter=None, **kwargs):  # One Milestone_1 submission for any email
+    if collection_name != "Milestone_1":
+        return iter([])
+    return iter([{
+        "id": "abc",
+        "email": "coordinator@example.com",
+        "start_time": "2024-10-14T10:00:00Z",
+        "completion_time": "2024-10-14T10:30:00Z",
+        "Ensure_LMS_Access_2Weeks": True,
+        "Add_Welcome_Post_1Week": False,
+    }])
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        invalidate_user_metrics()
+
+    def tearDown(self):
+        invalidate_user_metrics()
+        self.ctx.pop()
+
+    def test_cache_is_bounded(self):
+        with patch('metrics.METRICS_CACHE_SIZE', 2):
+            for email in ("a@example.com", "b@example.com", "c@example.com"):
+                metrics.store_user_metrics(email, [[]], metrics._metrics_generation, time.monotonic())
+        self.assertEqual(list(metrics._metrics_cache), ["b@example.com", "c@example.com"])
+
+    def test_expired_metrics_are_dropped_on_store(self):
+        metrics.store_user_metrics("a@example.com", [[]], metrics._metrics_generation, time.monotonic() - 3600)
+        metrics.store_user_metrics("b@example.com", [[]], metrics._metrics_generation, time.monotonic())
+        self.assertEqual(list(metrics._metrics_cache), ["b@example.com"])
+
+    def test_email_filter_escapes_quotes(self):
+        self.assertEqual(email_filter("a@b.com"), "(email='a@b.com')")
+        self.assertEqual(email_filter("o'neil@b.com"), "(email='o\\'neil@b.com')")
+
+    @patch('metrics.get_client')
+    def test_filter_is_pushed_down_and_fields_projected(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = fake_records
+        user_metrics = get_user_metrics("coordinator@example.com")
+        self.assertEqual(len(user_metrics['submissions']), 1)
+        submission = user_metrics['submissions'][0]
+        self.assertEqual(submission['time_taken_minutes'], 30)
+        self.assertEqual(submission['boolean_responses'],
+                         {"Ensure_LMS_Access_2Weeks": True, "Add_Welcome_Post_1Week": False})
+        for call in mock_get_client.return_value.iter_records.call_args_list:
+            self.assertEqual(call.kwargs['filter'], "(email='coordinator@example.com')")
+            self.assertIn("completion_time", call.kwargs['fields'])
+
+    @patch('metrics.get_client')
+    def test_metrics_are_cached_until_invalidated(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = fake_records
+        get_user_metrics("coordinator@example.com")
+        get_user_metrics("coordinator@example.com")
+        calls_per_fetch = len(metrics.SCHEMAS)
+        self.assertEqual(mock_get_client.return_value.iter_records.call_count, calls_per_fetch)
+        invalidate_user_metrics("coordinator@example.com")
+        get_user_metrics("coordinator@example.com")
+        self.assertEqual(mock_get_client.return_value.iter_records.call_count, 2 * calls_per_fetch)
+
+    @patch('metrics.get_client')
+    def test_failed_fetch_is_not_cached(self, mock_get_client):
+        mock_get_client.return_value.iter_records.side_effect = metrics.requests.ConnectionError()
+        get_user_metrics("coordinator@example.com")
+        self.assertNotIn("coordinator@example.com", metrics._metrics_cache)
+
+
+class CompactMetricsTests(unittest.TestCase):
+    def submission(self, milestone, time_taken, undone=()):
+        checklist = SCHEMA_INDEX[milestone].checklist
+        return {
+            'milestone': milestone,
+            'start_time': '2024-10-14T10:00:00.000Z',
+            'completion_time': '2024-10-14T10:30:00.000Z',
+            'time_taken_minutes': time_taken,
+            'boolean_responses': {field: field not in undone for field in checklist},
+        }
+
+    def test_milestones_summarized_with_undone_items_described(self):
+        checklist = SCHEMA_INDEX["Milestone_2"].checklist
+        user_metrics = {'email': 'coordinator@example.com', 'submissions': [
+            self.submission("Milestone_2", 30, undone=checklist[:2]),
+            self.submission("Milestone_2", 10, undone=checklist[:1]),
+        ]}
+        lines = compact_metrics(user_metrics).split("\n")
+        done = 2 * len(checklist) - 3
+        self.assertEqual(lines[0], f"Milestone_2: 2 submissions, {done}/{2 * len(checklist)} checklist items done "
+                                   f"({done * 100 // (2 * len(checklist))}%), 20 min to complete")
+        self.assertEqual(lines[1:], [
+            f"- Not done (2/2): {SCHEMA_INDEX['Milestone_2'].by_name[checklist[0]]['description']}",
+            f"- Not done (1/2): {SCHEMA_INDEX['Milestone_2'].by_name[checklist[1]]['description']}",
+        ])
+        self.assertLess(estimate_tokens(compact_metrics(user_metrics)), estimate_tokens(str(user_metrics)) / 2)
+
+    def test_size_is_capped(self):
+        user_metrics = {'submissions': [
+            self.submission(milestone, None, undone=SCHEMA_INDEX[milestone].checklist) for milestone in metrics.SCHEMAS
+        ]}
+        encoded = compact_metrics(user_metrics, max_chars=400)
+        self.assertLessEqual(len(encoded), 400)
+        self.assertRegex(encoded.split("\n")[-1], r"^- \(\d+ more lines omitted\)$")
+        self.assertEqual(compact_metrics({'submissions': []}), "No submissions.")
+
+
+if __name__ == '__main__':
+    unittest.main()
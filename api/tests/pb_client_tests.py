@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import base64
+import json
+import time
+import unittest
+from unittest.mock import patch, Mock
+from flask import Flask
+import utility_services
+from pb_client import PocketBaseClient
+
+
+def make_token(exp: float) -> str:  # Build an unsigned JWT with the given expiry
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+def page_response(items, page, total_pages):  # Mock a PocketBase list response
+    response = Mock(status_code=200)
+    response.json.return_value = {"page": page, "totalPages": total_pages, "items": items}
+    return response
+
+
+class PocketBaseClientTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    @patch('utility_services._request_admin_token')
+    def test_client_retries_once_on_401(self, mock_request_token):
+        utility_services.token_manager.invalidate()
+        mock_request_token.side_effect = [make_token(time.time() + 3600), make_token(time.time() + 7200)]
+        client = PocketBaseClient("http://pocketbase")
+        with patch.object(client.session, 'request') as mock_request:
+            mock_request.side_effect = [Mock(status_code=401), Mock(status_code=200)]
+            response = client.get("/api/collections")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(mock_request_token.call_count, 2)
+        first_headers = mock_request.call_args_list[0].kwargs['headers']
+        second_headers = mock_request.call_args_list[1].kwargs['headers']
+        self.assertNotEqual(first_headers['Authorization'], second_headers['Authorization'])
+        utility_services.token_manager.invalidate()
+
+    @patch('utility_services._request_admin_token')
+    def test_client_retries_on_401_outside_app_context(self, mock_request_token):
+        utility_services.token_manager.invalidate()
+        mock_request_token.side_effect = [make_token(time.time() + 3600), make_token(time.time() + 7200)]
+        client = PocketBaseClient("http://pocketbase")
+        self.ctx.pop()
+        try:
+            with patch.object(client.session, 'request') as mock_request:
+                mock_request.side_effect = [Mock(status_code=401), Mock(status_code=200)]
+                with self.assertLogs('pb_client', level='WARNING'):
+                    response = client.get("/api/collections")
+        finally:
+            self.ctx.push()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_request.call_count, 2)
+        utility_services.token_manager.invalidate()
+
+    def test_client_uses_pooled_adapter_with_timeouts(self):
+        client = PocketBaseClient("http://pocketbase/", pool_size=4, timeout=(1, 2))
+        adapter = client.session.get_adapter("http://pocketbase")
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertNotIn("POST", adapter.max_retries.allowed_methods)
+        with patch.object(client.session, 'request') as mock_request:
+            mock_request.return_value = Mock(status_code=200)
+            client.get("/api/health", authorize=False)
+        mock_request.assert_called_once_with("GET", "http://pocketbase/api/health", headers={}, timeout=(1, 2))
+
+    @patch('utility_services._request_admin_token')
+    def test_iter_records_walks_every_page(self, mock_request_token):
+        mock_request_token.return_value = make_token(time.time() + 3600)
+        client = PocketBaseClient("http://pocketbase")
+        pages = [
+            page_response([{"id": "a"}, {"id": "b"}], 1, 3),
+            page_response([{"id": "c"}, {"id": "d"}], 2, 3),
+            page_response([{"id": "e"}], 3, 3),
+        ]
+        with patch.object(client.session, 'request') as mock_request:
+            mock_request.side_effect = pages
+            records = list(client.iter_records("Milestone_1", fields="id", sort="-created", per_page=2))
+        self.assertEqual([record["id"] for record in records], ["a", "b", "c", "d", "e"])
+        self.assertEqual(mock_request.call_count, 3)
+        params = mock_request.call_args_list[2].kwargs['params']
+        self.assertEqual(params, {"perPage": 2, "fields": "id", "sort": "-created", "page": 3})
+        utility_services.token_manager.invalidate()
+
+
+if __name__ == '__main__':
+    unittest.main()
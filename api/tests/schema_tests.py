@@ -0,0 +1,234 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # This needs to be before other imports.
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+import db_schema
+import db_util
+from datetime import datetime
+from db_schema import SCHEMAS, SCHEMA_INDEX, schema_version
+
+
+# Options as PocketBase 0.22 stores and lists them for each field type: unset values come back as "" or null,
+# and keys it doesn't know (a date's enableTime, a select's default) are dropped
+ECHOED_OPTIONS = {
+    "bool": {},
+    "date": {"min": "", "max": ""},
+    "email": {"exceptDomains": None, "onlyDomains": None},
+    "url": {"exceptDomains": None, "onlyDomains": None},
+    "select": {"maxSelect": 1, "values": []},
+    "text": {"min": None, "max": None, "pattern": ""},
+}
+
+
+def as_listed(name, schema, collection_id=None):
+    """
+    A collection as PocketBase's list endpoint returns it after `schema` was saved.
+    """
+    return {
+        "id": collection_id or name, "created": "2024-10-01 00:00:00.000Z", "updated": "2024-10-01 00:00:00.000Z",
+        "name": name, "type": "base", "system": False, "indexes": [], "options": {},
+        "listRule": None, "viewRule": None, "createRule": None, "updateRule": None, "deleteRule": None,
+        "schema": [{
+            "system": False, "id": field.get("id") or f"{field['name']}_id",
+            "name": field["name"], "type": field["type"], "required": field["required"],
+            "presentable": False, "unique": False,
+            "options": {
+                key: default if field["options"].get(key) is None else field["options"][key]
+                for key, default in ECHOED_OPTIONS[field["type"]].items()
+            },
+        } for field in schema],
+    }
+
+
+class SchemaRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db_util._field_registry.clear()
+        db_util._failed_milestones.clear()
+        db_util._registry_version = None
+        db_util._reconcile_schemas = True
+
+    def tearDown(self):
+        db_util._field_registry.clear()
+        db_util._failed_milestones.clear()
+        db_util._registry_version = None
+        db_util._reconcile_schemas = True
+        self.ctx.pop()
+
+    def test_schema_version_is_stable(self):
+        self.assertEqual(schema_version(), db_schema.SCHEMA_VERSION)
+        changed = {**SCHEMAS, "Milestone_4": []}
+        self.assertNotEqual(schema_version(changed), db_schema.SCHEMA_VERSION)
+
+    def fake_client(self, collections):
+        """
+        A PocketBase client holding `collections`, recording the requests made to it.
+        """
+        client = MagicMock()
+
+        def respond(status_code, body):
+            return MagicMock(status_code=status_code, json=MagicMock(return_value=body), text=str(body))
+
+        def save(url, json, headers):
+            saved = as_listed(json["name"], json["schema"], url.rsplit("/", 1)[-1] if url.count("/") > 2 else None)
+            collections[json["name"]] = saved
+            return respond(200, saved)
+
+        client.get.side_effect = lambda url, params=None: respond(
+            200, {"items": list(collections.values()), "totalPages": 1})
+        client.post.side_effect = save
+        client.patch.side_effect = save
+        return client
+
+    def synced_collections(self):
+        return {milestone: as_listed(milestone, schema) for milestone, schema in SCHEMAS.items()}
+
+    def test_fields_are_synced_once(self):
+        client = self.fake_client({})
+        with patch('db_util.get_client', return_value=client):
+            fields = db_util.get_collection_fields("Milestone_1")
+            db_util.get_collection_fields("Milestone_2")
+            db_util.get_collection_fields("Milestone_1")
+        self.assertEqual(fields, [field["name"] for field in SCHEMAS["Milestone_1"]])
+        self.assertEqual(client.get.call_count, 1)
+        self.assertEqual(client.post.call_count, len(SCHEMAS))
+
+    def test_unchanged_collections_are_not_patched(self):
+        client = self.fake_client(self.synced_collections())
+        with patch('db_util.get_client', return_value=client):
+            db_util.sync_collection_schemas()
+        self.assertEqual(client.get.call_count, 1)
+        client.post.assert_not_called()
+        client.patch.assert_not_called()
+
+    def test_only_changed_collections_are_patched(self):
+        collections = self.synced_collections()
+        collections["Milestone_2"]["schema"][0]["required"] = not collections["Milestone_2"]["schema"][0]["required"]
+        collections["Milestone_3"]["schema"].pop()
+        del collections["Milestone_1"]
+        client = self.fake_client(collections)
+        with patch('db_util.get_client', return_value=client):
+            registry = db_util.sync_collection_schemas()
+        self.assertEqual(client.post.call_count, 1)
+        self.assertEqual(sorted(call.args[0] for call in client.patch.call_args_list),
+                         ["/api/collections/Milestone_2", "/api/collections/Milestone_3"])
+        patched_fields = client.patch.call_args_list[0].kwargs["json"]["schema"]
+        self.assertTrue(all(field["id"] == f"{field['name']}_id" for field in patched_fields[:-1]))  # Existing fields keep their ids
+        self.assertEqual(registry["Milestone_3"], [field["name"] for field in SCHEMAS["Milestone_3"]])
+
+    def test_loading_leaves_collections_unchanged(self):
+        collections = self.synced_collections()
+        del collections["Milestone_1"]
+        collections["Milestone_2"]["schema"].append(
+            {**collections["Milestone_2"]["schema"][0], "id": "extra_id", "name": "extra"})
+        client = self.fake_client(collections)
+        with patch('db_util.get_client', return_value=client):
+            registry = db_util.sync_collection_schemas(reconcile=False)
+        client.post.assert_not_called()
+        client.patch.assert_not_called()
+        self.assertEqual(registry["Milestone_3"], [field["name"] for field in SCHEMAS["Milestone_3"]])
+        self.assertEqual(db_util._failed_milestones, {"Milestone_1", "Milestone_2"})
+        with patch('db_util.SCHEMA_RETRY_INTERVAL', 0), patch('db_util.get_client', return_value=client):
+            db_util.get_collection_fields("Milestone_1")  # Retried by reading the listing again, not by reconciling
+        client.post.assert_not_called()
+        client.patch.assert_not_called()
+        self.assertEqual(client.get.call_count, 2)
+
+    def test_registry_is_replaced_in_one_step(self):
+        client = self.fake_client({})
+        with patch('db_util.get_client', return_value=client):
+            db_util.sync_collection_schemas()
+            registry = db_util._field_registry  # As held by a thread reading without the lock
+            db_util.sync_collection_schemas()
+        self.assertIsNot(db_util._field_registry, registry)
+        self.assertEqual(sorted(registry), sorted(SCHEMAS))
+
+    def test_changed_options_are_patched(self):
+        collections = self.synced_collections()
+        academic_period = next(field for field in collections["Milestone_1"]["schema"] if field["type"] == "select")
+        academic_period["options"]["values"] = ["Term"]
+        client = self.fake_client(collections)
+        with patch('db_util.get_client', return_value=client):
+            db_util.sync_collection_schemas()
+        self.assertEqual([call.args[0] for call in client.patch.call_args_list], ["/api/collections/Milestone_1"])
+
+    def test_unreachable_pocketbase_falls_back_to_local_schema(self):
+        client = self.fake_client({})
+        client.get.side_effect = db_util.requests.ConnectionError("refused")
+        with patch('db_util.get_client', return_value=client):
+            fields = db_util.get_collection_fields("Milestone_2")
+        self.assertEqual(fields, [field["name"] for field in SCHEMAS["Milestone_2"]])
+        client.post.assert_not_called()
+
+    def test_registry_rebuilt_when_schema_version_changes(self):
+        client = self.fake_client({})
+        with patch('db_util.get_client', return_value=client):
+            db_util.get_collection_fields("Milestone_1")
+            with patch('db_schema.SCHEMA_VERSION', 'changed'):
+                db_util.get_collection_fields("Milestone_1")
+        self.assertEqual(client.get.call_count, 2)
+        self.assertEqual(client.post.call_count, len(SCHEMAS))  # The second sync finds the collections up to date
+        client.patch.assert_not_called()
+
+    @patch('db_util.list_collections')
+    def test_local_schema_used_when_sync_fails(self, mock_list):
+        mock_list.return_value = None
+        fields = db_util.get_collection_fields("Milestone_3")
+        self.assertEqual(fields, [field["name"] for field in SCHEMAS["Milestone_3"]])
+
+    def test_failed_collections_are_retried(self):
+        client = self.fake_client({})
+        with patch('db_util.list_collections', return_value=None):
+            db_util.get_collection_fields("Milestone_1")
+            db_util.get_collection_fields("Milestone_1")  # Not due for a retry yet
+        self.assertEqual(db_util._failed_milestones, set(SCHEMAS))
+        with patch('db_util.SCHEMA_RETRY_INTERVAL', 0), patch('db_util.get_client', return_value=client):
+            db_util.get_collection_fields("Milestone_1")
+            db_util.get_collection_fields("Milestone_2")  # Reconciled by the retry above
+        self.assertEqual(client.get.call_count, 1)
+        self.assertEqual(client.post.call_count, len(SCHEMAS))
+        self.assertEqual(db_util._failed_milestones, set())
+
+
+class SchemaIndexTests(unittest.TestCase):
+    def test_index_matches_schema(self):
+        for milestone, schema in SCHEMAS.items():
+            index = SCHEMA_INDEX[milestone]
+            self.assertEqual(index.fields, tuple(field["name"] for field in schema))
+            self.assertEqual(index.checklist, tuple(field["name"] for field in schema if field["type"] == "bool"))
+            for field in schema:
+                self.assertEqual(index.by_name[field["name"]]["type"], field["type"])
+                self.assertIn(field["name"], index.names_by_type[field["type"]])
+
+    def test_index_is_read_only(self):
+        index = SCHEMA_INDEX["Milestone_1"]
+        with self.assertRaises(TypeError):
+            index.by_name["email"]["type"] = "text"
+        with self.assertRaises(TypeError):
+            SCHEMA_INDEX["Milestone_4"] = index
+
+    def test_coerce_record(self):
+        record = db_util.coerce_record("Milestone_2", {
+            "respond_in_2_days": "x",
+            "add_weekly_overview": None,
+            "upload_live_session": 1,
+            "term_start_date": datetime(2024, 10, 14, 9, 30),
+            "completion_time": float("nan"),
+            "not_in_schema": "kept",
+        })
+        self.assertEqual(record["term_start_date"], "2024-10-14T09:30:00")
+        self.assertIsNone(record["completion_time"])
+        # Checklist values are left for PocketBase to interpret, as they are for form submissions
+        self.assertEqual(record["respond_in_2_days"], "x")
+        self.assertIsNone(record["add_weekly_overview"])
+        self.assertEqual(record["upload_live_session"], 1)
+        self.assertNotIn("post_assignment_reminder", record)
+        self.assertEqual(record["not_in_schema"], "kept")
+
+
+if __name__ == '__main__':
+    unittest.main()
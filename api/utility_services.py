@@ -1,10 +1,15 @@
+import base64
+import functools
+import json
 import logging
 import os
+import threading
+import time
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 import requests
 from flask import current_app
-from typing import Union, Optional, Dict, Any
+from typing import Callable, Union, Optional, Dict, Any
 
 
 load_dotenv("secrets.env")
@@ -41,6 +46,20 @@ def setup_logging(app: any, created_file=False) -> None:
     else:
         app.logger.info(f"Existing log file found at: {logs_path}")
 
+def with_app_context(func: Callable) -> Callable:
+    """
+    Wrap a function so it runs inside the current Flask application context.
+    Used for work handed to thread pools, where current_app would otherwise be unavailable.
+    """
+    app = current_app._get_current_object()
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with app.app_context():
+            return func(*args, **kwargs)
+    return wrapper
+
+
 def get_url() -> Optional[str]:
     """
     Get the PocketBase URL from environment variables.
@@ -50,10 +69,78 @@ def get_url() -> Optional[str]:
         raise ValueError("URL was not correctly retrieved.")
     return url if url else current_app.logger.error("Failed to retrieve PocketBase URL")
 
-def authenticate() -> Union[str, None]:
+class TokenManager:
+    """
+    Process-wide cache for the PocketBase admin token.
+
+    The token's `exp` claim is decoded so it can be refreshed shortly before it expires, and only one
+    thread performs the refresh while any others wait on the lock and reuse the result.
+    """
+
+    def __init__(self, refresh_margin: int = 60) -> None:
+        self.refresh_margin: int = refresh_margin  # Seconds before expiry at which the token is refreshed
+        self._token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def decode_expiry(token: str) -> float:
+        """
+        Decode the `exp` claim (unix seconds) of a JWT without verifying its signature.
+        Returns 0 if the claim cannot be read, so the token is treated as expired.
+        """
+        try:
+            payload: str = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)  # Restore the base64 padding stripped by JWT encoding
+            return float(json.loads(base64.urlsafe_b64decode(payload)).get("exp", 0))
+        except (IndexError, ValueError, TypeError):
+            return 0.0
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    def get_token(self) -> Optional[str]:
+        """
+        Return a cached admin token, authenticating with PocketBase only when it is missing or close to expiry.
+        """
+        if self._is_fresh():
+            return self._token
+        with self._lock:
+            if self._is_fresh():  # Another thread refreshed the token while we were waiting
+                return self._token
+            token: Optional[str] = _request_admin_token()
+            if token:
+                self._token = token
+                self._expires_at = self.decode_expiry(token)
+            return token
+
+    def peek(self) -> Optional[str]:
+        """
+        Return the cached token if it is still fresh, without ever authenticating. Lets async callers
+        skip handing the (rarely needed) blocking refresh to a thread.
+        """
+        token: Optional[str] = self._token
+        return token if self._is_fresh() else None
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """
+        Drop the cached token. If a token is passed, it is only dropped if it is still the cached one,
+        so a token rejected by one caller doesn't discard a newer token fetched by another.
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+
+token_manager = TokenManager()
+
+
+def _request_admin_token() -> Optional[str]:
     """
-    Authenticate with PocketBase and return the admin token.
+    Authenticate with PocketBase using the admin credentials and return a fresh token.
     """
+    from pb_client import get_client  # this needs to be here to prevent circular imports
     global _auth_logged
 
     if not ADMIN_EMAIL or not ADMIN_PASSWORD or not POCKETBASE_URL:
@@ -63,10 +150,11 @@ def authenticate() -> Union[str, None]:
     auth_data: Dict[str, str] = {
         "identity": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
     headers: Dict[str, str] = {'Content-Type': 'application/json'}
-    auth_response: requests.Response = requests.post(
-        f"{POCKETBASE_URL}/api/admins/auth-with-password",
+    auth_response: requests.Response = get_client().post(
+        "/api/admins/auth-with-password",
         json=auth_data,
-        headers=headers
+        headers=headers,
+        authorize=False
     )
     if auth_response.status_code == 200:
         token: Optional[str] = auth_response.json().get("token")
@@ -86,41 +174,32 @@ def authenticate() -> Union[str, None]:
         return None
 
 
-def initialize_collections() -> None:
-    from db_schema import SCHEMAS
+def authenticate() -> Union[str, None]:
+    """
+    Return the admin token for PocketBase, reusing the cached token while it is still valid.
+    """
+    return token_manager.get_token()
+
+
+def initialize_collections(reconcile: bool = True) -> None:
     # this needs to be here to prevent circular imports
-    from db_util import create_or_update_pocketbase_collection
-    """
-    Initialize collections in PocketBase based on defined schemas.
-    """
-
-
-    for milestone in SCHEMAS.keys():
-        collection_name: str = milestone
-        schema: Dict[str, Any] = SCHEMAS[milestone]
-        admin_token: Optional[str] = authenticate()
-        if not admin_token:
-            raise Exception("Failed to authenticate admin.")
-        if not collection_exists(collection_name, admin_token):
-            create_or_update_pocketbase_collection(
-                collection_name=collection_name,
-                schema=schema,
-                admin_token=admin_token,
-                collection_type='base',
-                listRule=None,
-                viewRule=None,
-                options={}
-            )
+    from db_util import sync_collection_schemas
+    """
+    Initialize collections in PocketBase based on defined schemas, and record their field names
+    so submissions don't need to look them up. With `reconcile` off the field names are only read
+    from PocketBase, for processes whose supervisor has already initialized the collections.
+    """
+    if not authenticate():
+        raise Exception("Failed to authenticate admin.")
+    sync_collection_schemas(reconcile=reconcile)
+
+
 def collection_exists(collection_name: str, admin_token: str) -> bool:
     """
     Helper function to check if a collection already exists in PocketBase.
     """
-    import requests
-    pocketbase_url = os.getenv('POCKETBASE_URL')
-    url = f"{pocketbase_url}/api/collections/{collection_name}"
+    from pb_client import get_client
 
-    response = requests.get(url, headers={
-        "Authorization": admin_token
-    })
+    response = get_client().get(f"/api/collections/{collection_name}")
 
     return response.status_code == 200  # Collection exists if status is 200
\ No newline at end of file
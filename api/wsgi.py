@@ -0,0 +1,16 @@
+import os
+from app import create_app
+
+# WSGI entry point for production servers, e.g.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app      (see gunicorn.conf.py)
+#   waitress-serve --port=5000 wsgi:app
+#
+# Under gunicorn the master process supervises PocketBase, reconciles the collection schemas and sets
+# POCKETBASE_SUPERVISED, so the workers created here don't each try to start it and only load the schemas.
+# Every worker, including ones replaced after max_requests, a timeout or a crash, resumes the spooled jobs left
+# unfinished, which picks up jobs orphaned by the worker it replaces. jobs.claim_job() keeps them from running twice.
+# Single process servers such as waitress do all of it themselves.
+
+supervised: bool = bool(os.getenv("POCKETBASE_SUPERVISED"))
+app = create_app(manage_pocketbase=not supervised, reconcile_schemas=not supervised)